@@ -0,0 +1,119 @@
+"""Store benchmark results as a baseline and flag regressions against it."""
+import json
+import os
+import platform
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+from rich.console import Console
+from rich.table import Table
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+
+# suite -> case -> metric -> value
+Results = Dict[str, Dict[str, float]]
+
+
+def environment() -> Dict[str, str]:
+    """Machine details stored with a baseline; numbers only compare on like machines."""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': str(os.cpu_count()),
+    }
+
+
+def load_baseline(path: Path = BASELINE_FILE) -> Dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(suite: str, results: Results, path: Path = BASELINE_FILE):
+    """Replace one suite's results in the baseline file, keeping the other suites."""
+    baseline = load_baseline(path)
+    baseline.setdefault('suites', {})[suite] = {'environment': environment(), 'results': results}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(
+    console: Console,
+    suite: str,
+    results: Results,
+    higher_is_better: Dict[str, bool],
+    tolerance: float,
+    path: Path = BASELINE_FILE
+) -> int:
+    """
+    Print results next to the stored baseline and count regressions.
+
+    Args:
+        console: Console to print to
+        suite: Baseline section (e.g. ``micro``, ``pipeline``)
+        results: Current results per case and metric
+        higher_is_better: Direction of every compared metric; metrics not
+            listed are shown but never flagged
+        tolerance: Relative change allowed before a metric counts as a
+            regression (0.1 = 10% worse)
+
+    Returns:
+        Number of regressed metrics (0 when there is no baseline)
+    """
+    stored = load_baseline(path).get('suites', {}).get(suite)
+    if stored is None:
+        console.print(f"[yellow]No {suite} baseline in {path}; run with --save-baseline to record one[/yellow]")
+        return 0
+    if stored['environment'] != environment():
+        console.print(f"[yellow]Baseline was recorded on a different environment: {stored['environment']}[/yellow]")
+
+    table = Table(title=f"{suite} vs baseline (tolerance {tolerance:.0%})")
+    table.add_column("Case", style="cyan")
+    table.add_column("Metric")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Current", justify="right")
+    table.add_column("Change", justify="right")
+
+    regressions: List[Tuple[str, str]] = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            before = stored['results'].get(case, {}).get(metric)
+            if before is None or metric not in higher_is_better:
+                continue
+            change = (value - before) / before if before else 0.0
+            worse = -change if higher_is_better[metric] else change
+            regressed = worse > tolerance
+            if regressed:
+                regressions.append((case, metric))
+            style = "red" if regressed else "green" if worse < -tolerance else ""
+            table.add_row(
+                case, metric, f"{before:,.3f}", f"{value:,.3f}",
+                f"[{style}]{change:+.1%}[/{style}]" if style else f"{change:+.1%}"
+            )
+    console.print(table)
+
+    if regressions:
+        console.print(f"[bold red]✗ {len(regressions)} metrics regressed beyond {tolerance:.0%}[/bold red]")
+    else:
+        console.print("[green]✓ No regressions against the baseline[/green]")
+    return len(regressions)
+
+
+def finish(console: Console, suite: str, results: Results, higher_is_better: Dict[str, bool], args) -> None:
+    """Save or compare per the ``--save-baseline`` / ``--tolerance`` flags and exit."""
+    if args.save_baseline:
+        save_baseline(suite, results, args.baseline)
+        console.print(f"[green]✓ Saved {suite} baseline to {args.baseline}[/green]")
+        sys.exit(0)
+    sys.exit(1 if compare(console, suite, results, higher_is_better, args.tolerance, args.baseline) else 0)
+
+
+def add_arguments(parser) -> None:
+    """Add the shared baseline flags to a benchmark's argument parser."""
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help='Baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Relative slowdown allowed before a metric counts as a regression')
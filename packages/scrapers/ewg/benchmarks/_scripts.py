@@ -0,0 +1,20 @@
+"""Load pipeline step scripts (whose file names are not valid module names) as modules."""
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+sys.path.append(str(SCRIPTS_DIR.parent))
+
+
+def load_script(file_name: str) -> ModuleType:
+    """Import ``scripts/<file_name>`` (e.g. ``04_consolidate_data.py``) as a module."""
+    module_name = "step_" + Path(file_name).stem
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the step 4 contaminants reference builder.
+
+Builds synthetic details tables shaped like ``pws_water_quality.parquet``
+(one row per contaminant per PWS) and times ``create_contaminants_reference``
+at each size. Up to ``--legacy-max-rows`` the original per-contaminant
+iterrows implementation is timed too and its output is checked against the
+vectorized one.
+
+Usage:
+    python benchmarks/bench_consolidate.py --rows 100000 1000000 5000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from rich.console import Console
+from rich.table import Table
+sys.path.append(str(Path(__file__).parent))
+
+from _scripts import load_script
+
+console = Console()
+
+SOURCES = [f"Source {i}" for i in range(40)]
+FILTERS = [f"Filter {i}" for i in range(15)]
+
+
+def make_details(rows: int, contaminants: int = 300, seed: int = 0) -> pd.DataFrame:
+    """Synthetic details table with ~15 contaminant rows per PWS."""
+    rng = np.random.default_rng(seed)
+    num_pws = max(1, rows // 15)
+    pws_index = np.sort(rng.integers(0, num_pws, rows))
+    contam_index = rng.integers(0, contaminants, rows)
+
+    # Each contaminant has a fixed set of sources/filters, as on EWG pages
+    contam_sources = [list(rng.choice(SOURCES, rng.integers(0, 4), replace=False)) for _ in range(contaminants)]
+    contam_filters = [list(rng.choice(FILTERS, rng.integers(1, 4), replace=False)) for _ in range(contaminants)]
+    people = rng.integers(25, 1_000_000, num_pws)
+
+    df = pd.DataFrame({
+        'pws_id': pd.Series([f"NJ{i:07d}" for i in range(num_pws)]).to_numpy()[pws_index],
+        'people_served': people[pws_index],
+        'contaminant_name': np.array([f"Contaminant {i}" for i in range(contaminants)], dtype=object)[contam_index],
+        'potential_effect': 'cancer',
+        'pollution_sources': pd.Series(contam_sources, dtype=object).to_numpy()[contam_index],
+        'filter_options': pd.Series(contam_filters, dtype=object).to_numpy()[contam_index],
+    })
+    # PWS without detected contaminants have a single row with no contaminant
+    df.loc[rng.random(rows) < 0.02, ['contaminant_name', 'pollution_sources', 'filter_options']] = None
+    return df
+
+
+def create_contaminants_reference_legacy(details_df: pd.DataFrame) -> pd.DataFrame:
+    """Original per-contaminant implementation, kept as the baseline."""
+    contaminants = []
+    contam_df = details_df[details_df['contaminant_name'].notna()].copy()
+
+    for contam_name in contam_df['contaminant_name'].unique():
+        contam_data = contam_df[contam_df['contaminant_name'] == contam_name].iloc[0]
+
+        all_sources = set()
+        all_filters = set()
+
+        contam_rows = contam_df[contam_df['contaminant_name'] == contam_name]
+        for _, row in contam_rows.iterrows():
+            if isinstance(row['pollution_sources'], list):
+                all_sources.update(row['pollution_sources'])
+            if isinstance(row['filter_options'], list):
+                all_filters.update(row['filter_options'])
+
+        contaminants.append({
+            'contaminant_name': contam_name,
+            'potential_effects': contam_data['potential_effect'],
+            'pollution_sources': list(all_sources),
+            'filter_options': list(all_filters),
+            'systems_affected': len(contam_rows['pws_id'].unique()),
+            'people_affected': contam_rows.groupby('pws_id')['people_served'].first().sum()
+        })
+
+    return pd.DataFrame(contaminants)
+
+
+def same_output(expected: pd.DataFrame, actual: pd.DataFrame) -> bool:
+    """Compare reference tables; list columns are compared as sets."""
+    if list(expected.columns) != list(actual.columns) or len(expected) != len(actual):
+        return False
+    for column in expected.columns:
+        left, right = expected[column].tolist(), actual[column].tolist()
+        if column in ('pollution_sources', 'filter_options'):
+            left, right = [set(v) for v in left], [set(v) for v in right]
+        if left != right:
+            return False
+    return True
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 3_000_000],
+                        help='Details table sizes to benchmark')
+    parser.add_argument('--contaminants', type=int, default=300, help='Distinct contaminants')
+    parser.add_argument('--legacy-max-rows', type=int, default=200_000,
+                        help='Largest size at which the legacy implementation is also run')
+    args = parser.parse_args()
+
+    consolidate = load_script("04_consolidate_data.py")
+
+    table = Table(title="create_contaminants_reference scaling")
+    table.add_column("Rows", justify="right", style="cyan")
+    table.add_column("Vectorized (s)", justify="right", style="green")
+    table.add_column("Rows/s", justify="right")
+    table.add_column("Legacy (s)", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Identical", justify="center")
+
+    failed = False
+    for rows in args.rows:
+        details_df = make_details(rows, args.contaminants)
+        result, elapsed = timed(consolidate.create_contaminants_reference, details_df)
+
+        legacy_cell = speedup_cell = identical_cell = "-"
+        if rows <= args.legacy_max_rows:
+            expected, legacy_elapsed = timed(create_contaminants_reference_legacy, details_df)
+            identical = same_output(expected, result)
+            failed |= not identical
+            legacy_cell = f"{legacy_elapsed:.2f}"
+            speedup_cell = f"{legacy_elapsed / elapsed:.0f}x"
+            identical_cell = "✓" if identical else "[red]✗[/red]"
+
+        table.add_row(f"{rows:,}", f"{elapsed:.2f}", f"{rows / elapsed:,.0f}", legacy_cell, speedup_cell, identical_cell)
+
+    console.print(table)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Point lookups against the single-file and the state-partitioned gold layout.
+
+Builds a synthetic national gold layer (``--zip-codes`` ZIP codes spread over
+the USPS prefixes, one to three PWS each, ~15 contaminant rows per PWS) and
+writes the complete dataset, the PWS details and the ZIP summary twice: as
+single ``to_parquet`` files, as step 4 used to, and with step 4's
+``write_partitioned`` settings. It then runs ``--lookups`` random ZIP and
+PWS lookups against each and reports, per dataset and layout:
+
+    size MB        total size on disk
+    lookup ms      mean time to read the matching rows into Arrow
+    KB read        mean bytes read from disk per lookup (Linux only, from
+                   /proc/self/io; the page cache does not hide reads)
+
+Both layouts must return the same rows. The results are compared to the
+stored baseline; the script exits non-zero when the rows differ or a metric
+is worse than the baseline by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/bench_gold.py
+    python benchmarks/bench_gold.py --zip-codes 40000 --row-group-size 8192
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from rich.console import Console
+from rich.table import Table
+sys.path.append(str(Path(__file__).parent))
+
+import _baseline
+import _scripts  # noqa: F401 (puts the package root on sys.path)
+from utils import open_partitioned, lookup_filter, write_partitioned, zip_state, pws_state
+from utils.partitioning import ROW_GROUP_SIZE, ZIP3_STATES
+
+console = Console()
+
+HIGHER_IS_BETTER = {'size_mb': False, 'lookup_ms': False, 'kb_read': False}
+
+IO_FILE = Path("/proc/self/io")
+
+
+def bytes_read() -> Optional[int]:
+    """Bytes this process has read through read()/pread() so far."""
+    if not IO_FILE.exists():
+        return None
+    for line in IO_FILE.read_text().splitlines():
+        if line.startswith('rchar:'):
+            return int(line.split()[1])
+    return None
+
+
+def make_gold(zip_codes: int, seed: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Synthetic complete, details and ZIP summary tables shaped like step 4's."""
+    rng = np.random.default_rng(seed)
+    prefixes = np.array([prefix for first, last, _ in ZIP3_STATES for prefix in range(first, last + 1)])
+    zips = np.unique(rng.choice(prefixes, zip_codes) * 100 + rng.integers(0, 100, zip_codes))
+    zip_series = pd.Series([f"{zip_code:05d}" for zip_code in zips])
+    states = zip_state(zip_series)
+
+    # About two ZIP codes per PWS, within the ZIP's state
+    pairs = []
+    pws_pool: Dict[str, List[str]] = {}
+    for zip_code, state in zip(zip_series, states):
+        pool = pws_pool.setdefault(state, [])
+        for _ in range(rng.integers(1, 4)):
+            if not pool or rng.random() < 0.5:
+                pool.append(f"{state}{len(pool):07d}")
+            pairs.append((zip_code, pool[rng.integers(0, len(pool))]))
+    pws_zip_df = pd.DataFrame(pairs, columns=['zip_code', 'pws_id']).drop_duplicates()
+
+    pws_ids = pws_zip_df['pws_id'].unique()
+    rows_per_pws = rng.integers(5, 26, len(pws_ids))
+    rows = int(rows_per_pws.sum())
+    names = [f"Contaminant {i}" for i in range(300)]
+    sources = [[f"Source {j}" for j in range(i % 4)] for i in range(300)]
+    contaminant = rng.integers(0, 300, rows)
+    details_df = pd.DataFrame({
+        'pws_id': np.repeat(pws_ids, rows_per_pws),
+        'people_served': np.repeat(rng.integers(25, 1_000_000, len(pws_ids)), rows_per_pws),
+        'contaminant_name': pd.Categorical.from_codes(contaminant, names),
+        'utility_level': rng.uniform(0.1, 50, rows).round(2),
+        'health_guideline': rng.uniform(0.01, 5, rows).round(3),
+        'unit': pd.Categorical(['ppb'] * rows),
+        'pollution_sources': pd.Series(sources, dtype=object).to_numpy()[contaminant],
+    })
+    complete_df = pws_zip_df.merge(details_df, on='pws_id')
+    zip_summary = complete_df.groupby('zip_code', as_index=False).agg(
+        num_pws=('pws_id', 'nunique'), total_people_served=('people_served', 'sum')
+    )
+    return complete_df, details_df, zip_summary
+
+
+def time_lookups(read: Callable[[str], pa.Table], keys: List[str]) -> Tuple[float, Optional[float], List[int]]:
+    """Mean ms and mean KB read per lookup, and the rows each lookup returned."""
+    seconds, kilobytes, counts = [], [], []
+    for key in keys:
+        before = bytes_read()
+        start = time.perf_counter()
+        counts.append(read(key).num_rows)
+        seconds.append(time.perf_counter() - start)
+        after = bytes_read()
+        if before is not None and after is not None:
+            kilobytes.append((after - before) / 1024)
+    return statistics.mean(seconds) * 1000, statistics.mean(kilobytes) if kilobytes else None, counts
+
+
+def size_mb(path: Path) -> float:
+    files = [path] if path.is_file() else [file for file in path.rglob('*.parquet')]
+    return sum(file.stat().st_size for file in files) / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--zip-codes', type=int, default=30_000, help='Synthetic ZIP codes')
+    parser.add_argument('--lookups', type=int, default=200, help='Random lookups per dataset and layout')
+    parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE, help='Rows per row group when partitioned')
+    _baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    complete_df, details_df, zip_summary = make_gold(args.zip_codes)
+    console.print(
+        f"[cyan]{len(zip_summary):,} ZIP codes, {details_df['pws_id'].nunique():,} PWS, "
+        f"{len(complete_df):,} complete rows[/cyan]"
+    )
+
+    rng = np.random.default_rng(1)
+    zip_keys = list(rng.choice(zip_summary['zip_code'].to_numpy(), args.lookups))
+    pws_keys = list(rng.choice(details_df['pws_id'].unique(), args.lookups))
+    complete_state = zip_state(complete_df['zip_code']).fillna(pws_state(complete_df['pws_id']))
+    # dataset -> (rows, state, sort and Bloom filter columns, lookup column, lookup keys)
+    datasets = {
+        'complete by ZIP': (complete_df, complete_state, ['zip_code', 'pws_id'], 'zip_code', zip_keys),
+        'details by PWS': (details_df, pws_state(details_df['pws_id']), ['pws_id'], 'pws_id', pws_keys),
+        'ZIP summary by ZIP': (zip_summary, zip_state(zip_summary['zip_code']), ['zip_code'], 'zip_code', zip_keys),
+    }
+
+    results: Dict[str, Dict[str, float]] = {}
+    table = Table(title=f"Gold point lookups ({args.lookups} per case, row groups of {args.row_group_size:,})")
+    table.add_column("Dataset", style="cyan")
+    table.add_column("Layout")
+    table.add_column("Size MB", justify="right")
+    table.add_column("Lookup ms", justify="right", style="green")
+    table.add_column("KB read", justify="right", style="green")
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="ewg-gold-") as tmp_dir:
+        for index, (name, (df, state, sort_by, key, keys)) in enumerate(datasets.items()):
+            single_file = Path(tmp_dir) / f"{index}.parquet"
+            df.to_parquet(single_file, index=False)
+            dataset_dir = Path(tmp_dir) / f"{index}"
+            write_partitioned(df.assign(state=state), dataset_dir, sort_by, row_group_size=args.row_group_size,
+                              bloom_filter_columns=sort_by)
+            dataset = open_partitioned(dataset_dir)
+
+            layouts = {
+                'single file': (single_file, lambda value: pq.read_table(single_file, filters=[(key, '=', value)])),
+                'by state': (dataset_dir, lambda value: dataset.to_table(filter=lookup_filter(**{key: value}))),
+            }
+            counts = {}
+            for layout, (path, read) in layouts.items():
+                lookup_ms, kb_read, counts[layout] = time_lookups(read, keys)
+                case = f"{name} / {layout}"
+                results[case] = {'size_mb': round(size_mb(path), 3), 'lookup_ms': round(lookup_ms, 3)}
+                if kb_read is not None:
+                    results[case]['kb_read'] = round(kb_read, 1)
+                table.add_row(name, layout, f"{size_mb(path):,.2f}", f"{lookup_ms:,.2f}",
+                              f"{kb_read:,.1f}" if kb_read is not None else "-")
+            if counts['single file'] != counts['by state']:
+                console.print(f"[bold red]✗ {name}: the layouts returned different rows[/bold red]")
+                failed = True
+
+    console.print(table)
+    if failed:
+        sys.exit(1)
+    _baseline.finish(console, 'gold', results, HIGHER_IS_BETTER, args)
+
+
+if __name__ == "__main__":
+    main()
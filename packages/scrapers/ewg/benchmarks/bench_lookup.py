@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Query latency of the in-memory lookup service against reading the gold datasets.
+
+Writes the synthetic national gold layer of ``bench_gold.py`` (``--zip-codes``
+ZIP codes) to a scratch gold directory in step 4's layout, loads it into a
+``LookupService`` and runs ``--lookups`` random ZIP code and PWS queries
+three ways:
+
+    dataset   a filtered read of the state-partitioned datasets per query
+              (``read_partitioned`` + ``lookup_filter``), for reference
+    index     the service's ``GoldIndex`` (no response cache)
+    cached    the service with every response already in its LRU cache
+
+Reported per query kind and way: mean and p99 microseconds per query. The
+load time and the memory of the index columns are reported once. Every way
+must return the same contaminant rows. The results are compared to the
+stored baseline; the script exits non-zero when they differ or a metric is
+worse than the baseline by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/bench_lookup.py
+    python benchmarks/bench_lookup.py --zip-codes 40000 --lookups 5000
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+sys.path.append(str(Path(__file__).parent))
+
+import _baseline
+from bench_gold import make_gold
+from lookup import LookupService
+from lookup.index import COMPLETE_DIR, DETAILS_DIR, PWS_SUMMARY_FILE, SNAPSHOT_MARKER, ZIP_SUMMARY_DIR
+from utils import lookup_filter, read_partitioned, write_partitioned, zip_state, pws_state
+
+console = Console()
+
+HIGHER_IS_BETTER = {'mean_us': False, 'p99_us': False, 'load_s': False, 'index_mb': False}
+
+
+def write_gold(gold_dir: Path, zip_codes: int):
+    """Synthetic gold snapshot in step 4's layout."""
+    complete_df, details_df, zip_summary = make_gold(zip_codes)
+    pws_summary = details_df.groupby('pws_id', as_index=False).agg(people_served=('people_served', 'first'))
+    pws_summary.to_parquet(gold_dir / PWS_SUMMARY_FILE, index=False)
+    complete_state = zip_state(complete_df['zip_code']).fillna(pws_state(complete_df['pws_id']))
+    write_partitioned(complete_df.assign(state=complete_state), gold_dir / COMPLETE_DIR, ['zip_code', 'pws_id'])
+    write_partitioned(details_df.assign(state=pws_state(details_df['pws_id'])), gold_dir / DETAILS_DIR, ['pws_id'])
+    write_partitioned(zip_summary.assign(state=zip_state(zip_summary['zip_code'])), gold_dir / ZIP_SUMMARY_DIR,
+                      ['zip_code'])
+    (gold_dir / SNAPSHOT_MARKER).write_text(json.dumps({'total_records': len(complete_df)}))
+
+
+def time_queries(query: Callable[[str], object], keys: List[str]) -> Tuple[float, float, List]:
+    """Mean and p99 microseconds per query, and the answers."""
+    answers, micros = [], []
+    for key in keys:
+        start = time.perf_counter()
+        answers.append(query(key))
+        micros.append((time.perf_counter() - start) * 1e6)
+    return statistics.mean(micros), float(np.percentile(micros, 99)), answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--zip-codes', type=int, default=30_000, help='Synthetic ZIP codes')
+    parser.add_argument('--lookups', type=int, default=2_000, help='Random queries per kind (dataset reads: 100)')
+    _baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="ewg-lookup-") as tmp_dir:
+        gold_dir = Path(tmp_dir)
+        write_gold(gold_dir, args.zip_codes)
+
+        start = time.perf_counter()
+        service = LookupService(gold_dir, cache_size=2 * args.lookups)
+        load_s = time.perf_counter() - start
+        counts = service.index.counts()
+        results['load'] = {'load_s': round(load_s, 3), 'index_mb': round(counts['column_bytes'] / 1024 / 1024, 3)}
+        console.print(
+            f"[cyan]Indexed {counts['zip_codes']:,} ZIP codes, {counts['water_systems']:,} PWS and "
+            f"{counts['contaminant_rows']:,} contaminant rows in {load_s:.2f}s[/cyan]"
+        )
+
+        rng = np.random.default_rng(1)
+        zip_keys, pws_keys = service.index.keys()
+        kinds = {
+            'ZIP': (
+                [str(key) for key in rng.choice(zip_keys, args.lookups)],
+                lambda key: read_partitioned(gold_dir / COMPLETE_DIR, lookup_filter(zip_code=key)),
+                service.index.zip_code, service.zip_code,
+                lambda answer: sum(len(system['contaminants']) for system in answer['water_systems']),
+            ),
+            'PWS': (
+                [str(key) for key in rng.choice(pws_keys, args.lookups)],
+                lambda key: read_partitioned(gold_dir / DETAILS_DIR, lookup_filter(pws_id=key)),
+                service.index.system, service.system,
+                lambda answer: len(answer['contaminants']),
+            ),
+        }
+
+        table = Table(title=f"Gold lookups ({args.lookups:,} queries per kind, dataset reads: 100)")
+        table.add_column("Query", style="cyan")
+        table.add_column("Way")
+        table.add_column("Mean µs", justify="right", style="green")
+        table.add_column("p99 µs", justify="right")
+        failed = False
+        for kind, (keys, dataset_query, index_query, cached_query, contaminant_rows) in kinds.items():
+            dataset_mean, dataset_p99, frames = time_queries(dataset_query, keys[:100])
+            index_mean, index_p99, answers = time_queries(index_query, keys)
+            # First pass fills the cache, the timed pass only hits it
+            time_queries(cached_query, keys)
+            cached_mean, cached_p99, cached = time_queries(cached_query, keys)
+            for way, mean, p99 in (('dataset', dataset_mean, dataset_p99), ('index', index_mean, index_p99),
+                                   ('cached', cached_mean, cached_p99)):
+                results[f"{kind} / {way}"] = {'mean_us': round(mean, 2), 'p99_us': round(p99, 2)}
+                table.add_row(kind, way, f"{mean:,.1f}", f"{p99:,.1f}")
+
+            if ([len(frame) for frame in frames] != [contaminant_rows(answer) for answer in answers[:100]]
+                    or cached != answers):
+                console.print(f"[bold red]✗ {kind}: the index and the datasets disagree[/bold red]")
+                failed = True
+
+    console.print(table)
+    if failed:
+        sys.exit(1)
+    _baseline.finish(console, 'lookup', results, HIGHER_IS_BETTER, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the per-page and per-dataset hot paths over the fixture corpus.
+
+Times ``parse_pws_from_html`` and ``parse_pws_details`` on every corpus page,
+``flatten_pws_data`` and ``normalize_pws_details`` on the parsed details, and
+``create_contaminants_reference`` on the normalized table repeated
+``--scale`` times under distinct PWS IDs (to approach full-run sizes). Each
+case reports the best of ``--repeat`` runs and is compared to the stored
+baseline; the script exits non-zero when a case is slower than the baseline
+by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/bench_micro.py
+    python benchmarks/bench_micro.py --save-baseline
+    python benchmarks/bench_micro.py --engine bs4 --repeat 5 --tolerance 0.1
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+import pandas as pd
+from rich.console import Console
+from rich.table import Table
+sys.path.append(str(Path(__file__).parent))
+
+import _baseline
+from _scripts import load_script
+from fixtures import FIXTURES_DIR, load_corpus
+from parsers import parse_pws_from_html, parse_pws_details, normalize_pws_details, DETAIL_PARSER_ENGINES
+
+console = Console()
+
+# Only throughput is compared to the baseline (ms/call is the same number inverted)
+HIGHER_IS_BETTER = {'items_per_second': True}
+
+
+def best_of(repeat: int, func: Callable, *args) -> Tuple[object, float]:
+    """Result of the last run and the best wall time over ``repeat`` runs."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def scale_details(details_df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """Repeat a details table ``scale`` times with distinct PWS IDs."""
+    copies = [details_df.assign(pws_id=details_df['pws_id'] + f"-{i}") for i in range(scale)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Corpus directory')
+    parser.add_argument('--engine', choices=sorted(DETAIL_PARSER_ENGINES), default='lxml', help='Parser engine')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per case (best is reported)')
+    parser.add_argument('--scale', type=int, default=20, help='Copies of the details table for the reference build')
+    _baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.fixtures)
+    if not corpus.search_pages or not corpus.system_pages:
+        console.print("[bold red]Corpus needs both search and system pages[/bold red]")
+        sys.exit(1)
+    console.print(
+        f"[cyan]Corpus: {len(corpus.search_pages):,} search pages, {len(corpus.system_pages):,} system pages "
+        f"({corpus.size_bytes / 1024 / 1024:.1f} MB)[/cyan]"
+    )
+    details_step = load_script("03_scrape_pws_details.py")
+    consolidate = load_script("04_consolidate_data.py")
+
+    search_pages = list(corpus.search_pages.items())
+    system_pages = list(corpus.system_pages.items())
+
+    def parse_search():
+        return [parse_pws_from_html(body, zip_code, args.engine) for zip_code, body in search_pages]
+
+    def parse_systems():
+        return [parse_pws_details(body, pws_id, args.engine) for pws_id, body in system_pages]
+
+    results: Dict[str, Dict[str, float]] = {}
+    table = Table(title=f"Microbenchmarks ({args.engine} parsers, best of {args.repeat})")
+    table.add_column("Case", style="cyan")
+    table.add_column("Items", justify="right")
+    table.add_column("ms/call", justify="right")
+    table.add_column("Items/s", justify="right", style="green")
+    table.add_column("µs/item", justify="right")
+
+    def run(case: str, func: Callable, items: int, unit: str, *func_args):
+        result, seconds = best_of(args.repeat, func, *func_args)
+        results[case] = {'ms_per_call': round(seconds * 1000, 3), 'items_per_second': round(items / seconds, 1)}
+        table.add_row(case, f"{items:,} {unit}", f"{seconds * 1000:,.1f}", f"{items / seconds:,.0f}",
+                      f"{seconds / items * 1e6:,.1f}")
+        return result
+
+    run('parse_pws_from_html', parse_search, len(search_pages), 'pages')
+    details = run('parse_pws_details', parse_systems, len(system_pages), 'pages')
+    details_df = run('flatten_pws_data', details_step.flatten_pws_data, len(details), 'systems', details)
+    details_df = run('normalize_pws_details', normalize_pws_details, len(details_df), 'rows', details_df)
+    scaled_df = scale_details(details_df, args.scale)
+    run('create_contaminants_reference', consolidate.create_contaminants_reference, len(scaled_df), 'rows',
+        scaled_df)
+
+    console.print(table)
+    _baseline.finish(console, 'micro', results, HIGHER_IS_BETTER, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Parser equivalence check and microbenchmark over archived pages.
+
+Every engine is run on the same saved pages; any record that differs from the
+reference engine is reported and the script exits non-zero. Throughput is
+reported as pages parsed per second for each engine.
+
+Usage:
+    python benchmarks/bench_parsers.py --archive data/bronze/pages/search_results
+    python benchmarks/bench_parsers.py --kind system --archive data/bronze/pages/system
+    python benchmarks/bench_parsers.py --pages-dir saved_pages/ --repeat 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlparse, parse_qs
+from rich.console import Console
+from rich.table import Table
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import PageStore
+from parsers import SEARCH_PARSER_ENGINES, DETAIL_PARSER_ENGINES
+
+console = Console()
+
+# page kind -> (engines, reference engine, URL query parameter holding the item ID)
+PAGE_KINDS: Dict[str, Tuple[Dict[str, Callable], str, str]] = {
+    'search': (SEARCH_PARSER_ENGINES, 'bs4', 'zip5'),
+    'system': (DETAIL_PARSER_ENGINES, 'bs4', 'pws'),
+}
+
+
+def load_pages(args: argparse.Namespace, id_param: str) -> List[Tuple[str, bytes]]:
+    """Load ``(item_id, body)`` pairs from a page archive or a directory of HTML files."""
+    pages = []
+    if args.archive:
+        store = PageStore(args.archive)
+        for url, body in store.iter_latest():
+            item_id = parse_qs(urlparse(url).query).get(id_param, [None])[0]
+            if item_id:
+                pages.append((item_id, body))
+            if args.limit and len(pages) >= args.limit:
+                break
+        store.close()
+    else:
+        # Files are named <item_id>.html
+        for path in sorted(Path(args.pages_dir).glob("*.html")):
+            pages.append((path.stem, path.read_bytes()))
+            if args.limit and len(pages) >= args.limit:
+                break
+    return pages
+
+
+def check_equivalence(
+    pages: List[Tuple[str, bytes]],
+    engines: Dict[str, Callable],
+    reference: str
+) -> int:
+    """Compare every engine to the reference engine; return the number of mismatching pages."""
+    mismatches = 0
+    for item_id, body in pages:
+        expected = engines[reference](body, item_id)
+        for name, parse in engines.items():
+            if name == reference:
+                continue
+            actual = parse(body, item_id)
+            if actual != expected:
+                mismatches += 1
+                if mismatches <= 5:
+                    console.print(f"[red]Mismatch for {item_id} ({name} vs {reference})[/red]")
+                    console.print(f"  {name}: {actual}")
+                    console.print(f"  {reference}: {expected}")
+    return mismatches
+
+
+def benchmark(pages: List[Tuple[str, bytes]], parse: Callable, repeat: int) -> float:
+    """Return the best pages-per-second over ``repeat`` runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item_id, body in pages:
+            parse(body, item_id)
+        best = min(best, time.perf_counter() - start)
+    return len(pages) / best if best else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--archive', help='PageStore directory with archived pages')
+    source.add_argument('--pages-dir', help='Directory of saved <item_id>.html pages')
+    parser.add_argument('--kind', choices=sorted(PAGE_KINDS), default='search', help='Page kind to parse')
+    parser.add_argument('--limit', type=int, default=0, help='Maximum number of pages to load')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per engine (best is reported)')
+    args = parser.parse_args()
+
+    engines, reference, id_param = PAGE_KINDS[args.kind]
+    pages = load_pages(args, id_param)
+    if not pages:
+        console.print("[bold red]No pages found[/bold red]")
+        sys.exit(1)
+    console.print(f"[cyan]Loaded {len(pages):,} {args.kind} pages[/cyan]")
+
+    mismatches = check_equivalence(pages, engines, reference)
+    if mismatches:
+        console.print(f"[bold red]✗ {mismatches:,} pages differ from the {reference} reference[/bold red]")
+    else:
+        console.print(f"[green]✓ All engines match the {reference} reference[/green]")
+
+    table = Table(title=f"{args.kind} parser throughput")
+    table.add_column("Engine", style="cyan")
+    table.add_column("Pages/s", justify="right", style="green")
+    table.add_column("ms/page", justify="right")
+    table.add_column("Speedup", justify="right")
+
+    rates = {name: benchmark(pages, parse, args.repeat) for name, parse in engines.items()}
+    for name, rate in rates.items():
+        table.add_row(name, f"{rate:,.0f}", f"{1000 / rate:.3f}", f"{rate / rates[reference]:.1f}x")
+    console.print(table)
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of steps 2-4 against the local stub server.
+
+Starts ``stub_server.py`` with the chosen profile in a subprocess, writes the
+corpus ZIP codes as the step 1 output in a scratch directory and runs
+steps 2, 3 and 4 there with the stub as ``EWG_BASE_URL``. Rate limits are
+raised to ``--concurrency`` / ``--rate`` so the run measures the pipeline
+rather than the politeness limits (``--adaptive`` keeps the adaptive
+controller with those as ceilings). Reported per step, from the steps' own
+metrics:
+
+    pages/s        pages fetched and parsed per second of scraping
+    parse ms       mean and p90 time to parse one page in a worker
+    write s        part files written plus compaction (step 4: all of it)
+    peak RSS       high-water mark of this process so far, and of the
+                   largest parse worker
+
+The results are compared to the stored baseline; the script exits non-zero
+when a metric is worse than the baseline by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --profile realistic --concurrency 50 --save-baseline
+    python benchmarks/bench_pipeline.py --profile throttle --adaptive --keep
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional
+import pandas as pd
+from rich.console import Console
+from rich.table import Table
+sys.path.append(str(Path(__file__).parent))
+
+import _baseline
+from _scripts import load_script
+from fixtures import FIXTURES_DIR, corpus_zip_codes
+from stub_server import PROFILES
+from utils import Metrics, create_metrics
+
+console = Console()
+
+STUB_SERVER = Path(__file__).parent / "stub_server.py"
+
+HIGHER_IS_BETTER = {
+    'pages_per_second': True,
+    'parse_ms_per_page': False,
+    'write_seconds': False,
+    'peak_rss_mb': False,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def start_stub_server(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    """Start the stub server and wait until it answers."""
+    process = subprocess.Popen(
+        [sys.executable, str(STUB_SERVER), '--profile', args.profile, '--port', str(port),
+         '--fixtures', str(args.fixtures)],
+        stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Stub server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f"http://localhost:{port}/__stats", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Stub server did not start within 60 s")
+
+
+def stub_stats(port: int) -> Dict[str, int]:
+    with urllib.request.urlopen(f"http://localhost:{port}/__stats", timeout=5) as response:
+        return json.load(response)
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def histogram_mean(metrics: Metrics, name: str) -> Optional[float]:
+    """Mean of a histogram over all of its label sets."""
+    summary = metrics.summary()['metrics'].get(f"{metrics.namespace}_{name}")
+    if summary is None:
+        return None
+    entries = [summary] if 'count' in summary else list(summary.values())
+    count = sum(entry['count'] for entry in entries)
+    return sum(entry['sum'] for entry in entries) / count if count else None
+
+
+def configure(module, base_url: str, args: argparse.Namespace):
+    """Point a scraping step at the stub and lift its rate limits."""
+    module.EWG_BASE_URL = base_url
+    module.ADAPTIVE_RATE = args.adaptive
+    module.MAX_CONCURRENT = args.concurrency
+    module.RATE_LIMIT = args.rate
+    module.CONCURRENCY_RANGE = (1, args.concurrency)
+    module.RATE_RANGE = (1.0, args.rate)
+
+
+def step_results(metrics: Metrics, elapsed: float) -> Dict[str, float]:
+    pages = metrics.value('items_total')
+    scrape_seconds = metrics.value('stage_duration_seconds', phase='scrape') or elapsed
+    parse_mean = histogram_mean(metrics, 'parse_duration_seconds')
+    parse_p90 = metrics.histogram('parse_duration_seconds').quantile(0.9)
+    return {
+        'pages': pages,
+        'requests': metrics.value('http_requests_total'),
+        'retries': metrics.value('http_retries_total'),
+        'pages_per_second': round(pages / scrape_seconds, 2) if scrape_seconds else 0.0,
+        'parse_ms_per_page': round(parse_mean * 1000, 3) if parse_mean is not None else 0.0,
+        'parse_p90_ms': round(parse_p90 * 1000, 3) if parse_p90 is not None else 0.0,
+        'write_seconds': round(
+            metrics.value('part_write_seconds_total') + metrics.value('stage_duration_seconds', phase='compact'), 3
+        ),
+        'wall_seconds': round(elapsed, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+async def run_pipeline(args: argparse.Namespace, base_url: str) -> Dict[str, Dict[str, float]]:
+    step2 = load_script("02_scrape_pws_by_zip.py")
+    step3 = load_script("03_scrape_pws_details.py")
+    step4 = load_script("04_consolidate_data.py")
+    for module in (step2, step3):
+        configure(module, base_url, args)
+    # Every corpus ZIP code is fetched, not only those in live prefixes
+    step2.FULL_SWEEP = True
+
+    results = {}
+    for name, module, stage in (('step2', step2, step2.PWS_CHECKPOINT), ('step3', step3, step3.PWS_DETAILS_CHECKPOINT)):
+        metrics = create_metrics(stage)
+        start = time.perf_counter()
+        await module.main(metrics=metrics)
+        results[name] = step_results(metrics, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    step4.main()
+    elapsed = time.perf_counter() - start
+    results['step4'] = {'write_seconds': round(elapsed, 3), 'wall_seconds': round(elapsed, 3),
+                        'peak_rss_mb': round(peak_rss_mb(), 1)}
+    # Parse workers have been reaped; the stub server is still running
+    results['parse_workers'] = {'peak_rss_mb': round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1)}
+    return results
+
+
+def print_results(results: Dict[str, Dict[str, float]], stats: Dict[str, int]):
+    table = Table(title="Pipeline benchmark")
+    table.add_column("Step", style="cyan")
+    table.add_column("Pages", justify="right")
+    table.add_column("Requests (retries)", justify="right")
+    table.add_column("Pages/s", justify="right", style="green")
+    table.add_column("Parse ms (p90)", justify="right")
+    table.add_column("Write s", justify="right")
+    table.add_column("Wall s", justify="right")
+    table.add_column("Peak RSS MB", justify="right")
+
+    for step, row in results.items():
+        def cell(key: str, fmt: str = "{:,.0f}") -> str:
+            return fmt.format(row[key]) if key in row else "-"
+        table.add_row(
+            step,
+            cell('pages'),
+            f"{row['requests']:,.0f} ({row['retries']:,.0f})" if 'requests' in row else "-",
+            cell('pages_per_second', "{:,.1f}"),
+            f"{row['parse_ms_per_page']:.2f} ({row['parse_p90_ms']:.2f})" if 'parse_ms_per_page' in row else "-",
+            cell('write_seconds', "{:.2f}"),
+            cell('wall_seconds', "{:.1f}"),
+            cell('peak_rss_mb', "{:,.0f}"),
+        )
+    console.print(table)
+    console.print(f"[dim]Stub responses by status: {stats}[/dim]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Corpus directory')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='fast', help='Stub server profile')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent requests per step')
+    parser.add_argument('--rate', type=float, default=1000.0, help='Requests per second per step')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Keep the adaptive controller (with --concurrency / --rate as ceilings)')
+    parser.add_argument('--work-dir', type=Path, help='Scratch directory (a temporary one by default)')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch directory and its output')
+    _baseline.add_arguments(parser)
+    args = parser.parse_args()
+    args.fixtures = args.fixtures.resolve()
+    args.baseline = args.baseline.resolve()
+
+    zip_codes = corpus_zip_codes(args.fixtures)
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="ewg-bench-"))
+    shutil.rmtree(work_dir / "data", ignore_errors=True)
+    (work_dir / "data" / "bronze").mkdir(parents=True)
+    pd.DataFrame({'zip_code': zip_codes}).to_parquet(work_dir / "data" / "bronze" / "us_zip_codes.parquet")
+    console.print(f"[cyan]Benchmarking {len(zip_codes):,} ZIP codes with the {args.profile} profile in {work_dir}[/cyan]")
+
+    port = free_port()
+    server = start_stub_server(args, port)
+    cwd = Path.cwd()
+    try:
+        os.chdir(work_dir)
+        results = asyncio.run(run_pipeline(args, f"http://localhost:{port}"))
+        stats = stub_stats(port)
+    finally:
+        os.chdir(cwd)
+        server.terminate()
+        server.wait()
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results, stats)
+    _baseline.finish(console, f"pipeline-{args.profile}", results, HIGHER_IS_BETTER, args)
+
+
+if __name__ == "__main__":
+    main()
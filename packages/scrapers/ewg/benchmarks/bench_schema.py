@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Size and scan times of the details table in the legacy and the typed layout.
+
+Parses the corpus system pages, flattens them (repeated ``--scale`` times
+under distinct PWS IDs, to approach full-run sizes) and writes
+``pws_water_quality.parquet`` twice: in the legacy layout (measurements as
+display strings, ``|``-joined sources and filters, plain strings) and in the
+current step 3 schema and codec (floats plus ``unit``, ``list<string>``,
+dictionary-encoded text, zstd). Reported per layout, best of ``--repeat``:
+
+    size MB        file size on disk
+    memory MB      pandas memory of the fully read table
+    pandas ms      pd.read_parquet of every column
+    arrow ms       pq.read_table of every column
+    exceed ms      rows whose utility level is above the health guideline
+                   (the legacy layout has to parse the display strings)
+    sources ms     rows per pollution source (legacy: split the strings)
+
+The two queries read only their columns, with Arrow.
+
+Both layouts must give the same query answers. The results are compared to
+the stored baseline; the script exits non-zero when the answers differ or a
+metric is worse than the baseline by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/bench_schema.py
+    python benchmarks/bench_schema.py --scale 50 --save-baseline
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from rich.console import Console
+from rich.table import Table
+sys.path.append(str(Path(__file__).parent))
+
+import _baseline
+from _scripts import load_script
+from bench_micro import best_of, scale_details
+from fixtures import FIXTURES_DIR, load_corpus
+from parsers import parse_pws_details, normalize_pws_details, parse_measurements
+
+console = Console()
+
+HIGHER_IS_BETTER = {
+    'size_mb': False,
+    'memory_mb': False,
+    'pandas_ms': False,
+    'arrow_ms': False,
+    'exceed_ms': False,
+    'sources_ms': False,
+}
+
+# Step 3 schema before measurements were typed
+LEGACY_SCHEMA = pa.schema([
+    ('pws_id', pa.string()),
+    ('location', pa.string()),
+    ('source_water', pa.string()),
+    ('people_served', pa.int64()),
+    ('compliance_status', pa.bool_()),
+    ('last_updated', pa.string()),
+    ('num_contaminants_exceed', pa.int64()),
+    ('num_contaminants_other', pa.int64()),
+    ('exceeds_guidelines', pa.bool_()),
+    ('contaminant_name', pa.string()),
+    ('potential_effect', pa.string()),
+    ('utility_level', pa.string()),
+    ('legal_limit', pa.string()),
+    ('times_above_guideline', pa.string()),
+    ('health_guideline', pa.string()),
+    ('pollution_sources', pa.string()),
+    ('filter_options', pa.string()),
+])
+
+
+def write_layout(df: pd.DataFrame, schema: pa.Schema, path: Path, compression: str):
+    table = pa.Table.from_pandas(df.reindex(columns=schema.names), schema=schema, preserve_index=False)
+    pq.write_table(table, path, compression=compression)
+
+
+def exceed_legacy(path: Path) -> int:
+    table = pq.read_table(path, columns=['utility_level', 'health_guideline'])
+    level = parse_measurements(table.column('utility_level').to_pandas())
+    guideline = parse_measurements(table.column('health_guideline').to_pandas())
+    return int(((level['value'] > guideline['value']) & (level['unit'] == guideline['unit'])).sum())
+
+
+def exceed_typed(path: Path) -> int:
+    table = pq.read_table(path, columns=['utility_level', 'health_guideline'])
+    return pc.sum(pc.greater(table.column('utility_level'), table.column('health_guideline'))).as_py() or 0
+
+
+def count_values(values: pa.Array) -> Dict[str, int]:
+    return {entry['values'].as_py(): entry['counts'].as_py() for entry in pc.value_counts(values)}
+
+
+def sources_legacy(path: Path) -> Dict[str, int]:
+    sources = pq.read_table(path, columns=['pollution_sources']).column('pollution_sources')
+    values = pc.list_flatten(pc.split_pattern(sources, '|'))
+    return count_values(values.filter(pc.not_equal(values, '')))
+
+
+def sources_typed(path: Path) -> Dict[str, int]:
+    sources = pq.read_table(path, columns=['pollution_sources']).column('pollution_sources')
+    return count_values(pc.list_flatten(sources))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Corpus directory')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per case (best is reported)')
+    parser.add_argument('--scale', type=int, default=20, help='Copies of the details table')
+    _baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.fixtures)
+    if not corpus.system_pages:
+        console.print("[bold red]Corpus has no system pages[/bold red]")
+        sys.exit(1)
+    details_step = load_script("03_scrape_pws_details.py")
+
+    details = [parse_pws_details(body, pws_id) for pws_id, body in corpus.system_pages.items()]
+    raw_df = scale_details(details_step.flatten_pws_data(details), args.scale)
+    legacy_df = raw_df.assign(**{
+        column: ['|'.join(value) if isinstance(value, list) else None for value in raw_df[column]]
+        for column in ('pollution_sources', 'filter_options')
+    })
+    typed_df = normalize_pws_details(raw_df)
+    console.print(f"[cyan]{len(raw_df):,} detail rows from {len(details):,} system pages x {args.scale}[/cyan]")
+
+    layouts = {
+        'legacy': (legacy_df, LEGACY_SCHEMA, 'snappy', exceed_legacy, sources_legacy),
+        'typed': (typed_df, details_step.PWS_DETAILS_SCHEMA, details_step.PWS_DETAILS_COMPRESSION,
+                  exceed_typed, sources_typed),
+    }
+    def timed_ms(func: Callable, *func_args):
+        result, seconds = best_of(args.repeat, func, *func_args)
+        return result, round(seconds * 1000, 3)
+
+    results: Dict[str, Dict[str, float]] = {}
+    answers = {}
+    with tempfile.TemporaryDirectory(prefix="ewg-schema-") as tmp_dir:
+        for layout, (df, schema, compression, exceed, sources) in layouts.items():
+            path = Path(tmp_dir) / f"{layout}.parquet"
+            write_layout(df, schema, path, compression)
+            full_df, pandas_ms = timed_ms(pd.read_parquet, path)
+            _, arrow_ms = timed_ms(pq.read_table, path)
+            exceeding, exceed_ms = timed_ms(exceed, path)
+            counts, sources_ms = timed_ms(sources, path)
+            answers[layout] = (exceeding, counts)
+            results[layout] = {
+                'size_mb': round(path.stat().st_size / 1024 / 1024, 3),
+                'memory_mb': round(full_df.memory_usage(deep=True).sum() / 1024 / 1024, 3),
+                'pandas_ms': pandas_ms,
+                'arrow_ms': arrow_ms,
+                'exceed_ms': exceed_ms,
+                'sources_ms': sources_ms,
+            }
+
+    table = Table(title=f"Details layouts ({len(raw_df):,} rows, best of {args.repeat})")
+    table.add_column("Layout", style="cyan")
+    for column in ("Size MB", "Memory MB", "Pandas ms", "Arrow ms", "Exceed ms", "Sources ms"):
+        table.add_column(column, justify="right")
+    for layout, row in results.items():
+        table.add_row(layout, *(f"{value:,.2f}" for value in row.values()))
+    legacy, typed = results['legacy'], results['typed']
+    table.add_row("[green]typed / legacy[/green]", *(
+        f"[green]{typed[key] / legacy[key]:.2f}x[/green]" if legacy[key] else "-" for key in legacy
+    ))
+    console.print(table)
+
+    if answers['legacy'] != answers['typed']:
+        console.print("[bold red]✗ The layouts give different query answers[/bold red]")
+        sys.exit(1)
+    _baseline.finish(console, 'schema', results, HIGHER_IS_BETTER, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Page corpus for the offline benchmarks: recorded EWG pages or synthetic ones.
+
+The corpus lives in two page archives under ``benchmarks/fixtures/``
+(``search_results`` and ``system``, the same layout as
+``data/bronze/pages``) and is served by ``stub_server.py`` and parsed by
+``bench_micro.py``. ``record`` samples pages from a scraper's page archive:
+search pages at random, then the system pages of the water systems they
+list. ``synthetic`` generates EWG-shaped markup (hero sections, result
+tables, contaminant cards, page boilerplate) for machines without an
+archive; the corpus is deterministic for a given seed.
+
+Recorded pages stay out of version control (``fixtures/`` is ignored);
+record them on the machine that runs the benchmarks.
+
+Usage:
+    python benchmarks/fixtures.py record --archive data/bronze/pages
+    python benchmarks/fixtures.py record --archive data/bronze/pages --search-pages 1000 --system-pages 500
+    python benchmarks/fixtures.py synthetic --zip-codes 400 --seed 7
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+from rich.console import Console
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import PageStore
+from parsers import parse_pws_from_html
+
+console = Console()
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# URLs under which pages are archived (the scrapers' own URL patterns)
+SEARCH_URL = "https://www.ewg.org/tapwater/search-results.php?zip5={zip_code}"
+SYSTEM_URL = "https://www.ewg.org/tapwater/system.php?pws={pws_id}"
+
+STATES = ['CA', 'NJ', 'NY', 'TX', 'FL', 'OH', 'PA', 'IL', 'WA', 'GA']
+CONTAMINANTS = [
+    'Arsenic', 'Bromodichloromethane', 'Chloroform', 'Chromium (hexavalent)', 'Dibromochloromethane',
+    'Haloacetic acids (HAA5)', 'Haloacetic acids (HAA9)', 'Nitrate', 'Radium, combined (-226 & -228)',
+    'Total trihalomethanes (TTHMs)', 'Uranium', 'Perfluorooctanoic acid (PFOA)',
+    'Perfluorooctane sulfonate (PFOS)', '1,4-Dioxane', 'Lead', 'Manganese', 'Fluoride', 'Barium',
+    'Selenium', 'Strontium', 'Vanadium', 'Bromoform', 'Dichloroacetic acid', 'Trichloroacetic acid',
+]
+EFFECTS = ['cancer', 'harm to the nervous system', 'hormone disruption', 'harm to fetal growth and child development']
+SOURCES = ['Agriculture', 'Industry', 'Treatment byproducts', 'Naturally occurring', 'Urban runoff']
+FILTERS = ['Reverse osmosis', 'Activated carbon', 'Ion exchange', 'Distillation']
+
+
+@dataclass
+class Corpus:
+    """Page bodies keyed by ZIP code (search results) and PWS ID (system pages)."""
+    search_pages: Dict[str, bytes]
+    system_pages: Dict[str, bytes]
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(map(len, self.search_pages.values())) + sum(map(len, self.system_pages.values()))
+
+
+def _item_id(url: str, param: str) -> Optional[str]:
+    return parse_qs(urlparse(url).query).get(param, [None])[0]
+
+
+def _iter_pages(archive: Path, param: str) -> Iterator[Tuple[str, bytes]]:
+    store = PageStore(archive)
+    try:
+        for url, body in store.iter_latest():
+            item_id = _item_id(url, param)
+            if item_id:
+                yield item_id, body
+    finally:
+        store.close()
+
+
+def ensure_corpus(root: Path = FIXTURES_DIR):
+    """Generate the default synthetic corpus if none was recorded."""
+    if not (root / "search_results" / "index.jsonl").exists():
+        console.print(f"[yellow]No corpus in {root}; generating a synthetic one[/yellow]")
+        save_corpus(generate_corpus(), root)
+
+
+def corpus_zip_codes(root: Path = FIXTURES_DIR) -> List[str]:
+    """ZIP codes with a search page in the corpus, read from the index without loading pages."""
+    ensure_corpus(root)
+    zip_codes = set()
+    with open(root / "search_results" / "index.jsonl") as f:
+        for line in f:
+            zip_code = _item_id(json.loads(line)['url'], 'zip5')
+            if zip_code:
+                zip_codes.add(zip_code)
+    return sorted(zip_codes)
+
+
+def load_corpus(root: Path = FIXTURES_DIR) -> Corpus:
+    """Load the corpus, generating a default synthetic one if none was recorded."""
+    ensure_corpus(root)
+    return Corpus(
+        search_pages=dict(_iter_pages(root / "search_results", 'zip5')),
+        system_pages=dict(_iter_pages(root / "system", 'pws')),
+    )
+
+
+def save_corpus(corpus: Corpus, root: Path = FIXTURES_DIR):
+    """Replace the corpus archives under ``root``."""
+    for kind, pages, url in (
+        ('search_results', corpus.search_pages, SEARCH_URL),
+        ('system', corpus.system_pages, SYSTEM_URL),
+    ):
+        shutil.rmtree(root / kind, ignore_errors=True)
+        with PageStore(root / kind) as store:
+            for item_id, body in sorted(pages.items()):
+                store.put(url.format(zip_code=item_id, pws_id=item_id), body)
+
+
+def record_corpus(archive: Path, search_pages: int, system_pages: int, seed: int = 0) -> Corpus:
+    """
+    Sample recorded pages from a scraper page archive.
+
+    Args:
+        archive: ``data/bronze/pages`` (holding ``search_results`` and ``system``)
+        search_pages: Number of search pages to sample
+        system_pages: Number of system pages; those of water systems listed
+            on the sampled search pages come first
+        seed: Sampling seed
+    """
+    rng = random.Random(seed)
+    # Reservoir sample so the archive is streamed once
+    sampled: List[Tuple[str, bytes]] = []
+    for seen, page in enumerate(_iter_pages(archive / "search_results", 'zip5')):
+        if len(sampled) < search_pages:
+            sampled.append(page)
+        else:
+            slot = rng.randint(0, seen)
+            if slot < search_pages:
+                sampled[slot] = page
+
+    listed = {pws['pws_id'] for zip_code, body in sampled for pws in parse_pws_from_html(body, zip_code)}
+    listed_pages: Dict[str, bytes] = {}
+    other_pages: List[Tuple[str, bytes]] = []
+    for pws_id, body in _iter_pages(archive / "system", 'pws'):
+        if pws_id in listed:
+            if len(listed_pages) < system_pages:
+                listed_pages[pws_id] = body
+        elif len(other_pages) < system_pages:
+            other_pages.append((pws_id, body))
+    fill = rng.sample(other_pages, min(len(other_pages), system_pages - len(listed_pages)))
+    return Corpus(search_pages=dict(sampled), system_pages={**listed_pages, **dict(fill)})
+
+
+def _boilerplate(rng: random.Random, kilobytes: int) -> Tuple[str, str]:
+    """Header and footer markup (navigation, inline scripts) of about ``kilobytes``."""
+    nav = ''.join(
+        f'<li class="menu-item"><a href="/tapwater/topic-{i}.php">Topic {i}</a></li>' for i in range(40)
+    )
+    paragraphs = []
+    size = 0
+    while size < kilobytes * 1024:
+        words = ' '.join(rng.choice(['water', 'utility', 'tap', 'health', 'filter', 'report']) for _ in range(40))
+        paragraph = f'<p class="body-copy">{words}.</p>'
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    header = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>EWG Tap Water Database</title>'
+        '<script>window.dataLayer = window.dataLayer || []; var ewg = {"site": "tapwater"};</script>'
+        '<link rel="stylesheet" href="/tapwater/css/main.css"></head><body>'
+        f'<header class="site-header"><nav><ul class="menu">{nav}</ul></nav></header>'
+    )
+    footer = (
+        f'<section class="about">{"".join(paragraphs)}</section>'
+        '<footer class="site-footer"><p>&copy; Environmental Working Group</p></footer></body></html>'
+    )
+    return header, footer
+
+
+def render_search_page(rng: random.Random, listings: List[Dict], boilerplate_kb: int = 24) -> str:
+    """Search-results page with the first listing featured (no tables when empty)."""
+    header, footer = _boilerplate(rng, boilerplate_kb)
+    if not listings:
+        return f'{header}<main><p class="no-results">No results found for this ZIP code.</p></main>{footer}'
+
+    def row(pws: Dict) -> str:
+        return (
+            f'<tr><td data-label="Utility"><a href="system.php?pws={pws["pws_id"]}">'
+            f'{pws["utility_name"]} <span class="star">⭐</span></a></td>'
+            f'<td data-label="Location">{pws["location"]}</td>'
+            f'<td data-label="Population">Population served: {pws["people_served"]:,}</td></tr>'
+        )
+
+    head = '<thead><tr><th>Utility</th><th>City</th><th>People served</th></tr></thead>'
+    return (
+        f'{header}<main>'
+        f'<table class="featured-utility-table">{head}<tbody>{row(listings[0])}</tbody></table>'
+        f'<table class="search-results-table">{head}<tbody>{"".join(row(p) for p in listings[1:])}</tbody></table>'
+        f'</main>{footer}'
+    )
+
+
+def _contaminant_card(rng: random.Random, name: str) -> str:
+    sources = ''.join(f'<p>{s}</p>' for s in rng.sample(SOURCES, rng.randint(1, 3)))
+    filters = ''.join(f'<p>{f}</p>' for f in rng.sample(FILTERS, rng.randint(1, 2)))
+    legal_limit = rng.choice(['10 ppb', '80 ppb', '15 ppb', 'No legal limit'])
+    return (
+        '<div class="contaminant-grid-item"><section class="contaminant-data">'
+        f'<h3>{name}</h3><p class="potentital-effect">Potential Effect: {rng.choice(EFFECTS)}</p>'
+        f'<p class="detect-times-greater-than">{rng.randint(1, 900)}x</p>'
+        f'<p class="this-utility-text">This Utility: {rng.uniform(0.1, 50):.2f} ppb</p>'
+        f'<p class="health-guideline-text">EWG\'s Health Guideline: {rng.uniform(0.01, 5):.3f} ppb</p>'
+        f'<p class="legal-limit-text">Legal Limit: {legal_limit}</p>'
+        '<div class="contam-modal-wrapper"><div class="pollution-sources-modal-wrapper">'
+        f'<h4>Pollution Sources</h4><div><div>{sources}</div></div>'
+        f'<h4>Filtering Options</h4><div><div>{filters}</div></div>'
+        '</div></div></section></div>'
+    )
+
+
+def render_system_page(rng: random.Random, pws: Dict, boilerplate_kb: int = 96) -> str:
+    """System page with hero facts and exceeding / other contaminant cards."""
+    header, footer = _boilerplate(rng, boilerplate_kb)
+    names = rng.sample(CONTAMINANTS, rng.randint(2, 20))
+    split = rng.randint(0, len(names))
+    compliance = (
+        'This system was in compliance with federal health-based drinking water standards.'
+        if rng.random() < 0.9 else
+        'This system does not meet all federal health-based drinking water standards.'
+    )
+    hero = ''.join(
+        f'<section class="details-hero-sub-content"><h4>{label}</h4><h2>{value}</h2></section>'
+        for label, value in (
+            ('Location', pws['location']),
+            ('Source', rng.choice(['Surface water', 'Groundwater', 'Purchased surface water'])),
+            ('Population Served', f'{pws["people_served"]:,}'),
+        )
+    )
+    return (
+        f'{header}<main>{hero}<p class="compliance">{compliance}</p>'
+        f'<div id="contams_above_hbl">{"".join(_contaminant_card(rng, n) for n in names[:split])}</div>'
+        f'<div id="contams_other_detected">{"".join(_contaminant_card(rng, n) for n in names[split:])}</div>'
+        f'<p class="data-note">Data from {rng.randint(2017, 2020)}-{rng.randint(2021, 2023)}.</p>'
+        f'</main>{footer}'
+    )
+
+
+def generate_corpus(zip_codes: int = 400, found_rate: float = 0.6, seed: int = 0) -> Corpus:
+    """
+    Generate a synthetic corpus.
+
+    ZIP codes fall in a few three-digit prefixes; ``found_rate`` of them list
+    one to six water systems drawn from a shared pool, so most systems
+    appear under several ZIP codes as on the real site. Every listed system
+    gets a system page.
+    """
+    rng = random.Random(seed)
+    prefixes = sorted(rng.sample(range(10, 999), max(1, zip_codes // 50)))
+    codes = sorted({f"{rng.choice(prefixes):03d}{rng.randint(0, 99):02d}" for _ in range(zip_codes * 2)})[:zip_codes]
+
+    pool = []
+    for i in range(max(1, zip_codes // 2)):
+        state = rng.choice(STATES)
+        pool.append({
+            'pws_id': f"{state}{rng.randint(1000000, 9999999)}",
+            'utility_name': f"{rng.choice(['City of', 'Town of', 'Borough of'])} Springfield {i} Water &amp; Sewer",
+            'location': f"Springfield {i}, {state}",
+            'people_served': int(rng.lognormvariate(8, 2)) + 25,
+        })
+
+    search_pages = {}
+    listed: Dict[str, Dict] = {}
+    for zip_code in codes:
+        listings = rng.sample(pool, rng.randint(1, 6)) if rng.random() < found_rate else []
+        listed.update((pws['pws_id'], pws) for pws in listings)
+        search_pages[zip_code] = render_search_page(rng, listings).encode('utf-8')
+    system_pages = {
+        pws_id: render_system_page(rng, pws).encode('utf-8') for pws_id, pws in sorted(listed.items())
+    }
+    return Corpus(search_pages=search_pages, system_pages=system_pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # Options of both commands, given after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--output', type=Path, default=FIXTURES_DIR, help='Corpus directory')
+    common.add_argument('--seed', type=int, default=0, help='Sampling / generation seed')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', parents=[common], help='Sample pages from a scraper page archive')
+    record.add_argument('--archive', type=Path, default=Path("data/bronze/pages"),
+                        help='Directory holding the search_results and system archives')
+    record.add_argument('--search-pages', type=int, default=500, help='Search pages to sample')
+    record.add_argument('--system-pages', type=int, default=300, help='System pages to sample')
+    synthetic = commands.add_parser('synthetic', parents=[common], help='Generate EWG-shaped pages')
+    synthetic.add_argument('--zip-codes', type=int, default=400, help='Number of ZIP codes')
+    synthetic.add_argument('--found-rate', type=float, default=0.6, help='Share of ZIP codes listing water systems')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        if not (args.archive / "search_results").exists():
+            console.print(f"[bold red]Error: no search_results archive in {args.archive}[/bold red]")
+            sys.exit(1)
+        corpus = record_corpus(args.archive, args.search_pages, args.system_pages, args.seed)
+    else:
+        corpus = generate_corpus(args.zip_codes, args.found_rate, args.seed)
+
+    save_corpus(corpus, args.output)
+    console.print(
+        f"[green]✓ Saved {len(corpus.search_pages):,} search pages and {len(corpus.system_pages):,} system pages "
+        f"({corpus.size_bytes / 1024 / 1024:.1f} MB) to {args.output}[/green]"
+    )
+
+
+if __name__ == "__main__":
+    main()
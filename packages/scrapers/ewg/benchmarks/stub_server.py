@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for www.ewg.org that serves the benchmark page corpus.
+
+Search pages are served by ZIP code; ZIP codes outside the corpus get a page
+without results. System pages are served by PWS ID; IDs outside the corpus
+get a corpus page picked by a hash of the ID (the parser takes the ID from
+the request, so the records stay distinct). A profile shapes every
+response:
+
+    fast       no added latency
+    realistic  ~120 ms latency with jitter, rare 500s
+    errors     realistic latency, 10% 500s
+    throttle   realistic latency, 3% 429s with Retry-After
+    slow-body  realistic latency, bodies trickled out over ~1 s
+
+Request counts by status are served as JSON at ``/__stats``.
+
+Usage:
+    python benchmarks/stub_server.py --profile realistic --port 8766
+    python scripts/02_scrape_pws_by_zip.py --base-url http://localhost:8766
+"""
+import argparse
+import asyncio
+import random
+import sys
+import zlib
+from collections import Counter
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional
+from aiohttp import web
+from rich.console import Console
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fixtures import FIXTURES_DIR, Corpus, load_corpus, render_search_page
+
+console = Console()
+
+
+@dataclass(frozen=True)
+class Profile:
+    """How the stub delays and fails responses."""
+    latency: float = 0.0          # Mean seconds before the response starts
+    jitter: float = 0.0           # Latency is drawn uniformly from latency ± jitter
+    error_rate: float = 0.0       # Share of responses that are 500s
+    throttle_rate: float = 0.0    # Share of responses that are 429s
+    retry_after: int = 1          # Retry-After seconds sent with a 429
+    slow_body: float = 0.0        # Seconds spent trickling out each body
+    chunk_size: int = 16 * 1024   # Bytes per chunk when trickling
+
+
+PROFILES: Dict[str, Profile] = {
+    'fast': Profile(),
+    'realistic': Profile(latency=0.12, jitter=0.08, error_rate=0.002),
+    'errors': Profile(latency=0.12, jitter=0.08, error_rate=0.1),
+    'throttle': Profile(latency=0.12, jitter=0.08, throttle_rate=0.03, retry_after=1),
+    'slow-body': Profile(latency=0.12, jitter=0.08, slow_body=1.0),
+}
+
+
+class StubServer:
+    """aiohttp application serving a corpus under the EWG URL layout."""
+
+    def __init__(self, corpus: Corpus, profile: Profile, seed: int = 0):
+        """
+        Initialize stub server.
+
+        Args:
+            corpus: Pages to serve
+            profile: Latency and failure profile
+            seed: Seed for latency and failure draws
+        """
+        self.corpus = corpus
+        self.profile = profile
+        self.stats: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._system_ids = sorted(corpus.system_pages)
+        self._empty_page = render_search_page(random.Random(seed), []).encode('utf-8')
+        self._runner: Optional[web.AppRunner] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/tapwater/search-results.php', self._search)
+        app.router.add_get('/tapwater/system.php', self._system)
+        app.router.add_get('/__stats', self._stats)
+        return app
+
+    async def start(self, host: str = 'localhost', port: int = 8766):
+        """Start serving in the running event loop."""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _search(self, request: web.Request) -> web.StreamResponse:
+        zip_code = request.query.get('zip5', '')
+        return await self._respond(request, self.corpus.search_pages.get(zip_code, self._empty_page))
+
+    async def _system(self, request: web.Request) -> web.StreamResponse:
+        pws_id = request.query.get('pws', '')
+        body = self.corpus.system_pages.get(pws_id)
+        if body is None:
+            if not self._system_ids:
+                return await self._respond(request, None)
+            body = self.corpus.system_pages[self._system_ids[zlib.crc32(pws_id.encode()) % len(self._system_ids)]]
+        return await self._respond(request, body)
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response({str(status): count for status, count in sorted(self.stats.items())})
+
+    async def _respond(self, request: web.Request, body: Optional[bytes]) -> web.StreamResponse:
+        profile = self.profile
+        delay = max(0.0, profile.latency + self._rng.uniform(-profile.jitter, profile.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+
+        draw = self._rng.random()
+        if body is None:
+            status = 404
+        elif draw < profile.throttle_rate:
+            status = 429
+        elif draw < profile.throttle_rate + profile.error_rate:
+            status = 500
+        else:
+            status = 200
+        self.stats[status] += 1
+        if status == 429:
+            return web.Response(status=429, text="Too Many Requests", headers={'Retry-After': str(profile.retry_after)})
+        if status != 200:
+            return web.Response(status=status, text="Error")
+
+        if not profile.slow_body:
+            return web.Response(body=body, content_type='text/html', charset='utf-8')
+        response = web.StreamResponse(headers={'Content-Type': 'text/html; charset=utf-8'})
+        response.content_length = len(body)
+        await response.prepare(request)
+        chunks = range(0, len(body), profile.chunk_size)
+        pause = profile.slow_body / max(1, len(chunks))
+        for offset in chunks:
+            await response.write(body[offset:offset + profile.chunk_size])
+            await asyncio.sleep(pause)
+        await response.write_eof()
+        return response
+
+
+async def serve_forever(server: StubServer, host: str, port: int):
+    await server.start(host, port)
+    console.print(f"[green]Serving {len(server.corpus.search_pages):,} search and "
+                  f"{len(server.corpus.system_pages):,} system pages on http://{host}:{port}[/green]")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='fast', help='Latency and failure profile')
+    parser.add_argument('--latency', type=float, help='Override the profile latency (seconds)')
+    parser.add_argument('--error-rate', type=float, help='Override the profile 500 rate')
+    parser.add_argument('--throttle-rate', type=float, help='Override the profile 429 rate')
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Corpus directory')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--seed', type=int, default=0, help='Seed for latency and failure draws')
+    args = parser.parse_args()
+
+    overrides = {
+        name: value for name, value in (
+            ('latency', args.latency), ('error_rate', args.error_rate), ('throttle_rate', args.throttle_rate)
+        ) if value is not None
+    }
+    profile = replace(PROFILES[args.profile], **overrides)
+    server = StubServer(load_corpus(args.fixtures), profile, args.seed)
+    try:
+        asyncio.run(serve_forever(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""Low-latency lookups over the gold layer.
+
+``LookupService`` loads a step 4 snapshot into memory (``GoldIndex``) and
+answers ZIP code and PWS queries from it in process; ``python -m
+lookup.server`` serves the same queries over local HTTP.
+"""
+from .index import GoldIndex, ColumnStore, snapshot_id
+from .service import LookupService, normalize_zip_code, normalize_pws_id
+
+__all__ = ['GoldIndex', 'ColumnStore', 'snapshot_id', 'LookupService', 'normalize_zip_code', 'normalize_pws_id']
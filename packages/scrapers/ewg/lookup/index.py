@@ -0,0 +1,247 @@
+"""In-memory index of the gold layer for ZIP code and PWS lookups."""
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from utils import open_partitioned
+from utils.partitioning import PARTITION_COLUMN
+
+logger = logging.getLogger(__name__)
+
+# Written last by step 4, so its modification time identifies a complete snapshot
+SNAPSHOT_MARKER = "final_report.json"
+
+ZIP_SUMMARY_DIR = Path("by_state") / "zip_code_water_summary"
+COMPLETE_DIR = Path("by_state") / "ewg_water_quality_complete"
+DETAILS_DIR = Path("by_state") / "pws_water_quality"
+PWS_SUMMARY_FILE = Path("pws_summary.parquet")
+
+CONTAMINANT_COLUMNS = [
+    'contaminant_name', 'exceeds_guidelines', 'potential_effect', 'utility_level', 'legal_limit',
+    'times_above_guideline', 'health_guideline', 'unit', 'pollution_sources', 'filter_options',
+]
+
+# Joins list values into one string so Arrow can dictionary-encode list columns
+_LIST_SEPARATOR = '\x1f'
+
+
+def snapshot_id(gold_dir: Union[str, Path]) -> Optional[int]:
+    """Modification time (ns) of the snapshot marker, None before step 4 has run."""
+    try:
+        return (Path(gold_dir) / SNAPSHOT_MARKER).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class ColumnStore:
+    """
+    Read-only table kept as compact columns.
+
+    Float columns are arrays of doubles (NaN read back as None). Every other
+    column (strings, categories, ints, booleans, lists) is stored as int32
+    codes into its distinct values, which are Python objects built once, so
+    repeated names, units and source lists cost four bytes per row and
+    reading rows back allocates nothing but the row dicts. Columns are
+    ``array.array`` rather than numpy: slicing and indexing them yields
+    Python objects directly, which is what assembling a few rows costs.
+    """
+
+    def __init__(self, table: pa.Table):
+        """
+        Initialize column store.
+
+        Args:
+            table: Rows to store, in the order they are addressed by
+        """
+        self.names: List[str] = table.column_names
+        self.num_rows = table.num_rows
+        self._columns = [self._encode(table.column(name)) for name in self.names]
+
+    @staticmethod
+    def _encode(column: pa.ChunkedArray):
+        if pa.types.is_floating(column.type):
+            return array('d', column.to_numpy().astype(np.float64).tobytes()), None
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        is_list = pa.types.is_list(column.type) or pa.types.is_large_list(column.type)
+        if is_list:
+            column = pc.binary_join(column, _LIST_SEPARATOR)
+        encoded = pc.dictionary_encode(column).combine_chunks()
+        values = encoded.dictionary.to_pylist()
+        if is_list:
+            values = [value.split(_LIST_SEPARATOR) if value else [] for value in values]
+        # Nulls get their own code after the distinct values
+        codes = encoded.indices.fill_null(len(values)).to_numpy().astype(np.int32)
+        return array('i', codes.tobytes()), values + [None]
+
+    def rows(self, start: int, end: int) -> List[Dict]:
+        """Rows ``start`` to ``end`` (exclusive) as dicts."""
+        columns = []
+        for data, values in self._columns:
+            if values is None:
+                columns.append([None if value != value else value for value in data[start:end]])
+            else:
+                columns.append([values[code] for code in data[start:end]])
+        return [dict(zip(self.names, row)) for row in zip(*columns)]
+
+    def row(self, position: int) -> Dict:
+        """Row ``position`` as a dict."""
+        row = {}
+        for name, (data, values) in zip(self.names, self._columns):
+            value = data[position]
+            row[name] = (None if value != value else value) if values is None else values[value]
+        return row
+
+    def nbytes(self) -> int:
+        """Approximate memory of the stored columns, values excluded."""
+        return sum(data.itemsize * len(data) for data, _ in self._columns)
+
+
+def _offsets(groups: np.ndarray, num_groups: int) -> array:
+    """Start of each group's rows in rows sorted by group (plus the end), CSR style."""
+    return array('q', np.r_[0, np.cumsum(np.bincount(groups, minlength=num_groups))].astype(np.int64).tobytes())
+
+
+class GoldIndex:
+    """
+    One gold snapshot, indexed for point lookups.
+
+    Loads the ZIP code summary, the PWS summary and the contaminant rows
+    into ``ColumnStore`` tables and links them with offset arrays:
+
+    - ZIP code -> its row in the ZIP summary, whose slice
+      ``zip_pws[zip_offsets[row]:zip_offsets[row + 1]]`` lists the PWS rows
+      serving it (largest population first)
+    - ``pws_id`` -> its row in the PWS summary, whose contaminants are rows
+      ``contaminant_offsets[row]`` to ``contaminant_offsets[row + 1]`` of
+      the contaminant table (sorted by PWS)
+
+    A lookup is two dict probes plus slicing; nothing is read from disk.
+    The ZIP -> PWS links come from the complete dataset, so PWS without
+    scraped details are not listed under their ZIP codes.
+    """
+
+    def __init__(
+        self,
+        zip_summary: pa.Table,
+        pws_summary: pa.Table,
+        pairs: pa.Table,
+        contaminants: pa.Table,
+        snapshot: Optional[int] = None
+    ):
+        """
+        Initialize gold index.
+
+        Args:
+            zip_summary: ZIP code summary rows (``zip_code`` first)
+            pws_summary: PWS summary rows (``pws_id`` first)
+            pairs: ``zip_code``/``pws_id`` links, optionally with ``utility_name``
+            contaminants: Contaminant rows with ``pws_id``
+            snapshot: Identifier of the snapshot loaded (see ``snapshot_id``)
+        """
+        self.snapshot = snapshot
+        self.loaded_at = time.time()
+
+        zip_codes = zip_summary.column('zip_code').to_pylist()
+        self._zip_rows: Dict[str, int] = {zip_code: row for row, zip_code in enumerate(zip_codes)}
+        self._zips = ColumnStore(zip_summary)
+
+        # The search listing's utility name, which the details pages lack
+        pair_df = pairs.to_pandas().drop_duplicates(['zip_code', 'pws_id'])
+        if 'utility_name' in pair_df.columns:
+            names = pair_df.drop_duplicates('pws_id').set_index('pws_id')['utility_name']
+            utility_name = pa.array(names.reindex(pws_summary.column('pws_id').to_pandas()).to_numpy(),
+                                    type=pa.string(), from_pandas=True)
+            pws_summary = pws_summary.append_column('utility_name', utility_name)
+        pws_ids = pws_summary.column('pws_id').to_pylist()
+        self._pws_rows: Dict[str, int] = {pws_id: row for row, pws_id in enumerate(pws_ids)}
+        self._systems = ColumnStore(pws_summary)
+
+        # ZIP -> PWS rows, largest population first within each ZIP
+        zip_row = pair_df['zip_code'].map(self._zip_rows)
+        pws_row = pair_df['pws_id'].map(self._pws_rows)
+        known = zip_row.notna() & pws_row.notna()
+        links = pd.DataFrame({'zip': zip_row[known].astype(np.int64), 'pws': pws_row[known].astype(np.int64)})
+        if 'people_served' in pws_summary.column_names:
+            people = pws_summary.column('people_served').to_numpy(zero_copy_only=False)
+            links['people'] = -np.nan_to_num(people.astype(np.float64))[links['pws']]
+        links = links.sort_values([column for column in ('zip', 'people', 'pws') if column in links], kind='stable')
+        self._zip_offsets = _offsets(links['zip'].to_numpy(), len(zip_codes))
+        self._zip_pws = array('i', links['pws'].to_numpy().astype(np.int32).tobytes())
+
+        # Contaminant rows sorted by PWS row
+        contaminant_pws = pd.Series(contaminants.column('pws_id').to_pandas()).map(self._pws_rows)
+        known = contaminant_pws.notna().to_numpy()
+        contaminant_pws = contaminant_pws[known].astype(np.int64).to_numpy()
+        order = np.flatnonzero(known)[np.argsort(contaminant_pws, kind='stable')]
+        columns = [name for name in CONTAMINANT_COLUMNS if name in contaminants.column_names]
+        self._contaminants = ColumnStore(contaminants.select(columns).take(order))
+        self._contaminant_offsets = _offsets(contaminant_pws, len(pws_ids))
+
+    @classmethod
+    def load(cls, gold_dir: Union[str, Path]) -> "GoldIndex":
+        """Load and index the gold outputs of step 4 in ``gold_dir``."""
+        gold_dir = Path(gold_dir)
+        start = time.perf_counter()
+        snapshot = snapshot_id(gold_dir)
+
+        zip_summary = open_partitioned(gold_dir / ZIP_SUMMARY_DIR).to_table()
+        zip_summary = zip_summary.drop_columns([PARTITION_COLUMN])
+        pws_summary = pq.read_table(gold_dir / PWS_SUMMARY_FILE)
+        complete = open_partitioned(gold_dir / COMPLETE_DIR)
+        pair_columns = [name for name in ('zip_code', 'pws_id', 'utility_name') if name in complete.schema.names]
+        pairs = complete.to_table(columns=pair_columns)
+        details = open_partitioned(gold_dir / DETAILS_DIR)
+        contaminants = details.to_table(
+            columns=['pws_id', *(name for name in CONTAMINANT_COLUMNS if name in details.schema.names)]
+        )
+
+        index = cls(zip_summary, pws_summary, pairs, contaminants, snapshot)
+        logger.info(
+            f"Indexed {len(index._zip_rows):,} ZIP codes, {len(index._pws_rows):,} PWS and "
+            f"{index._contaminants.num_rows:,} contaminant rows from {gold_dir} in {time.perf_counter() - start:.2f}s"
+        )
+        return index
+
+    def system(self, pws_id: str) -> Optional[Dict]:
+        """PWS summary with its contaminants, None for an unknown ``pws_id``."""
+        row = self._pws_rows.get(pws_id)
+        return None if row is None else self._system_at(row)
+
+    def zip_code(self, zip_code: str) -> Optional[Dict]:
+        """ZIP code summary with its water systems, None for an unknown ZIP code."""
+        row = self._zip_rows.get(zip_code)
+        if row is None:
+            return None
+        summary = self._zips.row(row)
+        pws_rows = self._zip_pws[self._zip_offsets[row]:self._zip_offsets[row + 1]]
+        summary['water_systems'] = [self._system_at(pws_row) for pws_row in pws_rows]
+        return summary
+
+    def _system_at(self, row: int) -> Dict:
+        system = self._systems.row(row)
+        offsets = self._contaminant_offsets
+        system['contaminants'] = self._contaminants.rows(offsets[row], offsets[row + 1])
+        return system
+
+    def counts(self) -> Dict[str, int]:
+        """Rows indexed per table and approximate index memory."""
+        arrays = (self._zip_offsets, self._zip_pws, self._contaminant_offsets)
+        return {
+            'zip_codes': len(self._zip_rows),
+            'water_systems': len(self._pws_rows),
+            'contaminant_rows': self._contaminants.num_rows,
+            'column_bytes': (self._zips.nbytes() + self._systems.nbytes() + self._contaminants.nbytes()
+                             + sum(offsets.itemsize * len(offsets) for offsets in arrays)),
+        }
+
+    def keys(self) -> Tuple[List[str], List[str]]:
+        """Indexed ZIP codes and PWS IDs."""
+        return list(self._zip_rows), list(self._pws_rows)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Local HTTP endpoint for the gold lookup service.
+
+Serves a ``LookupService`` over JSON:
+
+    GET /zip/{zip_code}   ZIP code summary with its water systems and their
+                          contaminants (largest system first)
+    GET /pws/{pws_id}     PWS summary with its contaminants
+    GET /status           snapshot served, index sizes and cache statistics
+
+Unknown ZIP codes and PWS IDs get a 404. The gold directory is checked for a
+new step 4 snapshot every ``--reload-interval`` seconds and swapped in
+without interrupting queries.
+
+Usage:
+    python -m lookup.server
+    python -m lookup.server --gold-dir data/gold --port 8780
+"""
+import argparse
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+from aiohttp import web
+from rich.console import Console
+
+from .service import GOLD_DIR, LookupService
+
+console = Console()
+
+
+class LookupServer:
+    """aiohttp application answering lookups from a ``LookupService``."""
+
+    def __init__(self, service: LookupService):
+        """
+        Initialize lookup server.
+
+        Args:
+            service: Service answering the queries
+        """
+        self.service = service
+        self._runner: Optional[web.AppRunner] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/zip/{zip_code}', self._zip_code)
+        app.router.add_get('/pws/{pws_id}', self._system)
+        app.router.add_get('/status', self._status)
+        return app
+
+    async def start(self, host: str = 'localhost', port: int = 8780):
+        """Start serving in the running event loop."""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _zip_code(self, request: web.Request) -> web.Response:
+        zip_code = request.match_info['zip_code']
+        return self._respond(self.service.zip_code(zip_code), f"Unknown ZIP code {zip_code}")
+
+    async def _system(self, request: web.Request) -> web.Response:
+        pws_id = request.match_info['pws_id']
+        return self._respond(self.service.system(pws_id), f"Unknown PWS {pws_id}")
+
+    async def _status(self, request: web.Request) -> web.Response:
+        return web.json_response(self.service.status())
+
+    @staticmethod
+    def _respond(body: Optional[dict], not_found: str) -> web.Response:
+        if body is None:
+            return web.json_response({'error': not_found}, status=404)
+        # Compact separators: responses carry many small contaminant objects
+        return web.Response(text=json.dumps(body, separators=(',', ':')), content_type='application/json')
+
+
+async def serve_forever(server: LookupServer, host: str, port: int):
+    await server.start(host, port)
+    status = server.service.status()
+    console.print(f"[green]Serving {status['zip_codes']:,} ZIP codes and {status['water_systems']:,} water systems "
+                  f"(snapshot {status['snapshot']}) on http://{host}:{port}[/green]")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gold-dir', type=Path, default=GOLD_DIR, help='Gold layer directory written by step 4')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8780)
+    parser.add_argument('--cache-size', type=int, default=10_000, help='Assembled responses kept in the LRU cache')
+    parser.add_argument('--reload-interval', type=float, default=10.0, help='Seconds between snapshot checks')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    service = LookupService(args.gold_dir, cache_size=args.cache_size, reload_interval=args.reload_interval)
+    with service:
+        try:
+            asyncio.run(serve_forever(LookupServer(service), args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
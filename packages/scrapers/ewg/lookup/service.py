@@ -0,0 +1,164 @@
+"""Cached, hot-reloading query interface over a gold snapshot."""
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+import logging
+
+from .index import GoldIndex, snapshot_id
+
+logger = logging.getLogger(__name__)
+
+GOLD_DIR = Path("data/gold")
+
+
+def normalize_zip_code(zip_code: Union[str, int]) -> str:
+    """ZIP code as stored: five digits, zero-padded ("7001" -> "07001")."""
+    return str(zip_code).strip().zfill(5)
+
+
+def normalize_pws_id(pws_id: str) -> str:
+    """PWS ID as stored: upper case, no surrounding whitespace."""
+    return pws_id.strip().upper()
+
+
+class LookupService:
+    """
+    ZIP code and PWS lookups over the latest gold snapshot, in process.
+
+    Queries are answered from a ``GoldIndex`` held in memory. Assembled
+    responses are kept in an LRU cache of ``cache_size`` entries, keyed by
+    the index generation so a reload never serves a response from the
+    previous snapshot. Responses are shared with the cache: treat them as
+    read-only.
+
+    ``reload_if_changed`` indexes a new snapshot when step 4 has rewritten
+    ``final_report.json`` (its last output) since the current one was
+    loaded; ``start_watching`` calls it every ``reload_interval`` seconds
+    from a background thread. The new index is built next to the old one
+    and swapped in when complete, so queries never wait for a reload. A
+    snapshot that fails to load, or changes while it loads, is retried on
+    the next check while the old index keeps serving.
+    """
+
+    def __init__(
+        self,
+        gold_dir: Union[str, Path] = GOLD_DIR,
+        cache_size: int = 10_000,
+        reload_interval: float = 10.0
+    ):
+        """
+        Initialize lookup service and load the current snapshot.
+
+        Args:
+            gold_dir: Gold layer directory written by step 4
+            cache_size: Assembled responses kept in the LRU cache
+            reload_interval: Seconds between snapshot checks when watching
+        """
+        self.gold_dir = Path(gold_dir)
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+
+        self.index = GoldIndex.load(self.gold_dir)
+        self.generation = 0
+        self._cache: "OrderedDict[Tuple[int, str, str], Optional[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self.stats: Dict[str, int] = {
+            'hits': 0,
+            'misses': 0,
+            'reloads': 0,
+            'reload_failures': 0,
+        }
+
+    def zip_code(self, zip_code: Union[str, int]) -> Optional[Dict]:
+        """ZIP code summary with its water systems and their contaminants, None if unknown."""
+        zip_code = normalize_zip_code(zip_code)
+        return self._cached('zip', zip_code, lambda index: index.zip_code(zip_code))
+
+    def system(self, pws_id: str) -> Optional[Dict]:
+        """PWS summary with its contaminants, None if unknown."""
+        pws_id = normalize_pws_id(pws_id)
+        return self._cached('pws', pws_id, lambda index: index.system(pws_id))
+
+    def _cached(self, kind: str, key: str, build: Callable[[GoldIndex], Optional[Dict]]) -> Optional[Dict]:
+        index, generation = self.index, self.generation
+        cache_key = (generation, kind, key)
+        with self._lock:
+            if cache_key in self._cache:
+                self._cache.move_to_end(cache_key)
+                self.stats['hits'] += 1
+                return self._cache[cache_key]
+            self.stats['misses'] += 1
+
+        response = build(index)
+        with self._lock:
+            if generation == self.generation:
+                self._cache[cache_key] = response
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return response
+
+    def reload_if_changed(self) -> bool:
+        """Load the snapshot on disk if it differs from the one served; True if swapped in."""
+        snapshot = snapshot_id(self.gold_dir)
+        if snapshot is None or snapshot == self.index.snapshot:
+            return False
+        try:
+            index = GoldIndex.load(self.gold_dir)
+        except Exception as e:
+            self.stats['reload_failures'] += 1
+            logger.warning(f"Could not load gold snapshot from {self.gold_dir}, keeping the current one: {e}")
+            return False
+        if snapshot_id(self.gold_dir) != index.snapshot:
+            logger.info("Gold snapshot changed while loading; retrying on the next check")
+            return False
+
+        with self._lock:
+            self.index = index
+            self.generation += 1
+            self._cache.clear()
+        self.stats['reloads'] += 1
+        logger.info(f"Serving gold snapshot from {time.ctime(index.snapshot / 1e9)}")
+        return True
+
+    def start_watching(self):
+        """Check for new snapshots every ``reload_interval`` seconds in a daemon thread."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="gold-snapshot-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.reload_if_changed()
+
+    def __enter__(self) -> "LookupService":
+        self.start_watching()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_watching()
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot served, index sizes and cache statistics."""
+        snapshot = self.index.snapshot
+        return {
+            'gold_dir': str(self.gold_dir),
+            'snapshot': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(snapshot / 1e9)) if snapshot else None,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.index.loaded_at)),
+            'generation': self.generation,
+            **self.index.counts(),
+            'cached_responses': len(self._cache),
+            **self.stats,
+        }
@@ -0,0 +1,11 @@
+"""HTML parsers for EWG pages.
+
+Parsers are plain synchronous functions in an importable package so they can
+run in worker processes (see ``utils.ParseExecutor``).
+"""
+from .search_results import parse_pws_from_html, SEARCH_PARSER_ENGINES
+from .pws_details import parse_pws_details, parse_contaminant_info, DETAIL_PARSER_ENGINES
+from .measurements import normalize_pws_details, parse_measurements, parse_times_above
+
+__all__ = ['parse_pws_from_html', 'SEARCH_PARSER_ENGINES', 'parse_pws_details', 'parse_contaminant_info',
+           'DETAIL_PARSER_ENGINES', 'normalize_pws_details', 'parse_measurements', 'parse_times_above']
@@ -0,0 +1,87 @@
+"""lxml helpers that reproduce the BeautifulSoup semantics the reference parsers rely on."""
+from typing import Optional, Pattern, Union
+from lxml import etree
+
+HTML_PARSER = etree.HTMLParser()
+
+# Same strings BeautifulSoup's get_text() yields: no comments, scripts, styles or templates
+_TEXT_NODES = etree.XPath(
+    "descendant-or-self::text()[not(ancestor::script or ancestor::style or ancestor::template)]"
+)
+
+
+def parse_html(html: Union[str, bytes]):
+    """Parse a page into an lxml tree; returns None for an empty document."""
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    return etree.fromstring(html, HTML_PARSER) if html.strip() else None
+
+
+def has_class(class_name: str) -> str:
+    """XPath predicate matching one token of the ``class`` attribute (like ``class_=``)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def get_text(element, strip: bool = True) -> str:
+    """Equivalent of BeautifulSoup's ``get_text(strip=...)``."""
+    if not isinstance(element.tag, str):
+        return ''
+    if strip:
+        return ''.join(text.strip() for text in _TEXT_NODES(element))
+    return ''.join(_TEXT_NODES(element))
+
+
+def find_string(root, pattern: Pattern) -> bool:
+    """
+    Equivalent of BeautifulSoup's ``find(string=pattern)`` on a document.
+
+    Searches every string BeautifulSoup does (text, including script and
+    style contents, and comments) one at a time, never attribute values.
+    Comments and markup outside ``<html>`` are siblings of ``root`` in lxml.
+    """
+    for top in (*root.itersiblings(preceding=True), root, *root.itersiblings()):
+        for element in top.iter():
+            if element.text and pattern.search(element.text):
+                return True
+            if element.tail and pattern.search(element.tail):
+                return True
+    return False
+
+
+def tag_string(element) -> Optional[str]:
+    """Equivalent of BeautifulSoup's ``Tag.string`` (comments count as strings)."""
+    while True:
+        children = []
+        if element.text:
+            children.append(element.text)
+        for child in element:
+            children.append(child)
+            if child.tail:
+                children.append(child.tail)
+        if len(children) != 1:
+            return None
+        child = children[0]
+        if isinstance(child, str):
+            return child
+        if not isinstance(child.tag, str):
+            return child.text or ''
+        element = child
+
+
+def previous_sibling(element) -> Union[str, etree._Element, None]:
+    """Equivalent of BeautifulSoup's ``previous_sibling`` (text nodes count as siblings)."""
+    previous = element.getprevious()
+    if previous is not None:
+        return previous.tail if previous.tail else previous
+    parent = element.getparent()
+    if parent is not None and parent.text:
+        return parent.text
+    return None
+
+
+def next_sibling_tag(element, tag: str):
+    """Equivalent of BeautifulSoup's ``find_next_sibling(tag)``."""
+    for sibling in element.itersiblings():
+        if sibling.tag == tag:
+            return sibling
+    return None
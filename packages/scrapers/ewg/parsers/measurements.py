@@ -0,0 +1,127 @@
+"""
+Normalization of flattened contaminant rows into typed columns.
+
+Detail pages show measurements as display text ("26.58 ppb", "0.01 ppm",
+"No legal limit") and the parsers keep that text. ``normalize_pws_details``
+turns the flattened rows into what is stored: each measurement as a float in
+a canonical unit shared by the row (``unit``), ``times_above_guideline`` as
+a float, and pollution sources / filter options as lists. It also accepts
+rows in the old stored layout (display strings, ``|``-joined lists), so
+older part files and gold outputs can be upgraded with it.
+"""
+import logging
+import re
+from typing import Dict, Optional, Tuple
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MEASUREMENT_COLUMNS = ('utility_level', 'legal_limit', 'health_guideline')
+LIST_COLUMNS = ('pollution_sources', 'filter_options')
+
+# Lowercased unit as shown on the page -> (canonical unit, factor to it).
+# Mass concentrations are stored in ppb; other units are kept as they are.
+UNITS: Dict[str, Tuple[str, float]] = {
+    'ppb': ('ppb', 1.0),
+    'µg/l': ('ppb', 1.0),
+    'μg/l': ('ppb', 1.0),
+    'ug/l': ('ppb', 1.0),
+    'ppm': ('ppb', 1000.0),
+    'mg/l': ('ppb', 1000.0),
+    'ppt': ('ppb', 0.001),
+    'ng/l': ('ppb', 0.001),
+    'pci/l': ('pCi/L', 1.0),
+    'mfl': ('MFL', 1.0),
+    'ntu': ('NTU', 1.0),
+}
+
+_MEASUREMENT_RE = r'^\s*[<>~]?\s*(?P<value>\d[\d,]*(?:\.\d+)?|\.\d+)\s*(?P<unit>.*?)\s*$'
+_TIMES_JUNK_RE = r'[,x×\s]'
+
+
+def canonical_unit(unit: str) -> Tuple[Optional[str], float]:
+    """Canonical unit and conversion factor for a unit as shown on the page."""
+    if not unit:
+        return None, 1.0
+    return UNITS.get(unit.lower(), (unit, 1.0))
+
+
+def parse_measurements(values: pd.Series) -> pd.DataFrame:
+    """
+    Split display strings into a float in the canonical unit and that unit.
+
+    Args:
+        values: Display strings such as "1.23 ppb" or "No legal limit"
+
+    Returns:
+        ``value`` (NaN for text without a number) and ``unit`` columns
+    """
+    parts = values.astype('string').str.extract(_MEASUREMENT_RE)
+    number = pd.to_numeric(parts['value'].str.replace(',', '', regex=False), errors='coerce')
+
+    # Units repeat endlessly; resolve each distinct one once
+    conversions = {unit: canonical_unit(unit) for unit in parts['unit'].dropna().unique()}
+    unit = parts['unit'].map({raw: canonical for raw, (canonical, _) in conversions.items()})
+    factor = parts['unit'].map({raw: factor for raw, (_, factor) in conversions.items()}).astype(float)
+    # Rounding drops the float noise of the conversion (1.1 ppm -> 1100.0000000000002 ppb)
+    value = (number.astype(float) * factor.fillna(1.0)).round(9)
+    return pd.DataFrame({'value': value, 'unit': unit.astype(object).where(unit.notna(), None)})
+
+
+def parse_times_above(values: pd.Series) -> pd.Series:
+    """Exceedance ratios ("362", "1,024x") as floats, NaN where there is none."""
+    cleaned = values.astype('string').str.replace(_TIMES_JUNK_RE, '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').astype(float)
+
+
+def _as_list(value):
+    if isinstance(value, str):
+        return value.split('|') if value else []
+    return value
+
+
+def normalize_pws_details(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert flattened PWS detail rows to the stored column types.
+
+    Measurements are parsed into floats in the row's canonical unit: the
+    unit of the utility level, else of the legal limit, else of the health
+    guideline. A measurement in a unit that cannot be converted to it (say
+    pCi/L next to ppb) is dropped with a warning rather than stored under
+    the wrong unit. Columns that are already typed are left as they are,
+    so normalizing twice is harmless.
+
+    Args:
+        df: Rows from ``flatten_pws_data`` or a legacy details file
+
+    Returns:
+        A new frame with typed measurement, ``unit`` and list columns
+    """
+    df = df.copy()
+
+    to_parse = [column for column in MEASUREMENT_COLUMNS
+                if column in df.columns and not pd.api.types.is_numeric_dtype(df[column])]
+    if to_parse:
+        parsed = {column: parse_measurements(df[column]) for column in to_parse}
+        row_unit = pd.Series(None, index=df.index, dtype=object)
+        for column in MEASUREMENT_COLUMNS:
+            if column in parsed:
+                row_unit = row_unit.where(row_unit.notna(), parsed[column]['unit'])
+
+        for column, measurement in parsed.items():
+            mismatched = measurement['unit'].notna() & (measurement['unit'] != row_unit)
+            if mismatched.any():
+                logger.warning(
+                    f"Dropped {int(mismatched.sum()):,} {column} values in units not convertible to the row's unit"
+                )
+            df[column] = measurement['value'].where(~mismatched)
+        df['unit'] = row_unit
+
+    if 'times_above_guideline' in df.columns and not pd.api.types.is_numeric_dtype(df['times_above_guideline']):
+        df['times_above_guideline'] = parse_times_above(df['times_above_guideline'])
+
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = [_as_list(value) for value in df[column]]
+
+    return df
@@ -0,0 +1,352 @@
+"""
+Parsers for EWG water system detail pages.
+
+Two engines emit identical records. ``lxml`` parses the page once and only
+visits the hero and contaminant subtrees, the page's strings for the
+compliance text and the raw page text for the last-updated year; ``bs4`` is
+the original BeautifulSoup implementation kept as the reference.
+"""
+import logging
+import re
+from typing import Callable, Dict, Optional, Union
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from ._lxml import parse_html, has_class, get_text, find_string, tag_string, previous_sibling, next_sibling_tag
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE = 'lxml'
+
+_HERO_SECTIONS = etree.XPath(f"//section[{has_class('details-hero-sub-content')}]")
+_HERO_H4 = etree.XPath(".//h4")
+_CONTAMINANT_GROUPS = etree.XPath("(//div[@id=$group_id])[1]")
+_CONTAMINANT_ITEMS = etree.XPath(f".//div[{has_class('contaminant-grid-item')}]")
+_CONTAMINANT_DATA = etree.XPath(f"(.//section[{has_class('contaminant-data')}])[1]")
+_FIRST_H3 = etree.XPath("(.//h3)[1]")
+_FIRST_P_WITH_CLASS = etree.XPath("(.//p[contains(concat(' ', normalize-space(@class), ' '), concat(' ', $cls, ' '))])[1]")
+_FIRST_DIV_WITH_CLASS = etree.XPath("(.//div[contains(concat(' ', normalize-space(@class), ' '), concat(' ', $cls, ' '))])[1]")
+_PARAGRAPHS = etree.XPath(".//p")
+
+# Compliance is matched string by string like BeautifulSoup's find(string=...),
+# so attribute values never match. The year is taken from the raw page instead
+# of re-serializing the tree.
+_COMPLIANT_RE = re.compile(r'compliance with federal health-based', re.I)
+_NON_COMPLIANT_RE = re.compile(r'does not meet.*federal', re.I)
+_YEAR_RE = re.compile(r'\b(20\d{2})\b')
+
+_LOCATION_RE = re.compile('location', re.I)
+_SOURCE_RE = re.compile('source', re.I)
+_SERVED_RE = re.compile('served', re.I)
+
+
+def parse_contaminant_info(contam_section) -> Dict:
+    """Parse individual contaminant information (BeautifulSoup reference)."""
+    try:
+        # Extract contaminant name
+        name_elem = contam_section.find('h3')
+        name = name_elem.get_text(strip=True) if name_elem else "Unknown"
+        
+        # Extract potential effect
+        effect_elem = contam_section.find('p', class_='potentital-effect')
+        effect = effect_elem.get_text(strip=True).replace('Potential Effect: ', '') if effect_elem else ""
+        
+        # Extract measurements
+        utility_elem = contam_section.find('p', class_='this-utility-text')
+        utility_level = utility_elem.get_text(strip=True).replace('This Utility: ', '') if utility_elem else ""
+        
+        legal_elem = contam_section.find('p', class_='legal-limit-text')
+        legal_limit = legal_elem.get_text(strip=True).replace('Legal Limit: ', '') if legal_elem else ""
+        
+        # Extract times above guideline
+        times_elem = contam_section.find('p', class_='detect-times-greater-than')
+        times_above = times_elem.get_text(strip=True).replace('x', '') if times_elem else ""
+        
+        # Extract health guideline
+        guideline_elem = contam_section.find('p', class_='health-guideline-text')
+        health_guideline = guideline_elem.get_text(strip=True).replace("EWG's Health Guideline: ", '') if guideline_elem else ""
+        
+        # Extract pollution sources and filter options from modal
+        modal = contam_section.find('div', class_='contam-modal-wrapper')
+        pollution_sources = []
+        filter_options = []
+        
+        if modal:
+            # Find pollution sources
+            pollution_wrapper = modal.find('div', class_='pollution-sources-modal-wrapper')
+            if pollution_wrapper:
+                for source in pollution_wrapper.find_all('p'):
+                    text = source.get_text(strip=True)
+                    if text and text not in ['Pollution Sources', 'Filtering Options']:
+                        if source.parent.parent.previous_sibling and 'Pollution Sources' in source.parent.parent.previous_sibling.get_text():
+                            pollution_sources.append(text)
+                        elif source.parent.parent.previous_sibling and 'Filtering Options' in source.parent.parent.previous_sibling.get_text():
+                            filter_options.append(text)
+        
+        return {
+            'name': name,
+            'potential_effect': effect,
+            'utility_level': utility_level,
+            'legal_limit': legal_limit,
+            'times_above_guideline': times_above,
+            'health_guideline': health_guideline,
+            'pollution_sources': pollution_sources,
+            'filter_options': filter_options
+        }
+    
+    except Exception as e:
+        logger.error(f"Error parsing contaminant: {e}")
+        return None
+
+
+def _first_p_text(element, cls: str) -> Optional[str]:
+    found = _FIRST_P_WITH_CLASS(element, cls=cls)
+    return get_text(found[0]) if found else None
+
+
+def _parse_contaminant_info_lxml(contam_section) -> Optional[Dict]:
+    """Parse individual contaminant information from an lxml subtree."""
+    try:
+        name_elems = _FIRST_H3(contam_section)
+        name = get_text(name_elems[0]) if name_elems else "Unknown"
+        
+        effect = _first_p_text(contam_section, 'potentital-effect')
+        utility_level = _first_p_text(contam_section, 'this-utility-text')
+        legal_limit = _first_p_text(contam_section, 'legal-limit-text')
+        times_above = _first_p_text(contam_section, 'detect-times-greater-than')
+        health_guideline = _first_p_text(contam_section, 'health-guideline-text')
+        
+        pollution_sources = []
+        filter_options = []
+        
+        modal = _FIRST_DIV_WITH_CLASS(contam_section, cls='contam-modal-wrapper')
+        if modal:
+            pollution_wrapper = _FIRST_DIV_WITH_CLASS(modal[0], cls='pollution-sources-modal-wrapper')
+            if pollution_wrapper:
+                for source in _PARAGRAPHS(pollution_wrapper[0]):
+                    text = get_text(source)
+                    if text and text not in ['Pollution Sources', 'Filtering Options']:
+                        heading = previous_sibling(source.getparent().getparent())
+                        if heading is None:
+                            continue
+                        heading_text = heading if isinstance(heading, str) else get_text(heading, strip=False)
+                        if 'Pollution Sources' in heading_text:
+                            pollution_sources.append(text)
+                        elif 'Filtering Options' in heading_text:
+                            filter_options.append(text)
+        
+        return {
+            'name': name,
+            'potential_effect': effect.replace('Potential Effect: ', '') if effect is not None else "",
+            'utility_level': utility_level.replace('This Utility: ', '') if utility_level is not None else "",
+            'legal_limit': legal_limit.replace('Legal Limit: ', '') if legal_limit is not None else "",
+            'times_above_guideline': times_above.replace('x', '') if times_above is not None else "",
+            'health_guideline': health_guideline.replace("EWG's Health Guideline: ", '') if health_guideline is not None else "",
+            'pollution_sources': pollution_sources,
+            'filter_options': filter_options
+        }
+    
+    except Exception as e:
+        logger.error(f"Error parsing contaminant: {e}")
+        return None
+
+
+def _hero_value(section, pattern: re.Pattern) -> Optional[str]:
+    """Text of the h2 following the first h4 in a hero section whose string matches."""
+    for h4 in _HERO_H4(section):
+        string = tag_string(h4)
+        if string is not None and pattern.search(string):
+            h2 = next_sibling_tag(h4, 'h2')
+            return get_text(h2) if h2 is not None else None
+    return None
+
+
+def parse_pws_details_lxml(html: Union[str, bytes], pws_id: str) -> Dict:
+    """Parse detailed PWS information in a single pass over the relevant subtrees."""
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    
+    details = {
+        'pws_id': pws_id,
+        'location': None,
+        'source_water': None,
+        'people_served': None,
+        'compliance_status': None,
+        'contaminants_exceed_guidelines': [],
+        'contaminants_other_detected': [],
+        'last_updated': None
+    }
+    
+    try:
+        root = parse_html(html)
+        if root is None:
+            return details
+        
+        # Location comes from the first hero section only; source and people
+        # served from the first section that has them
+        found_source = found_served = False
+        for index, section in enumerate(_HERO_SECTIONS(root)):
+            if index == 0:
+                details['location'] = _hero_value(section, _LOCATION_RE)
+            if not found_source:
+                value = _hero_value(section, _SOURCE_RE)
+                if value is not None:
+                    details['source_water'] = value
+                    found_source = True
+            if not found_served:
+                value = _hero_value(section, _SERVED_RE)
+                if value is not None:
+                    found_served = True
+                    try:
+                        details['people_served'] = int(value.replace(',', ''))
+                    except ValueError:
+                        pass
+            if index > 0 and found_source and found_served:
+                break
+        
+        if find_string(root, _COMPLIANT_RE):
+            details['compliance_status'] = True
+        elif find_string(root, _NON_COMPLIANT_RE):
+            details['compliance_status'] = False
+        
+        for group_id, key in (
+            ('contams_above_hbl', 'contaminants_exceed_guidelines'),
+            ('contams_other_detected', 'contaminants_other_detected'),
+        ):
+            group = _CONTAMINANT_GROUPS(root, group_id=group_id)
+            if not group:
+                continue
+            for item in _CONTAMINANT_ITEMS(group[0]):
+                contam_data = _CONTAMINANT_DATA(item)
+                if contam_data:
+                    contam_info = _parse_contaminant_info_lxml(contam_data[0])
+                    if contam_info:
+                        details[key].append(contam_info)
+        
+        date_matches = _YEAR_RE.findall(html)
+        if date_matches:
+            details['last_updated'] = max(date_matches)
+    
+    except Exception as e:
+        logger.error(f"Error parsing PWS details for {pws_id}: {e}")
+    
+    return details
+
+
+def parse_pws_details_bs4(html: Union[str, bytes], pws_id: str) -> Dict:
+    """Parse detailed PWS information from HTML (BeautifulSoup reference)."""
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    soup = BeautifulSoup(html, 'lxml')
+    
+    details = {
+        'pws_id': pws_id,
+        'location': None,
+        'source_water': None,
+        'people_served': None,
+        'compliance_status': None,
+        'contaminants_exceed_guidelines': [],
+        'contaminants_other_detected': [],
+        'last_updated': None
+    }
+    
+    try:
+        # Extract location
+        location_section = soup.find('section', class_='details-hero-sub-content')
+        if location_section:
+            location_h4 = location_section.find('h4', string=re.compile('location', re.I))
+            if location_h4:
+                location_h2 = location_h4.find_next_sibling('h2')
+                if location_h2:
+                    details['location'] = location_h2.get_text(strip=True)
+        
+        # Extract source water
+        source_sections = soup.find_all('section', class_='details-hero-sub-content')
+        for section in source_sections:
+            h4 = section.find('h4', string=re.compile('source', re.I))
+            if h4:
+                h2 = h4.find_next_sibling('h2')
+                if h2:
+                    details['source_water'] = h2.get_text(strip=True)
+                    break
+        
+        # Extract people served
+        for section in source_sections:
+            h4 = section.find('h4', string=re.compile('served', re.I))
+            if h4:
+                h2 = h4.find_next_sibling('h2')
+                if h2:
+                    served_text = h2.get_text(strip=True).replace(',', '')
+                    try:
+                        details['people_served'] = int(served_text)
+                    except:
+                        pass
+                    break
+        
+        # Extract compliance status
+        compliance_text = soup.find(string=re.compile('compliance with federal health-based', re.I))
+        if compliance_text:
+            details['compliance_status'] = True
+        else:
+            # Check for non-compliance text
+            non_compliance = soup.find(string=re.compile('does not meet.*federal', re.I))
+            if non_compliance:
+                details['compliance_status'] = False
+        
+        # Extract contaminants that exceed guidelines
+        exceed_section = soup.find('div', id='contams_above_hbl')
+        if exceed_section:
+            contam_items = exceed_section.find_all('div', class_='contaminant-grid-item')
+            for item in contam_items:
+                contam_data = item.find('section', class_='contaminant-data')
+                if contam_data:
+                    contam_info = parse_contaminant_info(contam_data)
+                    if contam_info:
+                        details['contaminants_exceed_guidelines'].append(contam_info)
+        
+        # Extract other detected contaminants
+        other_section = soup.find('div', id='contams_other_detected')
+        if other_section:
+            contam_items = other_section.find_all('div', class_='contaminant-grid-item')
+            for item in contam_items:
+                contam_data = item.find('section', class_='contaminant-data')
+                if contam_data:
+                    contam_info = parse_contaminant_info(contam_data)
+                    if contam_info:
+                        details['contaminants_other_detected'].append(contam_info)
+        
+        # Try to find last updated date
+        date_pattern = re.compile(r'\b(20\d{2})\b')
+        date_matches = date_pattern.findall(str(soup))
+        if date_matches:
+            details['last_updated'] = max(date_matches)
+    
+    except Exception as e:
+        logger.error(f"Error parsing PWS details for {pws_id}: {e}")
+    
+    return details
+
+
+DETAIL_PARSER_ENGINES: Dict[str, Callable[[Union[str, bytes], str], Dict]] = {
+    'lxml': parse_pws_details_lxml,
+    'bs4': parse_pws_details_bs4,
+}
+
+
+def parse_pws_details(html: Union[str, bytes], pws_id: str, engine: str = DEFAULT_ENGINE) -> Dict:
+    """
+    Parse detailed PWS information from HTML.
+    
+    Args:
+        html: Raw page (bytes are decoded as UTF-8)
+        pws_id: PWS ID the page was fetched for
+        engine: Parser engine name, one of ``DETAIL_PARSER_ENGINES``
+        
+    Returns:
+        PWS details dict with contaminant lists
+    """
+    try:
+        parse = DETAIL_PARSER_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown parser engine: {engine}") from None
+    return parse(html, pws_id)
@@ -0,0 +1,156 @@
+"""
+Parsers for EWG search-results pages (PWS listed per ZIP code).
+
+Two engines emit identical records: ``lxml`` walks only the result tables
+with precompiled XPath expressions, and ``bs4`` is the original
+BeautifulSoup implementation kept as the reference.
+"""
+import logging
+from typing import Callable, List, Dict, Optional, Union
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from ._lxml import parse_html, has_class, get_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE = 'lxml'
+
+_RESULT_TABLES = etree.XPath(
+    f"//table[{has_class('featured-utility-table')} or {has_class('search-results-table')}]"
+)
+_FIRST_TBODY = etree.XPath("(.//tbody)[1]")
+_ROWS = etree.XPath(".//tr")
+_CELLS = etree.XPath(".//td")
+_FIRST_LINK = etree.XPath("(.//a)[1]")
+
+
+def _parse_people_served(people_served: str) -> Optional[int]:
+    people_served_clean = people_served.replace(',', '').replace('Population served: ', '')
+    try:
+        return int(people_served_clean)
+    except ValueError:
+        return None
+
+
+def parse_pws_from_html_lxml(html: Union[str, bytes], zip_code: str) -> List[Dict]:
+    """Parse PWS information from search results HTML using compiled XPath."""
+    root = parse_html(html)
+    if root is None:
+        return []
+    pws_list = []
+    
+    for table in _RESULT_TABLES(root):
+        tbodies = _FIRST_TBODY(table)
+        if not tbodies:
+            continue
+        is_featured = 'featured' in (table.get('class') or '').split()
+        
+        for row in _ROWS(tbodies[0]):
+            try:
+                cells = _CELLS(row)
+                if len(cells) < 3:
+                    continue
+                
+                links = _FIRST_LINK(cells[0])
+                if not links:
+                    continue
+                href = links[0].get('href')
+                if href is None or 'pws=' not in href:
+                    continue
+                
+                pws_list.append({
+                    'zip_code': zip_code,
+                    'pws_id': href.split('pws=')[-1],
+                    'utility_name': get_text(links[0]).replace('⭐', '').strip(),
+                    'location': get_text(cells[1]),
+                    'people_served': _parse_people_served(get_text(cells[2])),
+                    'is_featured': is_featured
+                })
+            except Exception as e:
+                logger.error(f"Error parsing row: {e}")
+                continue
+    
+    return pws_list
+
+
+def parse_pws_from_html_bs4(html: Union[str, bytes], zip_code: str) -> List[Dict]:
+    """Parse PWS information from search results HTML (BeautifulSoup reference)."""
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    soup = BeautifulSoup(html, 'lxml')
+    pws_list = []
+    
+    # Look for both featured and regular utility tables
+    tables = soup.find_all('table', class_=['featured-utility-table', 'search-results-table'])
+    
+    for table in tables:
+        tbody = table.find('tbody')
+        if not tbody:
+            continue
+            
+        for row in tbody.find_all('tr'):
+            try:
+                cells = row.find_all('td')
+                if len(cells) >= 3:
+                    # Extract utility name and PWS ID from link
+                    link = cells[0].find('a')
+                    if link and 'href' in link.attrs:
+                        href = link['href']
+                        # Extract PWS ID from URL like /tapwater/system.php?pws=NJ0238001
+                        if 'pws=' in href:
+                            pws_id = href.split('pws=')[-1]
+                            utility_name = link.get_text(strip=True)
+                            
+                            # Remove any icon/star from utility name
+                            utility_name = utility_name.replace('⭐', '').strip()
+                            
+                            location = cells[1].get_text(strip=True)
+                            people_served = cells[2].get_text(strip=True)
+                            
+                            # Clean people served number
+                            people_served_clean = people_served.replace(',', '').replace('Population served: ', '')
+                            try:
+                                people_served_num = int(people_served_clean)
+                            except:
+                                people_served_num = None
+                            
+                            pws_info = {
+                                'zip_code': zip_code,
+                                'pws_id': pws_id,
+                                'utility_name': utility_name,
+                                'location': location,
+                                'people_served': people_served_num,
+                                'is_featured': 'featured' in table.get('class', [])
+                            }
+                            pws_list.append(pws_info)
+            except Exception as e:
+                logger.error(f"Error parsing row: {e}")
+                continue
+    
+    return pws_list
+
+
+SEARCH_PARSER_ENGINES: Dict[str, Callable[[Union[str, bytes], str], List[Dict]]] = {
+    'lxml': parse_pws_from_html_lxml,
+    'bs4': parse_pws_from_html_bs4,
+}
+
+
+def parse_pws_from_html(html: Union[str, bytes], zip_code: str, engine: str = DEFAULT_ENGINE) -> List[Dict]:
+    """
+    Parse PWS information from search results HTML.
+    
+    Args:
+        html: Raw page (bytes are decoded as UTF-8)
+        zip_code: ZIP code the page was fetched for
+        engine: Parser engine name, one of ``SEARCH_PARSER_ENGINES``
+        
+    Returns:
+        List of PWS record dicts
+    """
+    try:
+        parse = SEARCH_PARSER_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown parser engine: {engine}") from None
+    return parse(html, zip_code)
@@ -1,17 +1,26 @@
 #!/usr/bin/env python3
 """
 Main runner for EWG Tap Water Database Scraper.
-Executes all steps in sequence with proper error handling.
+Runs all steps in-process; step 3 scrapes PWS details while step 2 is still
+discovering them.
 """
+import argparse
 import asyncio
-import subprocess
+import contextlib
+import importlib.util
 import sys
 from pathlib import Path
+from types import ModuleType
+from typing import AsyncIterator, Dict, Set
+import pandas as pd
 from rich.console import Console
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
 import time
 
+sys.path.append(str(Path(__file__).parent))
+
+from utils import AdaptiveController, Metrics, create_metrics
+
 console = Console()
 
 SCRIPTS = [
@@ -21,23 +30,176 @@ SCRIPTS = [
     ("04_consolidate_data.py", "Consolidating final datasets")
 ]
 
+# Seconds between throughput / ETA lines while steps 2 and 3 run
+PROGRESS_INTERVAL = 30.0
+
+
+def load_script(script_name: str) -> ModuleType:
+    """Import a step script (file names start with a digit) as a module."""
+    script_path = Path(__file__).parent / "scripts" / script_name
+    spec = importlib.util.spec_from_file_location(f"step_{script_path.stem}", script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class PwsFeed:
+    """
+    Deduplicating queue of PWS IDs from step 2 to step 3.
+    
+    Step 2 calls ``put`` for every PWS it finds; each ID is queued once.
+    ``close`` ends the stream once step 2 is done.
+    """
+    
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.seen: Set[str] = set()
+    
+    def put(self, pws_id: str):
+        if pws_id not in self.seen:
+            self.seen.add(pws_id)
+            self._queue.put_nowait(pws_id)
+    
+    def close(self):
+        self._queue.put_nowait(None)
+    
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            pws_id = await self._queue.get()
+            if pws_id is None:
+                return
+            yield pws_id
 
-def run_script(script_path: Path) -> tuple[bool, str]:
-    """Run a Python script and return success status and output."""
+
+def format_duration(seconds: float) -> str:
+    """Compact duration such as ``2h05m`` or ``3m10s``."""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+async def report_throughput(stages: Dict[str, Metrics], interval: float = PROGRESS_INTERVAL):
+    """
+    Print each stage's throughput and ETA every ``interval`` seconds.
+    
+    Throughput is items per second over recent intervals (exponentially
+    smoothed); the ETA divides the items still expected by it. Runs until
+    cancelled.
+    """
+    last = {name: (time.monotonic(), metrics.value('items_total')) for name, metrics in stages.items()}
+    rates: Dict[str, float] = {}
+    while True:
+        await asyncio.sleep(interval)
+        for name, metrics in stages.items():
+            now, done = time.monotonic(), metrics.value('items_total')
+            then, done_before = last[name]
+            last[name] = (now, done)
+            rate = (done - done_before) / (now - then)
+            rates[name] = rate if name not in rates else 0.7 * rates[name] + 0.3 * rate
+            
+            expected = metrics.value('items_expected')
+            left = max(0, expected - done)
+            if not left:
+                eta = "done" if done else "waiting"
+            elif rates[name] > 0:
+                eta = f"ETA {format_duration(left / rates[name])}"
+            else:
+                eta = "ETA unknown"
+            console.print(
+                f"[dim]{name}: {done:,.0f}/{expected:,.0f} items, {rates[name]:.1f}/s, "
+                f"{metrics.value('rows_per_second'):.1f} rows/s, {eta}[/dim]"
+            )
+
+
+@contextlib.asynccontextmanager
+async def throughput_reporter(stages: Dict[str, Metrics]):
+    """Report throughput and ETA of the given stages while the block runs."""
+    task = asyncio.create_task(report_throughput(stages, PROGRESS_INTERVAL))
     try:
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True,
-            check=True
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+def shared_controller(step2: ModuleType, step3: ModuleType) -> AdaptiveController:
+    """One request budget for steps 2 and 3 running side by side."""
+    return AdaptiveController(
+        concurrency=step2.MAX_CONCURRENT + step3.MAX_CONCURRENT,
+        rate=step2.RATE_LIMIT + step3.RATE_LIMIT,
+        min_concurrency=step2.CONCURRENCY_RANGE[0] + step3.CONCURRENCY_RANGE[0],
+        max_concurrency=step2.CONCURRENCY_RANGE[1] + step3.CONCURRENCY_RANGE[1],
+        min_rate=step2.RATE_RANGE[0] + step3.RATE_RANGE[0],
+        max_rate=step2.RATE_RANGE[1] + step3.RATE_RANGE[1]
+    )
+
+
+async def run_step(module: ModuleType, description: str, **kwargs) -> bool:
+    """Run a step's ``main`` and report whether it succeeded."""
+    console.print(f"\n[cyan]Step {module.__name__[5:7]}:[/cyan] {description}")
+    try:
+        result = module.main(**kwargs)
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        console.print(f"[red]✗ Step {module.__name__[5:7]} failed: {e}[/red]")
+        return False
+    console.print(f"[green]✓ Step {module.__name__[5:7]} completed successfully[/green]")
+    return True
+
+
+async def run_pipelined(steps) -> bool:
+    """Run step 2 and step 3 concurrently, streaming PWS IDs between them."""
+    (step2, desc2), (step3, desc3) = steps
+    controller = shared_controller(step2, step3)
+    metrics2, metrics3 = create_metrics(step2.PWS_CHECKPOINT), create_metrics(step3.PWS_DETAILS_CHECKPOINT)
+    feed = PwsFeed()
+    
+    # PWS found by an earlier, interrupted step 2 run are not rediscovered
+    if step2.PWS_BY_ZIP_FILE.exists():
+        for pws_id in pd.read_parquet(step2.PWS_BY_ZIP_FILE, columns=['pws_id'])['pws_id'].unique():
+            feed.put(pws_id)
+    
+    async def discover() -> bool:
+        try:
+            return await run_step(step2, desc2, controller=controller, pws_sink=feed.put, metrics=metrics2)
+        finally:
+            feed.close()
+    
+    async with throughput_reporter({"Step 02": metrics2, "Step 03": metrics3}):
+        ok2, ok3 = await asyncio.gather(
+            discover(),
+            run_step(step3, desc3, controller=controller, pws_source=feed, metrics=metrics3)
         )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        return False, f"Error: {e.stderr}"
+    limits = controller.limits
+    console.print(
+        f"[dim]{len(feed.seen):,} PWS streamed to step 3; final limits "
+        f"{limits['concurrency']} concurrent, {limits['rate']:.1f} req/s[/dim]"
+    )
+    return ok2 and ok3
+
 
+def confirm_continue() -> bool:
+    """Ask whether to go on after a failed step."""
+    response = console.input("\n[yellow]Continue with next step? (y/n): [/yellow]")
+    if response.lower() != 'y':
+        console.print("[red]Scraping aborted by user[/red]")
+        return False
+    return True
 
-async def main():
-    """Run all scraper steps in sequence."""
+
+async def main(sequential: bool = False):
+    """
+    Run all scraper steps.
+    
+    Args:
+        sequential: Run step 3 only after step 2 has finished, each with its
+            own request budget
+    """
     console.print(Panel.fit(
         "[bold blue]EWG Tap Water Database Scraper[/bold blue]\n"
         "Following Medallion Architecture\n"
@@ -45,45 +207,25 @@ async def main():
         title="Water Quality Data Pipeline"
     ))
     
-    scripts_dir = Path(__file__).parent / "scripts"
+    steps = [(load_script(script_name), description) for script_name, description in SCRIPTS]
     
     start_time = time.time()
     
-    for script_name, description in SCRIPTS:
-        script_path = scripts_dir / script_name
-        
-        console.print(f"\n[cyan]Step {script_name[:2]}:[/cyan] {description}")
-        
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-            transient=True
-        ) as progress:
-            task = progress.add_task(f"Running {script_name}...", total=None)
-            
-            success, output = await asyncio.get_event_loop().run_in_executor(
-                None, run_script, script_path
-            )
-            
-            progress.update(task, completed=True)
-        
-        if success:
-            console.print(f"[green]✓ {script_name} completed successfully[/green]")
-            # Print last few lines of output
-            output_lines = output.strip().split('\n')
-            if len(output_lines) > 5:
-                console.print("[dim]" + '\n'.join(output_lines[-5:]) + "[/dim]")
-        else:
-            console.print(f"[red]✗ {script_name} failed[/red]")
-            console.print(output)
-            
-            # Ask if user wants to continue
-            if script_name != SCRIPTS[-1][0]:
-                response = console.input("\n[yellow]Continue with next step? (y/n): [/yellow]")
-                if response.lower() != 'y':
-                    console.print("[red]Scraping aborted by user[/red]")
-                    return
+    if not await run_step(*steps[0]) and not confirm_continue():
+        return
+    
+    if sequential:
+        stages = (steps[1][0].PWS_CHECKPOINT, steps[2][0].PWS_DETAILS_CHECKPOINT)
+        for (module, description), stage in zip(steps[1:3], stages):
+            metrics = create_metrics(stage)
+            async with throughput_reporter({f"Step {module.__name__[5:7]}": metrics}):
+                ok = await run_step(module, description, metrics=metrics)
+            if not ok and not confirm_continue():
+                return
+    elif not await run_pipelined(steps[1:3]) and not confirm_continue():
+        return
+    
+    await run_step(*steps[3])
     
     elapsed_time = time.time() - start_time
     console.print(f"\n[bold green]Pipeline completed in {elapsed_time/60:.1f} minutes![/bold green]")
@@ -95,22 +237,39 @@ async def main():
         for file in gold_dir.glob("*.parquet"):
             size_mb = file.stat().st_size / 1024 / 1024
             console.print(f"  • {file.name} ({size_mb:.1f} MB)")
-        
+        # State-partitioned datasets (skipping a .tmp/.old left by an interrupted swap)
+        for dataset_dir in sorted((gold_dir / "by_state").glob("*")):
+            if not dataset_dir.is_dir() or dataset_dir.suffix:
+                continue
+            size_mb = sum(file.stat().st_size for file in dataset_dir.rglob("*.parquet")) / 1024 / 1024
+            partitions = sum(1 for part_dir in dataset_dir.iterdir() if part_dir.is_dir())
+            console.print(f"  • by_state/{dataset_dir.name}/ ({size_mb:.1f} MB, {partitions} state partition{'s' if partitions != 1 else ''})")
+    
         report_file = gold_dir / "final_report.json"
         if report_file.exists():
             console.print(f"\n[green]Final report: {report_file}[/green]")
+        for metrics_file in sorted(gold_dir.glob("*_metrics*.prom")):
+            console.print(f"[green]Metrics: {metrics_file} (summary: {metrics_file.with_suffix('.json').name})[/green]")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sequential',
+        action='store_true',
+        help='Run step 3 after step 2 instead of alongside it'
+    )
+    args = parser.parse_args()
+    
     # Ensure we're in the correct directory
     script_dir = Path(__file__).parent
     import os
     os.chdir(script_dir)
     
     try:
-        asyncio.run(main())
+        asyncio.run(main(sequential=args.sequential))
     except KeyboardInterrupt:
         console.print("\n[red]Scraping interrupted by user[/red]")
     except Exception as e:
         console.print(f"\n[bold red]Unexpected error: {e}[/bold red]")
-        raise
\ No newline at end of file
+        raise
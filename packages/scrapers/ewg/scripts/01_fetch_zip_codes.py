@@ -11,7 +11,7 @@ from rich.console import Console
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils import RetryableSession, ProgressTracker, create_progress_bar
+from utils import RetryableSession, create_progress_bar
 
 console = Console()
 logging.basicConfig(level=logging.INFO)
@@ -111,8 +111,6 @@ async def main():
     """Main function to fetch and save ZIP codes."""
     console.print("[bold blue]EWG Water Quality Scraper - Step 1: Fetch ZIP Codes[/bold blue]")
     
-    tracker = ProgressTracker()
-    
     # Check if we already have ZIP codes
     if ZIP_CODES_FILE.exists():
         console.print(f"[green]ZIP codes already fetched at {ZIP_CODES_FILE}[/green]")
@@ -129,12 +127,8 @@ async def main():
         valid_zip_codes = await validate_zip_codes(zip_codes)
         console.print(f"[green]Validated {len(valid_zip_codes):,} ZIP codes[/green]")
         
-        # Create DataFrame
-        df = pd.DataFrame({
-            'zip_code': valid_zip_codes,
-            'fetched': False,  # Track which ones we've processed
-            'has_pws': None,   # Track which ones have water systems
-        })
+        # Create DataFrame; per-ZIP progress is kept by step 2 in its state store
+        df = pd.DataFrame({'zip_code': valid_zip_codes})
         
         # Save to Bronze layer
         df.to_parquet(ZIP_CODES_FILE, index=False)
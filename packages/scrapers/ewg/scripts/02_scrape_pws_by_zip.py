@@ -2,18 +2,27 @@
 Step 2: Scrape PWS (Public Water Systems) for each ZIP code.
 """
 import asyncio
+import itertools
+import time
 import pandas as pd
+import pyarrow as pa
 from pathlib import Path
 import logging
-from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
+from typing import Callable, List, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+import argparse
 import json
 from rich.console import Console
 from rich.progress import track
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils import RetryableSession, ProgressTracker, create_progress_bar, ParallelProcessor
+from utils import (
+    AdaptiveController, RetryableSession, HttpCache, create_progress_bar, ParallelProcessor, PageStore, ParseExecutor,
+    DatasetWriter, NegativeCache, PrefixScheduler, StateStore, Metrics, WorkQueue, Shard, work_shards,
+    default_worker_id, create_controller, open_state, print_session_stats, create_metrics, write_metrics, record_flush
+)
+from parsers import parse_pws_from_html, SEARCH_PARSER_ENGINES
 
 console = Console()
 logging.basicConfig(level=logging.INFO)
@@ -22,114 +31,356 @@ logger = logging.getLogger(__name__)
 # Paths
 BRONZE_DIR = Path("data/bronze")
 SILVER_DIR = Path("data/silver")
+GOLD_DIR = Path("data/gold")
 SILVER_DIR.mkdir(parents=True, exist_ok=True)
 
 ZIP_CODES_FILE = BRONZE_DIR / "us_zip_codes.parquet"
 PWS_BY_ZIP_FILE = SILVER_DIR / "pws_by_zip.parquet"
+PWS_BY_ZIP_DATASET = SILVER_DIR / "pws_by_zip"
+# Stage name in the state store (and of the JSON checkpoint it replaced)
 PWS_CHECKPOINT = "pws_by_zip"
+PAGES_DIR = BRONZE_DIR / "pages" / "search_results"
+HTTP_CACHE_FILE = BRONZE_DIR / "http_cache.sqlite"
+EMPTY_ZIP_CACHE_FILE = BRONZE_DIR / "empty_zip_codes.sqlite"
+DEFERRED_PREFIXES_FILE = BRONZE_DIR / "deferred_zip_prefixes.json"
+WORK_QUEUE_FILE = BRONZE_DIR / "work_queue.sqlite"
+STATE_FILE = BRONZE_DIR / "pipeline_state.sqlite"
+# Rewritten after every part file (workers add "-<worker id>" to the name)
+METRICS_FILE = GOLD_DIR / "pws_by_zip_metrics.prom"
+METRICS_SUMMARY_FILE = GOLD_DIR / "pws_by_zip_metrics.json"
 
-# EWG URL pattern
-EWG_SEARCH_URL = "https://www.ewg.org/tapwater/search-results.php?zip5={zip_code}"
-
-
-async def parse_pws_from_html(html: str, zip_code: str) -> List[Dict]:
-    """Parse PWS information from search results HTML."""
-    soup = BeautifulSoup(html, 'lxml')
-    pws_list = []
-    
-    # Look for both featured and regular utility tables
-    tables = soup.find_all('table', class_=['featured-utility-table', 'search-results-table'])
-    
-    for table in tables:
-        tbody = table.find('tbody')
-        if not tbody:
-            continue
-            
-        for row in tbody.find_all('tr'):
-            try:
-                cells = row.find_all('td')
-                if len(cells) >= 3:
-                    # Extract utility name and PWS ID from link
-                    link = cells[0].find('a')
-                    if link and 'href' in link.attrs:
-                        href = link['href']
-                        # Extract PWS ID from URL like /tapwater/system.php?pws=NJ0238001
-                        if 'pws=' in href:
-                            pws_id = href.split('pws=')[-1]
-                            utility_name = link.get_text(strip=True)
-                            
-                            # Remove any icon/star from utility name
-                            utility_name = utility_name.replace('⭐', '').strip()
-                            
-                            location = cells[1].get_text(strip=True)
-                            people_served = cells[2].get_text(strip=True)
-                            
-                            # Clean people served number
-                            people_served_clean = people_served.replace(',', '').replace('Population served: ', '')
-                            try:
-                                people_served_num = int(people_served_clean)
-                            except:
-                                people_served_num = None
-                            
-                            pws_info = {
-                                'zip_code': zip_code,
-                                'pws_id': pws_id,
-                                'utility_name': utility_name,
-                                'location': location,
-                                'people_served': people_served_num,
-                                'is_featured': 'featured' in table.get('class', [])
-                            }
-                            pws_list.append(pws_info)
-            except Exception as e:
-                logger.error(f"Error parsing row: {e}")
-                continue
+# Pages validated within this many seconds are reused without a request;
+# older ones are revalidated with ETag / Last-Modified (0 = always revalidate)
+HTTP_CACHE_TTL = 12 * 3600
+
+# EWG URL pattern; EWG_BASE_URL can point at a mirror or the benchmark stub server
+EWG_BASE_URL = "https://www.ewg.org"
+EWG_SEARCH_URL = "{base_url}/tapwater/search-results.php?zip5={zip_code}"
+
+# Rate limiting: MAX_CONCURRENT / RATE_LIMIT are the starting limits; with
+# ADAPTIVE_RATE they are retuned from responses within these floor/ceiling ranges
+MAX_CONCURRENT = 20
+RATE_LIMIT = 10.0
+CONCURRENCY_RANGE = (2, 50)
+RATE_RANGE = (1.0, 40.0)
+ADAPTIVE_RATE = True
+
+PWS_BY_ZIP_SCHEMA = pa.schema([
+    ('zip_code', pa.string()),
+    ('pws_id', pa.string()),
+    ('utility_name', pa.string()),
+    ('location', pa.string()),
+    ('people_served', pa.int64()),
+    ('is_featured', pa.bool_()),
+])
+# Rows of a ZIP code scraped twice (e.g. by a worker whose lease expired) are kept once
+PWS_BY_ZIP_KEY = ['zip_code', 'pws_id']
+
+# ZIP codes found empty are skipped for this long (a small daily sample is
+# re-checked sooner)
+EMPTY_ZIP_TTL_DAYS = 90
+
+# ZIP prefixes are probed with this many ZIP codes before being swept; prefixes
+# without any PWS in their probes are deferred unless FULL_SWEEP is set
+PROBE_PREFIX_LEN = 3
+PROBES_PER_PREFIX = 5
+FULL_SWEEP = False
+
+# ZIP codes per output part file
+FLUSH_EVERY = 1000
+
+# Worker mode: ZIP codes are split into shards of whole prefixes with about
+# SHARD_SIZE ZIP codes each, leased from a queue shared by all workers
+WORK_QUEUE_NAME = "pws_by_zip"
+SHARD_SIZE = 2000
+LEASE_SECONDS = 300
+
+# Search-results parser engine (see parsers.SEARCH_PARSER_ENGINES)
+PARSER_ENGINE = "lxml"
+
+
+async def scrape_zip_code(
+    session: RetryableSession,
+    zip_code: str,
+    page_store: Optional[PageStore] = None,
+    parse_executor: Optional[ParseExecutor] = None
+) -> List[Dict]:
+    """
+    Scrape PWS data for a single ZIP code, archiving the raw page.
     
-    return pws_list
+    Returns an empty list for a ZIP code without water systems and raises
+    when the page could not be fetched or parsed.
+    """
+    url = EWG_SEARCH_URL.format(base_url=EWG_BASE_URL, zip_code=zip_code)
+    
+    html = await session.get_bytes(url)
+    if page_store is not None:
+        page_store.put(url, html)
+    if parse_executor is not None:
+        return await parse_executor.run(parse_pws_from_html, html, zip_code, PARSER_ENGINE)
+    return parse_pws_from_html(html, zip_code, PARSER_ENGINE)
 
 
-async def scrape_zip_code(session: RetryableSession, zip_code: str) -> List[Dict]:
-    """Scrape PWS data for a single ZIP code."""
-    url = EWG_SEARCH_URL.format(zip_code=zip_code)
+async def scrape_zip_codes(
+    zip_codes: List[str],
+    state: StateStore,
+    session: RetryableSession,
+    processor: ParallelProcessor,
+    writer: DatasetWriter,
+    page_store: Optional[PageStore] = None,
+    parse_executor: Optional[ParseExecutor] = None,
+    negative_cache: Optional[NegativeCache] = None,
+    scheduler: Optional[PrefixScheduler] = None,
+    pws_sink: Optional[Callable[[str], None]] = None,
+    metrics: Optional[Metrics] = None,
+    check_lease: Optional[Callable[[], None]] = None
+):
+    """
+    Stream ZIP codes through the processor over a shared session.
+    
+    Results are consumed as they complete and flushed to a new part file every
+    FLUSH_EVERY ZIP codes; the part and the status of its ZIP codes (done or
+    failed with the error) are committed to the state store together, so a
+    crash never marks unsaved work as done. With a prefix scheduler, ZIP
+    codes are fetched in its probe-first order and ZIP codes of dead prefixes
+    are left for a full sweep. ``pws_sink`` is called with every PWS ID as
+    soon as it is found. With ``metrics``, ZIP codes processed and rows
+    written are counted and the metrics files are rewritten after every part.
+    ``check_lease`` is called before each commit and raises to drop the batch
+    when this worker no longer owns its ZIP codes.
+    """
+    buffered_rows: List[Dict] = []
+    has_pws: Dict[str, bool] = {}
+    failures: Dict[str, str] = {}
+    
+    def flush():
+        if check_lease is not None:
+            check_lease()
+        write_start = time.perf_counter()
+        state.commit_batch(
+            PWS_CHECKPOINT, writer, pd.DataFrame(buffered_rows) if buffered_rows else None, has_pws, failures
+        )
+        write_seconds = time.perf_counter() - write_start
+        if buffered_rows:
+            console.print(f"[green]Saved {len(buffered_rows):,} PWS records ({writer.num_rows:,} total)[/green]")
+        if metrics is not None:
+            record_flush(metrics, len(buffered_rows), processor, write_seconds)
+            write_metrics(metrics, METRICS_FILE, METRICS_SUMMARY_FILE)
+        if negative_cache is not None:
+            negative_cache.update(
+                [z for z, found in has_pws.items() if not found],
+                [z for z, found in has_pws.items() if found]
+            )
+        limits = processor.limits
+        console.print(f"[dim]Limits: {limits['concurrency']} concurrent, {limits['rate']:.1f} req/s[/dim]")
+        buffered_rows.clear()
+        has_pws.clear()
+        failures.clear()
+    
+    async def process_single(zip_code: str) -> Optional[List[Dict]]:
+        try:
+            return await scrape_zip_code(session, zip_code, page_store, parse_executor)
+        except Exception as e:
+            logger.error(f"Error scraping ZIP {zip_code}: {e}")
+            failures[zip_code] = str(e)
+            return None
     
-    try:
-        html = await session.get(url)
-        pws_list = await parse_pws_from_html(html, zip_code)
-        return pws_list
-    except Exception as e:
-        logger.error(f"Error scraping ZIP {zip_code}: {e}")
-        return []
+    items = scheduler.iter_keys() if scheduler is not None else zip_codes
+    if metrics is not None:
+        expected = metrics.gauge('items_expected', 'Items this run is expected to process')
+        expected.set(len(zip_codes))
+        processed = metrics.counter('items_total', 'Items processed, by result')
+    
+    with create_progress_bar("Scraping ZIP codes", len(zip_codes)) as progress:
+        task = progress.add_task("Processing...", total=len(zip_codes))
+        
+        async for zip_code, pws_list in processor.process_stream(items, process_single):
+            progress.advance(task)
+            if scheduler is not None:
+                scheduler.record(zip_code, bool(pws_list) if pws_list is not None else None)
+                progress.update(task, total=len(zip_codes) - scheduler.num_deferred)
+            if metrics is not None:
+                processed.inc(result='failed' if pws_list is None else 'found' if pws_list else 'empty')
+                if scheduler is not None:
+                    expected.set(len(zip_codes) - scheduler.num_deferred)
+            if pws_list is None:
+                continue
+            if pws_sink is not None:
+                for pws in pws_list:
+                    pws_sink(pws['pws_id'])
+            buffered_rows.extend(pws_list)
+            has_pws[zip_code] = bool(pws_list)
+            if len(has_pws) >= FLUSH_EVERY:
+                flush()
+        
+        if has_pws or failures:
+            flush()
 
 
-async def process_zip_codes_batch(zip_codes: List[str], tracker: ProgressTracker) -> pd.DataFrame:
-    """Process a batch of ZIP codes in parallel."""
-    processor = ParallelProcessor(max_concurrent=20, rate_limit=10.0)
-    all_pws = []
+def save_statistics(final_df: pd.DataFrame, skipped_empty: int = 0):
+    """Save and print summary statistics for the silver PWS dataset."""
+    stats = {
+        'total_pws': len(final_df),
+        'unique_pws': final_df['pws_id'].nunique(),
+        'zip_codes_with_pws': final_df['zip_code'].nunique(),
+        'total_people_served': int(final_df['people_served'].sum()) if 'people_served' in final_df else 0,
+        'featured_utilities': int(final_df['is_featured'].sum()) if 'is_featured' in final_df else 0,
+        'known_empty_zip_codes_skipped': skipped_empty,
+    }
+    
+    stats_file = SILVER_DIR / "pws_stats.json"
+    with open(stats_file, 'w') as f:
+        json.dump(stats, f, indent=2)
     
-    async with RetryableSession() as session:
-        with create_progress_bar("Scraping ZIP codes", len(zip_codes)) as progress:
-            task = progress.add_task("Processing...", total=len(zip_codes))
-            
-            async def process_single(zip_code: str) -> List[Dict]:
-                result = await scrape_zip_code(session, zip_code)
+    console.print("\n[bold green]✓ Scraping complete![/bold green]")
+    console.print(f"Total PWS records: {stats['total_pws']:,}")
+    console.print(f"Unique PWS: {stats['unique_pws']:,}")
+    console.print(f"ZIP codes with PWS: {stats['zip_codes_with_pws']:,}")
+    console.print(f"Total people served: {stats['total_people_served']:,}")
+
+
+async def reparse_archive(page_store: PageStore, parse_executor: ParseExecutor) -> pd.DataFrame:
+    """Rebuild PWS records from archived search pages without any network access."""
+    pending = []
+    
+    with create_progress_bar("Reparsing archived pages", len(page_store)) as progress:
+        task = progress.add_task("Reparsing...", total=len(page_store))
+        
+        for url, body in page_store.iter_latest():
+            zip_code = parse_qs(urlparse(url).query).get('zip5', [None])[0]
+            if zip_code:
+                future = await parse_executor.submit(parse_pws_from_html, body, zip_code, PARSER_ENGINE)
+                future.add_done_callback(lambda _: progress.advance(task))
+                pending.append(future)
+            else:
                 progress.advance(task)
-                
-                # Update checkpoint after each successful scrape
-                tracker.update_completed(PWS_CHECKPOINT, zip_code)
-                
-                return result
-            
-            results = await processor.process_batch(zip_codes, process_single)
-            
-            # Flatten results
-            for pws_list in results:
-                if pws_list:
-                    all_pws.extend(pws_list)
-    
-    return pd.DataFrame(all_pws)
-
-
-async def main():
-    """Main function to scrape PWS data for all ZIP codes."""
+        
+        results = await asyncio.gather(*pending)
+    
+    return pd.DataFrame([pws for pws_list in results for pws in pws_list])
+
+
+def read_legacy_has_pws() -> Optional[Dict[str, bool]]:
+    """``has_pws`` flags step 2 used to write into the ZIP codes file, if any."""
+    zip_df = pd.read_parquet(ZIP_CODES_FILE)
+    if 'has_pws' not in zip_df:
+        return None
+    known = zip_df[zip_df['has_pws'].notna()]
+    return dict(zip(known['zip_code'], known['has_pws'].astype(bool)))
+
+
+def load_remaining_zip_codes(
+    state: StateStore,
+    negative_cache: NegativeCache
+) -> Tuple[List[str], List[str]]:
+    """
+    Register all ZIP codes and return the ones still to scrape.
+    
+    Completed ZIP codes that had no water systems are scraped again once
+    their negative cache entry expires or is sampled for re-checking.
+    
+    Returns:
+        ``(remaining_zips, skipped_zips)``: ZIP codes not done yet, and the
+        known-empty ones among them that are skipped this run
+    """
+    # Load ZIP codes
+    zip_codes = pd.read_parquet(ZIP_CODES_FILE, columns=['zip_code'])['zip_code']
+    console.print(f"[green]Loaded {len(zip_codes):,} ZIP codes[/green]")
+    state.add_items(PWS_CHECKPOINT, zip_codes)
+    
+    # Check for existing progress
+    counts = state.counts(PWS_CHECKPOINT)
+    remaining_zips = state.remaining(PWS_CHECKPOINT)
+    
+    if counts['done']:
+        console.print(f"[yellow]Resuming. {counts['done']:,} already completed.[/yellow]")
+    if counts['failed']:
+        console.print(f"[yellow]Retrying {counts['failed']:,} ZIP codes that failed before.[/yellow]")
+    
+    # Skip ZIP codes recently found to have no water systems, and re-check
+    # completed empty ones that are due
+    remaining_zips, skipped_zips = negative_cache.filter(remaining_zips)
+    recheck = negative_cache.due(state.with_results(PWS_CHECKPOINT, False))
+    if recheck:
+        state.reopen(PWS_CHECKPOINT, recheck)
+        remaining_zips += recheck
+        console.print(f"[yellow]Re-checking {len(recheck):,} completed ZIP codes found empty before[/yellow]")
+    if skipped_zips:
+        console.print(
+            f"[yellow]Skipping {len(skipped_zips):,} ZIP codes known to have no water systems "
+            f"({negative_cache.stats['sampled']:,} sampled and {negative_cache.stats['expired']:,} expired "
+            f"entries re-checked)[/yellow]"
+        )
+    return remaining_zips, skipped_zips
+
+
+def create_scheduler(
+    zip_codes: List[str],
+    state: StateStore,
+    skipped_zips: List[str],
+    negative_cache: NegativeCache
+) -> PrefixScheduler:
+    """Probe each 3-digit prefix first and defer prefixes whose probes are all empty."""
+    known_live = state.with_results(PWS_CHECKPOINT, True)
+    known_empty = set(skipped_zips) | set(state.with_results(PWS_CHECKPOINT, False))
+    return PrefixScheduler(
+        zip_codes,
+        prefix_len=PROBE_PREFIX_LEN,
+        probe_size=PROBES_PER_PREFIX,
+        known_live=known_live,
+        known_empty=known_empty,
+        must_fetch=negative_cache.revalidating,
+        full_sweep=FULL_SWEEP
+    )
+
+
+def shard_by_prefix(zip_codes: List[str]) -> Dict[str, List[str]]:
+    """Split ZIP codes into shards of whole prefixes with about SHARD_SIZE ZIP codes each."""
+    shards: Dict[str, List[str]] = {}
+    current: List[str] = []
+    
+    def close_shard():
+        shards[f"{current[0][:PROBE_PREFIX_LEN]}-{current[-1][:PROBE_PREFIX_LEN]}"] = list(current)
+        current.clear()
+    
+    for _, prefix_zips in itertools.groupby(sorted(zip_codes), key=lambda z: z[:PROBE_PREFIX_LEN]):
+        current.extend(prefix_zips)
+        if len(current) >= SHARD_SIZE:
+            close_shard()
+    if current:
+        close_shard()
+    return shards
+
+
+def finalize_output(writer: DatasetWriter, skipped_zips: List[str]):
+    """Compact part files and save statistics."""
+    if writer.num_rows:
+        writer.compact(PWS_BY_ZIP_FILE, dedup_key=PWS_BY_ZIP_KEY)
+        final_df = pd.read_parquet(PWS_BY_ZIP_FILE)
+        
+        save_statistics(final_df, skipped_empty=len(skipped_zips))
+    else:
+        console.print("[yellow]No PWS data found[/yellow]")
+
+
+async def main(
+    reparse: bool = False,
+    controller: Optional[AdaptiveController] = None,
+    pws_sink: Optional[Callable[[str], None]] = None,
+    metrics: Optional[Metrics] = None,
+    check_lease: Optional[Callable[[], None]] = None
+):
+    """
+    Main function to scrape PWS data for all ZIP codes.
+    
+    Args:
+        reparse: Rebuild silver output from the page archive instead of scraping
+        controller: Rate controller shared with other stages (built from the
+            module limits when omitted)
+        pws_sink: Called with each discovered PWS ID, e.g. to feed step 3
+        metrics: Registry for this stage's metrics (created when omitted),
+            e.g. so the runner can follow progress
+    """
     console.print("[bold blue]EWG Water Quality Scraper - Step 2: Scrape PWS by ZIP Code[/bold blue]")
     
     # Check if ZIP codes exist
@@ -137,84 +388,250 @@ async def main():
         console.print("[bold red]Error: ZIP codes file not found. Run step 1 first.[/bold red]")
         return
     
-    tracker = ProgressTracker()
+    if metrics is None:
+        metrics = create_metrics(PWS_CHECKPOINT)
     
-    # Load ZIP codes
-    zip_df = pd.read_parquet(ZIP_CODES_FILE)
-    all_zip_codes = zip_df['zip_code'].tolist()
-    console.print(f"[green]Loaded {len(all_zip_codes):,} ZIP codes[/green]")
+    if reparse:
+        with metrics.timer('stage_duration_seconds', 'Seconds spent per stage phase', phase='reparse'):
+            async with ParseExecutor(metrics=metrics) as parse_executor:
+                page_store = PageStore(PAGES_DIR)
+                console.print(f"[cyan]Reparsing {len(page_store):,} archived search pages...[/cyan]")
+                final_df = await reparse_archive(page_store, parse_executor)
+                page_store.close()
+        write_metrics(metrics, METRICS_FILE, METRICS_SUMMARY_FILE)
+        
+        if final_df.empty:
+            console.print("[yellow]No PWS data found in archive[/yellow]")
+            return
+        
+        writer = DatasetWriter(PWS_BY_ZIP_DATASET, PWS_BY_ZIP_SCHEMA)
+        state = open_state(STATE_FILE, PWS_CHECKPOINT, writer, console, "ZIP codes", read_legacy_has_pws)
+        writer.clear()
+        state.clear_parts(PWS_CHECKPOINT)
+        state.commit_batch(PWS_CHECKPOINT, writer, final_df, done={})
+        state.close()
+        writer.compact(PWS_BY_ZIP_FILE, dedup_key=PWS_BY_ZIP_KEY)
+        console.print(f"[bold green]✓ Rebuilt {len(final_df):,} PWS records from archive[/bold green]")
+        save_statistics(final_df)
+        return
     
-    # Check for existing progress
-    completed_zips = tracker.get_completed_items(PWS_CHECKPOINT)
-    remaining_zips = [z for z in all_zip_codes if z not in completed_zips]
+    # Results are streamed and appended as part files every FLUSH_EVERY ZIP codes
+    writer = DatasetWriter(PWS_BY_ZIP_DATASET, PWS_BY_ZIP_SCHEMA)
+    state = open_state(STATE_FILE, PWS_CHECKPOINT, writer, console, "ZIP codes", read_legacy_has_pws)
     
-    if completed_zips:
-        console.print(f"[yellow]Resuming from checkpoint. {len(completed_zips):,} already completed.[/yellow]")
+    # Carry over output from before part files were used
+    if PWS_BY_ZIP_FILE.exists() and not writer.parts:
+        state.commit_batch(PWS_CHECKPOINT, writer, pd.read_parquet(PWS_BY_ZIP_FILE), done={})
     
-    console.print(f"[cyan]Processing {len(remaining_zips):,} remaining ZIP codes...[/cyan]")
+    negative_cache = NegativeCache(EMPTY_ZIP_CACHE_FILE, ttl=EMPTY_ZIP_TTL_DAYS * 24 * 3600)
+    remaining_zips, skipped_zips = load_remaining_zip_codes(state, negative_cache)
+    scheduler = create_scheduler(remaining_zips, state, skipped_zips, negative_cache)
     
-    # Process in batches to save progress periodically
-    batch_size = 1000
-    all_results = []
+    console.print(
+        f"[cyan]Processing {len(remaining_zips):,} remaining ZIP codes "
+        f"({scheduler.stats['probes']:,} prefix probes first)...[/cyan]"
+    )
     
-    # Load existing results if any
-    if PWS_BY_ZIP_FILE.exists():
-        existing_df = pd.read_parquet(PWS_BY_ZIP_FILE)
-        all_results.append(existing_df)
-        console.print(f"[green]Loaded {len(existing_df):,} existing PWS records[/green]")
+    if writer.num_rows:
+        console.print(f"[green]Found {writer.num_rows:,} existing PWS records[/green]")
     
-    for i in range(0, len(remaining_zips), batch_size):
-        batch = remaining_zips[i:i + batch_size]
-        console.print(f"\n[cyan]Processing batch {i//batch_size + 1} ({len(batch)} ZIP codes)...[/cyan]")
-        
+    # One pooled session for the whole stage so connections stay warm
+    if controller is None:
+        controller = create_controller(ADAPTIVE_RATE, MAX_CONCURRENT, RATE_LIMIT, CONCURRENCY_RANGE, RATE_RANGE)
+    processor = ParallelProcessor(
+        max_concurrent=MAX_CONCURRENT, rate_limit=RATE_LIMIT, controller=controller, metrics=metrics
+    )
+    page_store = PageStore(PAGES_DIR)
+    http_cache = HttpCache(HTTP_CACHE_FILE, ttl=HTTP_CACHE_TTL)
+    async with ParseExecutor(metrics=metrics) as parse_executor, \
+            RetryableSession(
+                max_connections_per_host=processor.max_concurrent, controller=controller, cache=http_cache,
+                metrics=metrics
+            ) as session:
         try:
-            batch_df = await process_zip_codes_batch(batch, tracker)
-            
-            if not batch_df.empty:
-                all_results.append(batch_df)
-                
-                # Save intermediate results
-                combined_df = pd.concat(all_results, ignore_index=True)
-                combined_df.to_parquet(PWS_BY_ZIP_FILE, index=False)
-                console.print(f"[green]Saved {len(combined_df):,} total PWS records[/green]")
-        
+            with metrics.timer('stage_duration_seconds', 'Seconds spent per stage phase', phase='scrape'):
+                await scrape_zip_codes(
+                    remaining_zips, state, session, processor, writer, page_store, parse_executor,
+                    negative_cache, scheduler, pws_sink, metrics
+                )
         except Exception as e:
-            console.print(f"[red]Error processing batch: {e}[/red]")
-            logger.exception("Batch processing error")
-            # Continue with next batch
-    
-    # Final save and statistics
-    if all_results:
-        final_df = pd.concat(all_results, ignore_index=True)
-        final_df.to_parquet(PWS_BY_ZIP_FILE, index=False)
-        
-        # Calculate statistics
-        stats = {
-            'total_pws': len(final_df),
-            'unique_pws': final_df['pws_id'].nunique(),
-            'zip_codes_with_pws': final_df['zip_code'].nunique(),
-            'total_people_served': int(final_df['people_served'].sum()) if 'people_served' in final_df else 0,
-            'featured_utilities': int(final_df['is_featured'].sum()) if 'is_featured' in final_df else 0,
-        }
-        
-        stats_file = SILVER_DIR / "pws_stats.json"
-        with open(stats_file, 'w') as f:
-            json.dump(stats, f, indent=2)
-        
-        console.print("\n[bold green]✓ Scraping complete![/bold green]")
-        console.print(f"Total PWS records: {stats['total_pws']:,}")
-        console.print(f"Unique PWS: {stats['unique_pws']:,}")
-        console.print(f"ZIP codes with PWS: {stats['zip_codes_with_pws']:,}")
-        console.print(f"Total people served: {stats['total_people_served']:,}")
+            console.print(f"[red]Error processing ZIP codes: {e}[/red]")
+            logger.exception("ZIP code processing error")
         
-        # Update ZIP codes file with coverage info
-        zip_df['has_pws'] = zip_df['zip_code'].isin(final_df['zip_code'])
-        zip_df['fetched'] = zip_df['zip_code'].isin(completed_zips | set(remaining_zips))
-        zip_df.to_parquet(ZIP_CODES_FILE, index=False)
+        print_session_stats(console, session, controller)
+    page_store.close()
+    http_cache.close()
+    negative_cache.close()
+    state.close()
+    
+    # Record deferred prefixes so a later --full-sweep run can cover them
+    deferred = {prefix: len(zips) for prefix, zips in sorted(scheduler.deferred.items())}
+    with open(DEFERRED_PREFIXES_FILE, 'w') as f:
+        json.dump(deferred, f, indent=2)
+    console.print(
+        f"[dim]ZIP prefixes: {scheduler.stats['live_prefixes']:,} with PWS, "
+        f"{scheduler.stats['dead_prefixes']:,} without[/dim]"
+    )
+    if deferred:
+        console.print(
+            f"[yellow]Deferred {scheduler.num_deferred:,} ZIP codes in {len(deferred):,} prefixes whose probes "
+            f"found no PWS; run with --full-sweep to cover them[/yellow]"
+        )
+    
+    if skipped_zips or negative_cache.stats['marked_empty']:
+        console.print(
+            f"[green]Negative cache: {len(skipped_zips):,} requests saved this run; "
+            f"{negative_cache.stats['marked_empty']:,} ZIP codes recorded as empty, "
+            f"{negative_cache.stats['cleared']:,} previously empty now have water systems[/green]"
+        )
+    
+    with metrics.timer('stage_duration_seconds', 'Seconds spent per stage phase', phase='compact'):
+        finalize_output(writer, skipped_zips)
+    write_metrics(metrics, METRICS_FILE, METRICS_SUMMARY_FILE)
+    console.print(f"[dim]Metrics written to {METRICS_FILE} and {METRICS_SUMMARY_FILE}[/dim]")
+
+
+async def run_worker(worker_id: str):
+    """
+    Scrape ZIP codes as one of several workers sharing a lease-based queue.
+    
+    The first worker splits the remaining ZIP codes into shards; every worker
+    (process or machine sharing the data directory) then leases shards until
+    none are left. Workers keep their own part files and page packs and
+    record progress in the shared state store; the last one to finish merges
+    the part files and writes the silver output. Shards of a crashed worker
+    are re-leased once their lease expires.
+    
+    Args:
+        worker_id: Unique name of this worker
+    """
+    console.print(
+        f"[bold blue]EWG Water Quality Scraper - Step 2: Scrape PWS by ZIP Code (worker {worker_id})[/bold blue]"
+    )
+    
+    if not ZIP_CODES_FILE.exists():
+        console.print("[bold red]Error: ZIP codes file not found. Run step 1 first.[/bold red]")
+        return
+    
+    worker_writer = DatasetWriter(PWS_BY_ZIP_DATASET, PWS_BY_ZIP_SCHEMA, prefix=f"part-{worker_id}")
+    state = open_state(
+        STATE_FILE, PWS_CHECKPOINT, DatasetWriter(PWS_BY_ZIP_DATASET, PWS_BY_ZIP_SCHEMA), console, "ZIP codes",
+        read_legacy_has_pws
+    )
+    state.discard_uncommitted(PWS_CHECKPOINT, worker_writer)
+    negative_cache = NegativeCache(EMPTY_ZIP_CACHE_FILE, ttl=EMPTY_ZIP_TTL_DAYS * 24 * 3600)
+    remaining_zips, skipped_zips = load_remaining_zip_codes(state, negative_cache)
+    
+    work_queue = WorkQueue(WORK_QUEUE_FILE, lease_seconds=LEASE_SECONDS)
+    shards = shard_by_prefix(remaining_zips)
+    if work_queue.populate(WORK_QUEUE_NAME, shards):
+        console.print(f"[cyan]Queued {len(remaining_zips):,} ZIP codes in {len(shards):,} shards[/cyan]")
+    counts = work_queue.counts(WORK_QUEUE_NAME)
+    console.print(
+        f"[cyan]Shards: {counts['pending']:,} pending, {counts['leased']:,} leased, {counts['done']:,} done[/cyan]"
+    )
+    
+    controller = create_controller(ADAPTIVE_RATE, MAX_CONCURRENT, RATE_LIMIT, CONCURRENCY_RANGE, RATE_RANGE)
+    metrics = create_metrics(PWS_CHECKPOINT, worker_id)
+    processor = ParallelProcessor(
+        max_concurrent=MAX_CONCURRENT, rate_limit=RATE_LIMIT, controller=controller, metrics=metrics
+    )
+    page_store = PageStore(PAGES_DIR, writer_id=worker_id)
+    http_cache = HttpCache(HTTP_CACHE_FILE, ttl=HTTP_CACHE_TTL)
+    async with ParseExecutor(metrics=metrics) as parse_executor, \
+            RetryableSession(
+                max_connections_per_host=processor.max_concurrent, controller=controller, cache=http_cache,
+                metrics=metrics
+            ) as session:
+        async def process_shard(shard: Shard):
+            # Skip what a worker that lost this shard already committed
+            zip_codes = state.not_done(PWS_CHECKPOINT, shard.items)
+            scheduler = create_scheduler(zip_codes, state, skipped_zips, negative_cache)
+            await scrape_zip_codes(
+                zip_codes, state, session, processor, worker_writer, page_store, parse_executor,
+                negative_cache, scheduler, metrics=metrics,
+                check_lease=lambda: work_queue.check_lease(shard, worker_id)
+            )
         
-    else:
-        console.print("[yellow]No PWS data found[/yellow]")
+        with metrics.timer('stage_duration_seconds', 'Seconds spent per stage phase', phase='scrape'):
+            completed = await work_shards(work_queue, WORK_QUEUE_NAME, worker_id, process_shard, controller)
+        console.print(f"[green]Completed {completed:,} shards[/green]")
+        print_session_stats(console, session, controller)
+    write_metrics(metrics, METRICS_FILE, METRICS_SUMMARY_FILE)
+    page_store.close()
+    http_cache.close()
+    negative_cache.close()
+    
+    if not work_queue.claim_finalize(WORK_QUEUE_NAME, worker_id):
+        work_queue.close()
+        state.close()
+        console.print("[green]✓ No shards left; the last worker to finish merges the output[/green]")
+        return
+    
+    # Last worker to finish: move every worker's committed part files into the main sequence
+    writer = DatasetWriter(PWS_BY_ZIP_DATASET, PWS_BY_ZIP_SCHEMA)
+    for worker in work_queue.workers(WORK_QUEUE_NAME):
+        other = DatasetWriter(PWS_BY_ZIP_DATASET, PWS_BY_ZIP_SCHEMA, prefix=f"part-{worker}")
+        state.discard_uncommitted(PWS_CHECKPOINT, other)
+        state.rename_parts(PWS_CHECKPOINT, writer.adopt(other))
+    state.close()
+    work_queue.clear(WORK_QUEUE_NAME)
+    work_queue.close()
+    console.print(f"[green]Merged output of all workers ({writer.num_rows:,} PWS records)[/green]")
+    
+    finalize_output(writer, skipped_zips)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--reparse',
+        action='store_true',
+        help='Rebuild silver output from archived pages without refetching'
+    )
+    parser.add_argument(
+        '--parser-engine',
+        choices=sorted(SEARCH_PARSER_ENGINES),
+        default=PARSER_ENGINE,
+        help='Search-results parser engine'
+    )
+    parser.add_argument(
+        '--fixed-rate',
+        action='store_true',
+        help='Use fixed MAX_CONCURRENT / RATE_LIMIT instead of adaptive limits'
+    )
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=HTTP_CACHE_TTL,
+        help='Seconds a cached page is reused without revalidation (0 = always revalidate)'
+    )
+    parser.add_argument(
+        '--full-sweep',
+        action='store_true',
+        help='Also scrape ZIP codes in prefixes whose probes found no PWS'
+    )
+    parser.add_argument(
+        '--base-url',
+        default=EWG_BASE_URL,
+        help='Site root to scrape instead of www.ewg.org (e.g. the benchmark stub server)'
+    )
+    parser.add_argument(
+        '--worker',
+        nargs='?',
+        const='',
+        metavar='ID',
+        help='Run as one of several workers sharing a work queue (ID defaults to <hostname>-<pid>)'
+    )
+    args = parser.parse_args()
+    if args.worker is not None and args.reparse:
+        parser.error("--reparse rebuilds the output in one process; run it without --worker")
+    PARSER_ENGINE = args.parser_engine
+    ADAPTIVE_RATE = not args.fixed_rate
+    EWG_BASE_URL = args.base_url.rstrip('/')
+    HTTP_CACHE_TTL = args.cache_ttl
+    FULL_SWEEP = args.full_sweep
+    if args.worker is not None:
+        asyncio.run(run_worker(args.worker or default_worker_id()))
+    else:
+        asyncio.run(main(reparse=args.reparse))
\ No newline at end of file
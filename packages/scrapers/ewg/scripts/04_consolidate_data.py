@@ -2,6 +2,8 @@
 Step 4: Consolidate and process final data into Gold layer.
 """
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from pathlib import Path
 import json
 from rich.console import Console
@@ -9,6 +11,9 @@ from rich.table import Table
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
+from parsers import normalize_pws_details
+from utils import write_partitioned, zip_state, pws_state
+
 console = Console()
 
 # Paths
@@ -17,42 +22,53 @@ GOLD_DIR = Path("data/gold")
 
 PWS_BY_ZIP_FILE = SILVER_DIR / "pws_by_zip.parquet"
 PWS_DETAILS_FILE = GOLD_DIR / "pws_water_quality.parquet"
-FINAL_DATASET_FILE = GOLD_DIR / "ewg_water_quality_complete.parquet"
 CONTAMINANTS_REFERENCE_FILE = GOLD_DIR / "contaminants_reference.parquet"
-ZIP_CODE_SUMMARY_FILE = GOLD_DIR / "zip_code_water_summary.parquet"
+
+# Lookup datasets, Hive-partitioned by state with one sorted file per state
+# (see utils.write_partitioned); read them with utils.read_partitioned and
+# utils.lookup_filter so only one state's file is opened
+BY_STATE_DIR = GOLD_DIR / "by_state"
+FINAL_DATASET_DIR = BY_STATE_DIR / "ewg_water_quality_complete"
+PWS_DETAILS_DATASET_DIR = BY_STATE_DIR / "pws_water_quality"
+ZIP_CODE_SUMMARY_DIR = BY_STATE_DIR / "zip_code_water_summary"
+# Single-file outputs the datasets replace; removed once they are written
+SUPERSEDED_FILES = [GOLD_DIR / "ewg_water_quality_complete.parquet", GOLD_DIR / "zip_code_water_summary.parquet"]
+
+
+def _collect_unique_values(contam_df: pd.DataFrame, column: str) -> pd.Series:
+    """Unique values of a list column per contaminant, as lists."""
+    # Flattened and deduplicated in Arrow; exploding the lists in pandas is several times slower
+    lists = pa.array(contam_df[column], type=pa.list_(pa.string()), from_pandas=True)
+    names = pa.array(contam_df['contaminant_name'], from_pandas=True)
+    pairs = pa.table({
+        'contaminant_name': names.take(pc.list_parent_indices(lists)),
+        column: pc.list_flatten(lists),
+    })
+    # Single-threaded grouping keeps the order of first appearance
+    pairs = pairs.group_by(['contaminant_name', column], use_threads=False).aggregate([]).to_pandas()
+    return pairs.groupby('contaminant_name', sort=False, observed=True)[column].agg(list)
 
 
 def create_contaminants_reference(details_df: pd.DataFrame) -> pd.DataFrame:
     """Create a reference table of all contaminants with their properties."""
-    contaminants = []
-    
-    # Get unique contaminants with their properties
-    contam_df = details_df[details_df['contaminant_name'].notna()].copy()
-    
-    for contam_name in contam_df['contaminant_name'].unique():
-        contam_data = contam_df[contam_df['contaminant_name'] == contam_name].iloc[0]
-        
-        # Get all unique pollution sources and filter options
-        all_sources = set()
-        all_filters = set()
-        
-        contam_rows = contam_df[contam_df['contaminant_name'] == contam_name]
-        for _, row in contam_rows.iterrows():
-            if pd.notna(row['pollution_sources']):
-                all_sources.update(row['pollution_sources'].split('|'))
-            if pd.notna(row['filter_options']):
-                all_filters.update(row['filter_options'].split('|'))
-        
-        contaminants.append({
-            'contaminant_name': contam_name,
-            'potential_effects': contam_data['potential_effect'],
-            'pollution_sources': list(all_sources),
-            'filter_options': list(all_filters),
-            'systems_affected': len(contam_rows['pws_id'].unique()),
-            'people_affected': contam_rows.groupby('pws_id')['people_served'].first().sum()
-        })
-    
-    return pd.DataFrame(contaminants)
+    contam_df = details_df[details_df['contaminant_name'].notna()]
+    
+    # First row of each contaminant, in order of first appearance
+    reference = contam_df.drop_duplicates('contaminant_name')[['contaminant_name', 'potential_effect']]
+    reference = reference.rename(columns={'potential_effect': 'potential_effects'}).set_index('contaminant_name')
+    
+    # All unique pollution sources and filter options
+    for column in ['pollution_sources', 'filter_options']:
+        values = _collect_unique_values(contam_df, column).reindex(reference.index)
+        reference[column] = [value if isinstance(value, list) else [] for value in values]
+    
+    reference['systems_affected'] = contam_df.groupby('contaminant_name', sort=False)['pws_id'].nunique(dropna=False)
+    reference['people_affected'] = (
+        contam_df.groupby(['contaminant_name', 'pws_id'], sort=False)['people_served'].first()
+        .groupby(level='contaminant_name', sort=False).sum()
+    )
+    
+    return reference.reset_index()
 
 
 def create_zip_code_summary(pws_zip_df: pd.DataFrame, details_df: pd.DataFrame) -> pd.DataFrame:
@@ -66,7 +82,9 @@ def create_zip_code_summary(pws_zip_df: pd.DataFrame, details_df: pd.DataFrame)
         'num_contaminants_other': 'first'
     }).reset_index()
     
-    merged = pws_zip_df.merge(pws_summary, on='pws_id', how='left')
+    # people_served from the details page, falling back to the search listing
+    merged = pws_zip_df.merge(pws_summary, on='pws_id', how='left', suffixes=('_search', ''))
+    merged['people_served'] = merged['people_served'].fillna(merged['people_served_search'])
     
     # Aggregate by ZIP code
     zip_summary = merged.groupby('zip_code').agg({
@@ -91,6 +109,33 @@ def create_zip_code_summary(pws_zip_df: pd.DataFrame, details_df: pd.DataFrame)
     return zip_summary
 
 
+def write_gold_datasets(complete_df: pd.DataFrame, details_df: pd.DataFrame, zip_summary: pd.DataFrame):
+    """
+    Write the lookup datasets partitioned by state.
+    
+    Rows keyed by ZIP code are partitioned by the ZIP's state (falling back
+    to the PWS prefix for ZIP codes outside the USPS table) and sorted by
+    ZIP code; PWS details are partitioned by the PWS prefix and sorted by
+    PWS ID. Bloom filters cover the lookup keys.
+    """
+    complete_state = zip_state(complete_df['zip_code']).fillna(pws_state(complete_df['pws_id']))
+    datasets = [
+        (FINAL_DATASET_DIR, complete_df.assign(state=complete_state), ['zip_code', 'pws_id'], ['zip_code', 'pws_id']),
+        (PWS_DETAILS_DATASET_DIR, details_df.assign(state=pws_state(details_df['pws_id'])), ['pws_id'], ['pws_id']),
+        (ZIP_CODE_SUMMARY_DIR, zip_summary.assign(state=zip_state(zip_summary['zip_code'])), ['zip_code'], ['zip_code']),
+    ]
+    for dataset_dir, df, sort_by, bloom_filter_columns in datasets:
+        rows_by_state = write_partitioned(df, dataset_dir, sort_by, bloom_filter_columns=bloom_filter_columns)
+        console.print(
+            f"[green]✓ Saved {dataset_dir.name}: {len(df):,} records in {len(rows_by_state):,} state partitions[/green]"
+        )
+    
+    for superseded in SUPERSEDED_FILES:
+        if superseded.exists():
+            superseded.unlink()
+            console.print(f"[dim]Removed {superseded} (replaced by {BY_STATE_DIR})[/dim]")
+
+
 def main():
     """Consolidate all data into final Gold layer datasets."""
     console.print("[bold blue]EWG Water Quality Scraper - Step 4: Consolidate Data[/bold blue]")
@@ -103,7 +148,8 @@ def main():
     # Load data
     console.print("[cyan]Loading data files...[/cyan]")
     pws_zip_df = pd.read_parquet(PWS_BY_ZIP_FILE)
-    details_df = pd.read_parquet(PWS_DETAILS_FILE)
+    # Details written before measurements were typed are normalized here
+    details_df = normalize_pws_details(pd.read_parquet(PWS_DETAILS_FILE))
     
     console.print(f"Loaded {len(pws_zip_df):,} PWS-ZIP mappings")
     console.print(f"Loaded {len(details_df):,} water quality records")
@@ -111,16 +157,16 @@ def main():
     # Create complete dataset with all information
     console.print("\n[cyan]Creating complete dataset...[/cyan]")
     
-    # Merge PWS info with details
+    # Merge PWS info with details; where both have a column (location,
+    # people_served) the details value keeps the plain name
     complete_df = pws_zip_df.merge(
         details_df,
         on='pws_id',
-        how='inner'
+        how='inner',
+        suffixes=('_search', '')
     )
     
-    # Save complete dataset
-    complete_df.to_parquet(FINAL_DATASET_FILE, index=False)
-    console.print(f"[green]✓ Saved complete dataset: {len(complete_df):,} records[/green]")
+    console.print(f"[green]✓ Complete dataset: {len(complete_df):,} records[/green]")
     
     # Create contaminants reference
     console.print("\n[cyan]Creating contaminants reference...[/cyan]")
@@ -131,8 +177,11 @@ def main():
     # Create ZIP code summary
     console.print("\n[cyan]Creating ZIP code summary...[/cyan]")
     zip_summary = create_zip_code_summary(pws_zip_df, details_df)
-    zip_summary.to_parquet(ZIP_CODE_SUMMARY_FILE, index=False)
-    console.print(f"[green]✓ Saved ZIP code summary: {len(zip_summary):,} ZIP codes[/green]")
+    console.print(f"[green]✓ ZIP code summary: {len(zip_summary):,} ZIP codes[/green]")
+    
+    # Save the lookup datasets
+    console.print("\n[cyan]Writing state-partitioned datasets...[/cyan]")
+    write_gold_datasets(complete_df, details_df, zip_summary)
     
     # Display summary statistics
     console.print("\n[bold green]Final Dataset Statistics:[/bold green]")
@@ -185,9 +234,10 @@ def main():
         'total_records': len(complete_df),
         'top_contaminants': top_contaminants.to_dict('records'),
         'data_files': {
-            'complete_dataset': str(FINAL_DATASET_FILE),
+            'complete_dataset': str(FINAL_DATASET_DIR),
+            'pws_water_quality': str(PWS_DETAILS_DATASET_DIR),
             'contaminants_reference': str(CONTAMINANTS_REFERENCE_FILE),
-            'zip_code_summary': str(ZIP_CODE_SUMMARY_FILE)
+            'zip_code_summary': str(ZIP_CODE_SUMMARY_DIR)
         }
     }
     
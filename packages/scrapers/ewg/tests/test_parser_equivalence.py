@@ -0,0 +1,124 @@
+"""
+The lxml parser engines must emit exactly what the BeautifulSoup references do.
+
+Both engines parse the synthetic corpus of ``benchmarks/fixtures.py`` and
+hand-written pages with the markup the corpus does not produce: comments,
+scripts, text in attribute values, tables without ``tbody``.
+
+Usage:
+    python -m pytest tests
+"""
+import random
+import sys
+from pathlib import Path
+import pytest
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / "benchmarks"))
+
+from fixtures import generate_corpus, render_search_page, render_system_page
+from parsers.search_results import parse_pws_from_html_lxml, parse_pws_from_html_bs4
+from parsers.pws_details import parse_pws_details_lxml, parse_pws_details_bs4
+
+CORPUS = generate_corpus(zip_codes=60, seed=5)
+
+LISTINGS = [
+    {'pws_id': 'NJ0238001', 'utility_name': 'City of Springfield Water &amp; Sewer',
+     'location': 'Springfield, NJ', 'people_served': 12_345},
+    {'pws_id': 'CA1910067', 'utility_name': 'Town of Shelbyville', 'location': 'Shelbyville, CA',
+     'people_served': 880},
+]
+SEARCH_PAGE = render_search_page(random.Random(1), LISTINGS, boilerplate_kb=1)
+_ROW_START = SEARCH_PAGE.index('<tr><td')
+FIRST_ROW = SEARCH_PAGE[_ROW_START:SEARCH_PAGE.index('</tr>', _ROW_START) + len('</tr>')]
+
+SEARCH_EDGE_CASES = {
+    'empty document': '',
+    'whitespace only': '  \n ',
+    'no results': render_search_page(random.Random(1), [], boilerplate_kb=1),
+    'comment in row': SEARCH_PAGE.replace('<td data-label="Location">', '<!-- cell --><td data-label="Location">'),
+    'comment in cell': SEARCH_PAGE.replace('Springfield, NJ', 'Springfield,<!-- town --> NJ'),
+    'comment in link': SEARCH_PAGE.replace('<span class="star">', '<!-- featured --><span class="star">'),
+    'comment in tbody': SEARCH_PAGE.replace('<tbody>', '<tbody><!-- rows -->'),
+    'script in cell': SEARCH_PAGE.replace('Springfield, NJ', 'Springfield, NJ<script>var pws = "NJ1";</script>'),
+    'script in link': SEARCH_PAGE.replace('<span class="star">', '<script>track("pws=NJ1")</script><span>'),
+    'pws in attribute only': SEARCH_PAGE.replace('href="system.php?pws=NJ0238001"',
+                                                 'href="system.php" data-href="system.php?pws=NJ0238001"'),
+    'link without href': SEARCH_PAGE.replace('href="system.php?pws=NJ0238001"', 'name="system"'),
+    'text in title attribute': SEARCH_PAGE.replace('<td data-label="Location">',
+                                                   '<td data-label="Location" title="Population served: 1">'),
+    'missing tbody': SEARCH_PAGE.replace('<tbody>', '').replace('</tbody>', ''),
+    'thead only': SEARCH_PAGE.replace(f'<tbody>{FIRST_ROW}</tbody>', ''),
+    'two cells': SEARCH_PAGE.replace('<td data-label="Population">', '<th data-label="Population">'),
+    'nested table': SEARCH_PAGE.replace('Springfield, NJ', '<table><tbody><tr><td>x</td></tr></tbody></table>'),
+    'extra classes': SEARCH_PAGE.replace('class="search-results-table"', 'class="wide search-results-table  dark"'),
+    'unparsable population': SEARCH_PAGE.replace('Population served: 880', 'Population served: n/a'),
+    'whitespace in cells': SEARCH_PAGE.replace('<td data-label="Location">', '<td data-label="Location">\n  '),
+    'row outside tables': SEARCH_PAGE.replace('<main>', f'<main><table>{FIRST_ROW}</table>'),
+}
+
+SYSTEM = {'pws_id': 'NJ0238001', 'location': 'Springfield, NJ', 'people_served': 12_345}
+SYSTEM_PAGE = render_system_page(random.Random(3), SYSTEM, boilerplate_kb=1)
+COMPLIANT = 'was in compliance with federal health-based drinking water standards'
+NOT_COMPLIANT = 'does not meet all federal health-based drinking water standards'
+NO_COMPLIANCE = SYSTEM_PAGE.replace(COMPLIANT, 'has no compliance record')
+
+SYSTEM_EDGE_CASES = {
+    'empty document': '',
+    'no sections': '<html><body><main></main></body></html>',
+    'not compliant': SYSTEM_PAGE.replace(COMPLIANT, NOT_COMPLIANT),
+    'not compliant across tags': SYSTEM_PAGE.replace(COMPLIANT, '<b>does not meet</b> all federal standards'),
+    'not compliant across lines': SYSTEM_PAGE.replace(COMPLIANT, 'does not meet all\nfederal standards'),
+    'compliance in attribute': NO_COMPLIANCE.replace('<p class="compliance">',
+                                                     f'<p class="compliance" title="{COMPLIANT}">'),
+    'non-compliance in attribute': NO_COMPLIANCE.replace('<main>', f'<main data-note="{NOT_COMPLIANT}">'),
+    'compliance in comment': NO_COMPLIANCE.replace('<main>', f'<main><!-- {COMPLIANT} -->'),
+    'non-compliance in script': NO_COMPLIANCE.replace('<main>',
+                                                      f'<main><script>var note = "{NOT_COMPLIANT}";</script>'),
+    'comment after html': f'{NO_COMPLIANCE}<!-- {NOT_COMPLIANT} -->',
+    'comment before html': f'<!-- {NOT_COMPLIANT} -->{NO_COMPLIANCE}',
+    'script after html': f'{NO_COMPLIANCE}<script>var note = "{NOT_COMPLIANT}";</script>',
+    'entity in compliance': SYSTEM_PAGE.replace(COMPLIANT, 'does not meet &amp; federal standards'),
+    'comment in hero': SYSTEM_PAGE.replace('<h4>Location</h4>', '<h4>Location</h4><!-- hero -->'),
+    'markup in hero label': SYSTEM_PAGE.replace('<h4>Location</h4>', '<h4> <b>Location</b></h4>'),
+    'hero value missing': SYSTEM_PAGE.replace('<h2>12,345</h2>', ''),
+    'unparsable population': SYSTEM_PAGE.replace('<h2>12,345</h2>', '<h2>n/a</h2>'),
+    'comment in contaminant list': SYSTEM_PAGE.replace('<h4>Pollution Sources</h4><div>',
+                                                       '<h4>Pollution Sources</h4><!-- sources --><div>'),
+    'whitespace in contaminant list': SYSTEM_PAGE.replace('<h4>Pollution Sources</h4><div>',
+                                                          '<h4>Pollution Sources</h4>\n  <div>'),
+    'script in contaminant card': SYSTEM_PAGE.replace('<h3>', '<script>var card = 1;</script><h3>'),
+    'extra classes': SYSTEM_PAGE.replace('class="potentital-effect"', 'class="x potentital-effect  y"'),
+    'no year': SYSTEM_PAGE.replace('Data from', 'Data').split('<p class="data-note">')[0] + '</main></body></html>',
+}
+
+
+@pytest.mark.parametrize('zip_code', sorted(CORPUS.search_pages))
+def test_search_results_corpus(zip_code):
+    html = CORPUS.search_pages[zip_code]
+    assert parse_pws_from_html_lxml(html, zip_code) == parse_pws_from_html_bs4(html, zip_code)
+
+
+@pytest.mark.parametrize('case', SEARCH_EDGE_CASES)
+def test_search_results_edge_cases(case):
+    html = SEARCH_EDGE_CASES[case]
+    for page in (html, html.encode('utf-8')):
+        assert parse_pws_from_html_lxml(page, '08001') == parse_pws_from_html_bs4(page, '08001')
+
+
+@pytest.mark.parametrize('pws_id', sorted(CORPUS.system_pages))
+def test_pws_details_corpus(pws_id):
+    html = CORPUS.system_pages[pws_id]
+    assert parse_pws_details_lxml(html, pws_id) == parse_pws_details_bs4(html, pws_id)
+
+
+@pytest.mark.parametrize('case', SYSTEM_EDGE_CASES)
+def test_pws_details_edge_cases(case):
+    html = SYSTEM_EDGE_CASES[case]
+    for page in (html, html.encode('utf-8')):
+        assert parse_pws_details_lxml(page, 'NJ0238001') == parse_pws_details_bs4(page, 'NJ0238001')
+
+
+def test_edge_cases_cover_compliance():
+    """The compliance cases exercise every outcome, not just agreement."""
+    statuses = {parse_pws_details_bs4(html, 'NJ0238001')['compliance_status'] for html in SYSTEM_EDGE_CASES.values()}
+    assert statuses == {True, False, None}
@@ -1,6 +1,23 @@
 """Utility modules for EWG water quality scraper."""
-from .retry import RetryableSession
+from .retry import RetryableSession, HttpCache
+from .retry_policy import RetryPolicy, CircuitBreaker
 from .progress import ProgressTracker, create_progress_bar
 from .parallel import ParallelProcessor
+from .page_store import PageStore
+from .parse_executor import ParseExecutor
+from .dataset import DatasetWriter
+from .partitioning import write_partitioned, read_partitioned, open_partitioned, lookup_filter, zip_state, pws_state
+from .rate_control import AdaptiveController
+from .refresh import RefreshScheduler, content_hash
+from .negative_cache import NegativeCache
+from .prefix_scheduler import PrefixScheduler
+from .state import StateStore
+from .metrics import Metrics
+from .work_queue import WorkQueue, Shard, work_shards, default_worker_id
+from .stage import create_controller, open_state, print_session_stats, create_metrics, write_metrics, record_flush
 
-__all__ = ['RetryableSession', 'ProgressTracker', 'create_progress_bar', 'ParallelProcessor']
\ No newline at end of file
+__all__ = ['RetryableSession', 'HttpCache', 'RetryPolicy', 'CircuitBreaker', 'ProgressTracker', 'create_progress_bar', 'ParallelProcessor', 'PageStore', 'ParseExecutor',
+           'DatasetWriter', 'write_partitioned', 'read_partitioned', 'open_partitioned', 'lookup_filter', 'zip_state',
+           'pws_state', 'AdaptiveController', 'RefreshScheduler', 'content_hash',
+           'NegativeCache', 'PrefixScheduler', 'StateStore', 'Metrics', 'WorkQueue', 'Shard', 'work_shards', 'default_worker_id',
+           'create_controller', 'open_state', 'print_session_stats', 'create_metrics', 'write_metrics', 'record_flush']
\ No newline at end of file
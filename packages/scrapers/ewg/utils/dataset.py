@@ -0,0 +1,220 @@
+"""Streaming Parquet dataset writer built from immutable part files."""
+import os
+import re
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetWriter:
+    """
+    Append batches to a Parquet dataset as immutable part files.
+
+    Each ``write_batch`` writes one new ``part-NNNNNN.parquet`` file
+    (write to a temp file, then atomic rename), so the cost of a batch does
+    not depend on how much has already been written and nothing but the
+    current batch needs to be held in memory. ``compact`` streams all parts
+    into a single file row group by row group, optionally keeping only the
+    rows from the latest part for each key.
+
+    Writers with different prefixes can share a directory (e.g. one per
+    worker process); each only sees its own parts until they are moved into
+    another writer's sequence with ``adopt``.
+    """
+
+    def __init__(
+        self,
+        dataset_dir: Union[str, Path],
+        schema: pa.Schema,
+        prefix: str = "part",
+        upgrade: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+        compression: str = "snappy"
+    ):
+        """
+        Initialize dataset writer.
+
+        Args:
+            dataset_dir: Directory holding the part files
+            schema: Arrow schema every part is written with
+            prefix: File name prefix for part files
+            upgrade: Converts the rows of a part written with an older
+                schema; such parts are rewritten in place on open (without
+                it they cannot be read with ``schema``)
+            compression: Parquet codec of the part files and compacted output
+        """
+        self.dataset_dir = Path(dataset_dir)
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        self.schema = schema
+        self.prefix = prefix
+        self.compression = compression
+        self._part_name = re.compile(rf"{re.escape(prefix)}-\d{{6}}\.parquet")
+
+        # Drop temp files left behind by a crash mid-write
+        for tmp_file in self.dataset_dir.glob(f"{prefix}-*.parquet.tmp"):
+            if self._part_name.fullmatch(tmp_file.name[:-len('.tmp')]):
+                tmp_file.unlink()
+
+        parts = self.parts
+        self._next_seq = int(parts[-1].stem.rsplit('-', 1)[-1]) + 1 if parts else 0
+        self.num_rows = 0
+        for part in parts:
+            part_file = pq.ParquetFile(part)
+            if upgrade is not None and not part_file.schema_arrow.equals(schema):
+                self._write_part(self.to_table(upgrade(part_file.read().to_pandas())), part)
+                logger.info(f"Upgraded {part} to the current schema")
+            self.num_rows += part_file.metadata.num_rows
+
+    @property
+    def parts(self) -> List[Path]:
+        """Part files in write order."""
+        return sorted(
+            part for part in self.dataset_dir.glob(f"{self.prefix}-*.parquet")
+            if self._part_name.fullmatch(part.name)
+        )
+
+    def to_table(self, df: pd.DataFrame) -> pa.Table:
+        """Convert a DataFrame to the dataset schema, adding missing columns as nulls."""
+        df = df.reindex(columns=self.schema.names)
+        return pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+
+    def write_batch(self, df: pd.DataFrame) -> Optional[Path]:
+        """
+        Write a batch as a new part file.
+
+        Args:
+            df: Batch rows
+
+        Returns:
+            Path of the written part, or None for an empty batch
+        """
+        if df.empty:
+            return None
+
+        table = self.to_table(df)
+        part_file = self.dataset_dir / f"{self.prefix}-{self._next_seq:06d}.parquet"
+        self._write_part(table, part_file)
+
+        self._next_seq += 1
+        self.num_rows += table.num_rows
+        return part_file
+
+    def _write_part(self, table: pa.Table, part_file: Path):
+        tmp_file = part_file.with_suffix('.parquet.tmp')
+        pq.write_table(table, tmp_file, compression=self.compression)
+        os.replace(tmp_file, part_file)
+
+    def adopt(self, other: 'DatasetWriter') -> List[Tuple[Path, Path]]:
+        """
+        Move another writer's parts to the end of this writer's sequence.
+
+        Args:
+            other: Writer whose parts are taken over (left empty)
+
+        Returns:
+            ``(old_path, new_path)`` of every moved part
+        """
+        moves = []
+        for part in other.parts:
+            target = self.dataset_dir / f"{self.prefix}-{self._next_seq:06d}.parquet"
+            os.replace(part, target)
+            moves.append((part, target))
+            self._next_seq += 1
+        self.num_rows += other.num_rows
+        other.clear()
+        return moves
+
+    def discard(self, parts: List[Path]):
+        """Delete specific part files (e.g. ones whose batch never committed)."""
+        for part in parts:
+            self.num_rows -= pq.ParquetFile(part).metadata.num_rows
+            part.unlink()
+
+    def iter_tables(self, columns: Optional[List[str]] = None) -> Iterator[pa.Table]:
+        """Yield each part as an Arrow table, in write order."""
+        for part in self.parts:
+            yield pq.read_table(part, columns=columns, schema=self.schema)
+
+    def clear(self):
+        """Delete all part files."""
+        for part in self.parts:
+            part.unlink()
+        self._next_seq = 0
+        self.num_rows = 0
+
+    def latest_part_keys(self, key: Union[str, List[str]]) -> List[pa.Array]:
+        """
+        For each part, the keys whose most recent rows live in that part.
+
+        Only the key columns are read, so this is cheap even for large
+        datasets. Composite keys are returned as their joined string values.
+        """
+        columns = [key] if isinstance(key, str) else key
+        latest = {}
+        parts = self.parts
+        for index, part in enumerate(parts):
+            table = pq.read_table(part, columns=columns, schema=self.schema)
+            for value in self._key_column(table, key).unique().to_pylist():
+                latest[value] = index
+
+        keys_by_part: List[list] = [[] for _ in parts]
+        for value, index in latest.items():
+            keys_by_part[index].append(value)
+        key_type = self.schema.field(key).type if isinstance(key, str) else pa.string()
+        return [pa.array(keys, type=key_type) for keys in keys_by_part]
+
+    @staticmethod
+    def _key_column(table: pa.Table, key: Union[str, List[str]]) -> pa.ChunkedArray:
+        if isinstance(key, str):
+            return table.column(key)
+        # Unit separator: cannot occur in IDs or ZIP codes
+        return pc.binary_join_element_wise(*(pc.cast(table.column(name), pa.string()) for name in key), '\x1f')
+
+    def compact(
+        self,
+        target_file: Union[str, Path],
+        row_group_size: int = 128 * 1024,
+        dedup_key: Optional[Union[str, List[str]]] = None
+    ) -> int:
+        """
+        Stream all parts into a single Parquet file.
+
+        Args:
+            target_file: Output file (replaced atomically)
+            row_group_size: Target rows per row group in the output
+            dedup_key: If set, keep only the rows of the latest part that
+                contains each key value (later batches replace earlier ones);
+                a list of columns dedups on their combined values
+
+        Returns:
+            Number of rows written
+        """
+        target_file = Path(target_file)
+        keep_keys = self.latest_part_keys(dedup_key) if dedup_key else None
+        tmp_file = target_file.with_suffix('.parquet.tmp')
+        rows_written = 0
+        buffered: List[pa.Table] = []
+        buffered_rows = 0
+
+        with pq.ParquetWriter(tmp_file, self.schema, compression=self.compression) as writer:
+            for index, table in enumerate(self.iter_tables()):
+                if keep_keys is not None:
+                    table = table.filter(pc.is_in(self._key_column(table, dedup_key), value_set=keep_keys[index]))
+                buffered.append(table)
+                buffered_rows += table.num_rows
+                if buffered_rows >= row_group_size:
+                    writer.write_table(pa.concat_tables(buffered), row_group_size=row_group_size)
+                    rows_written += buffered_rows
+                    buffered, buffered_rows = [], 0
+            if buffered:
+                writer.write_table(pa.concat_tables(buffered), row_group_size=row_group_size)
+                rows_written += buffered_rows
+
+        os.replace(tmp_file, target_file)
+        logger.info(f"Compacted {len(self.parts)} parts ({rows_written:,} rows) into {target_file}")
+        return rows_written
@@ -0,0 +1,264 @@
+"""In-process metrics with Prometheus text-file and JSON export."""
+import bisect
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Seconds; from cached responses up to requests that hit the timeout
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Seconds per parsed page
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    pairs = (
+        name + '="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in key
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """A named metric with one value per label set."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, const_labels: LabelKey):
+        self.name = name
+        self.help = help
+        self.const_labels = const_labels
+        self._values: Dict[LabelKey, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted(self.const_labels + _label_key(labels)))
+
+    def _matches(self, key: LabelKey, labels: Dict[str, Any]) -> bool:
+        wanted = _label_key(labels)
+        return all(pair in key for pair in wanted)
+
+    def value(self, **labels) -> float:
+        """Sum of the values whose labels include ``labels``."""
+        return sum(v for key, v in self._values.items() if self._matches(key, labels))
+
+    def samples(self) -> Iterator[Tuple[str, LabelKey, float]]:
+        """``(sample name, labels, value)`` in Prometheus exposition order."""
+        for key, value in sorted(self._values.items()):
+            yield self.name, key, value
+
+    def _summary_key(self, key: LabelKey) -> str:
+        """Label set without the constant labels, e.g. ``status=200``."""
+        return ",".join(f"{name}={value}" for name, value in key if (name, value) not in self.const_labels)
+
+    def summary(self) -> Any:
+        """JSON-friendly values: a number, or a dict per label set."""
+        if list(self._values) == [self.const_labels]:
+            return self._values[self.const_labels]
+        return {self._summary_key(key): value for key, value in sorted(self._values.items())}
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, const_labels: LabelKey, buckets: Sequence[float]):
+        super().__init__(name, help, const_labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # Per-bucket (non-cumulative) counts, plus one overflow bucket
+            entry = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+        entry['counts'][bisect.bisect_left(self.buckets, value)] += 1
+        entry['sum'] += value
+        entry['count'] += 1
+
+    def value(self, **labels) -> float:
+        """Number of observations whose labels include ``labels``."""
+        return sum(e['count'] for key, e in self._values.items() if self._matches(key, labels))
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by interpolating within its bucket."""
+        counts = [0] * (len(self.buckets) + 1)
+        for key, entry in self._values.items():
+            if self._matches(key, labels):
+                counts = [a + b for a, b in zip(counts, entry['counts'])]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def samples(self) -> Iterator[Tuple[str, LabelKey, float]]:
+        for key, entry in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry['counts']):
+                cumulative += count
+                yield f"{self.name}_bucket", key + (('le', _format_value(bound)),), cumulative
+            yield f"{self.name}_sum", key, entry['sum']
+            yield f"{self.name}_count", key, entry['count']
+
+    def summary(self) -> Any:
+        def describe(key: LabelKey) -> Dict[str, Any]:
+            entry = self._values[key]
+            labels = dict(key)
+            quantiles = {f'p{round(q * 100)}': self.quantile(q, **labels) for q in (0.5, 0.9, 0.99)}
+            return {
+                'count': entry['count'],
+                'sum': round(entry['sum'], 6),
+                'mean': round(entry['sum'] / entry['count'], 6) if entry['count'] else None,
+                **{name: round(value, 6) if value is not None else None for name, value in quantiles.items()},
+            }
+
+        if list(self._values) == [self.const_labels]:
+            return describe(self.const_labels)
+        return {self._summary_key(key): describe(key) for key in sorted(self._values)}
+
+
+class Metrics:
+    """
+    Registry of counters, gauges and histograms for one stage.
+
+    Components (session, processor, parse executor) get the registry and
+    create their metrics on first use with ``counter`` / ``gauge`` /
+    ``histogram``, which return the existing metric on later calls. Names
+    are prefixed with ``namespace`` and every sample carries the registry's
+    constant labels (e.g. ``stage``). ``write`` atomically replaces a
+    Prometheus text file (for node_exporter's textfile collector) and a
+    JSON summary with per-histogram quantiles.
+    """
+
+    def __init__(self, namespace: str = "ewg", labels: Optional[Dict[str, Any]] = None):
+        """
+        Initialize metrics registry.
+
+        Args:
+            namespace: Prefix of every metric name
+            labels: Constant labels added to every sample
+        """
+        self.namespace = namespace
+        self.labels = _label_key(labels or {})
+        self.started_at = time.time()
+        self._metrics: Dict[str, Metric] = {}
+
+    def _get(self, cls, name: str, help: str, **kwargs) -> Any:
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        metric = self._metrics.get(full_name)
+        if metric is None:
+            metric = self._metrics[full_name] = cls(full_name, help, self.labels, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {full_name} is a {metric.kind}, not a {cls.kind}")
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        """Get or create a counter."""
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        """Get or create a gauge."""
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def value(self, name: str, **labels) -> float:
+        """Current value of a metric (0 if it was never recorded)."""
+        metric = self._metrics.get(f"{self.namespace}_{name}" if self.namespace else name)
+        return metric.value(**labels) if metric is not None else 0
+
+    @contextmanager
+    def timer(self, name: str, help: str = "", **labels):
+        """Set a gauge to the seconds spent in the ``with`` block (e.g. a stage phase)."""
+        gauge = self.gauge(name, help)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            gauge.set(round(time.monotonic() - start, 3), **labels)
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for name, metric in sorted(self._metrics.items()):
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample, key, value in metric.samples():
+                lines.append(f"{sample}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """All metrics as a JSON-friendly dict, histograms with quantiles."""
+        return {
+            'labels': dict(self.labels),
+            'started_at': self.started_at,
+            'elapsed_seconds': round(time.time() - self.started_at, 3),
+            'metrics': {name: metric.summary() for name, metric in sorted(self._metrics.items())},
+        }
+
+    def write(self, prom_path: Union[str, Path], json_path: Optional[Union[str, Path]] = None):
+        """Atomically write the Prometheus text file and, optionally, the JSON summary."""
+        self._write_atomic(Path(prom_path), self.to_prometheus())
+        if json_path is not None:
+            self._write_atomic(Path(json_path), json.dumps(self.summary(), indent=2))
+
+    @staticmethod
+    def _write_atomic(path: Path, text: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
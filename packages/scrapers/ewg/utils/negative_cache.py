@@ -0,0 +1,172 @@
+"""Persistent cache of keys known to have no results."""
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NegativeCache:
+    """
+    Remember which keys (e.g. ZIP codes) returned no results.
+
+    Keys are stored in SQLite with the time they were last found empty.
+    ``filter`` skips keys found empty within ``ttl`` seconds, except a
+    ``revalidate_fraction`` sample that is re-checked anyway so keys that
+    gain results are noticed before the TTL runs out. The sample is a
+    deterministic function of the key and the day, so every step consulting
+    the cache on the same day agrees on it.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl: float = 90 * 24 * 3600,
+        revalidate_fraction: float = 0.02
+    ):
+        """
+        Initialize negative cache.
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds a key stays known-empty before it is re-checked
+            revalidate_fraction: Fraction of known-empty keys re-checked
+                per day regardless of TTL
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.revalidate_fraction = revalidate_fraction
+        # Shared by --worker processes: wait for their writes like the state store does
+        self._db = sqlite3.connect(self.path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS empty_keys (
+                key TEXT PRIMARY KEY,
+                checked_at REAL NOT NULL,
+                times_skipped INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._db.commit()
+        self.revalidating: List[str] = []
+        self.stats: Dict[str, int] = {
+            'skipped': 0,
+            'expired': 0,
+            'sampled': 0,
+            'marked_empty': 0,
+            'cleared': 0,
+        }
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM empty_keys").fetchone()[0]
+
+    def _sampled(self, key: str, day: int) -> bool:
+        return zlib.crc32(f"{key}:{day}".encode()) / 2**32 < self.revalidate_fraction
+
+    def filter(self, keys: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Split keys into those to fetch and known-empty ones to skip.
+
+        Args:
+            keys: Candidate keys
+
+        Returns:
+            ``(to_fetch, skipped)``, each in input order; the known-empty
+            keys sampled for re-checking are also kept in ``revalidating``
+        """
+        known = dict(self._db.execute("SELECT key, checked_at FROM empty_keys"))
+        now = time.time()
+        day = int(now // 86400)
+
+        to_fetch, skipped = [], []
+        self.revalidating = []
+        for key in keys:
+            checked_at = known.get(key)
+            if checked_at is None:
+                to_fetch.append(key)
+            elif now - checked_at >= self.ttl:
+                self.stats['expired'] += 1
+                to_fetch.append(key)
+            elif self._sampled(key, day):
+                self.stats['sampled'] += 1
+                self.revalidating.append(key)
+                to_fetch.append(key)
+            else:
+                skipped.append(key)
+
+        self.stats['skipped'] += len(skipped)
+        with self._db:
+            self._db.executemany(
+                "UPDATE empty_keys SET times_skipped = times_skipped + 1 WHERE key = ?",
+                ((key,) for key in skipped)
+            )
+        return to_fetch, skipped
+
+    def due(self, keys: Iterable[str]) -> List[str]:
+        """
+        Known-empty keys due for a re-check: expired, or sampled today.
+
+        For keys already completed elsewhere (so ``filter`` never sees
+        them). Keys not in the cache are left out and nothing is counted as
+        skipped; the sampled keys are added to ``revalidating``, so call
+        this after ``filter``.
+
+        Args:
+            keys: Candidate keys
+
+        Returns:
+            The keys to re-check, in input order
+        """
+        known = dict(self._db.execute("SELECT key, checked_at FROM empty_keys"))
+        now = time.time()
+        day = int(now // 86400)
+
+        due = []
+        for key in keys:
+            checked_at = known.get(key)
+            if checked_at is None:
+                continue
+            if now - checked_at >= self.ttl:
+                self.stats['expired'] += 1
+                due.append(key)
+            elif self._sampled(key, day):
+                self.stats['sampled'] += 1
+                self.revalidating.append(key)
+                due.append(key)
+        return due
+
+    def known_empty(self) -> List[str]:
+        """All keys currently recorded as empty, regardless of TTL."""
+        return [key for key, in self._db.execute("SELECT key FROM empty_keys")]
+
+    def update(self, empty: Iterable[str], non_empty: Iterable[str] = ()):
+        """
+        Record fetch outcomes.
+
+        Args:
+            empty: Keys that were fetched successfully and had no results
+            non_empty: Keys that had results (removed from the cache)
+        """
+        now = time.time()
+        empty = list(empty)
+        non_empty = list(non_empty)
+        with self._db:
+            self._db.executemany(
+                """INSERT INTO empty_keys (key, checked_at) VALUES (?, ?)
+                   ON CONFLICT(key) DO UPDATE SET checked_at = excluded.checked_at""",
+                ((key, now) for key in empty)
+            )
+            cleared = self._db.executemany(
+                "DELETE FROM empty_keys WHERE key = ?", ((key,) for key in non_empty)
+            ).rowcount
+        self.stats['marked_empty'] += len(empty)
+        self.stats['cleared'] += max(cleared, 0)
+        if cleared > 0:
+            logger.info(f"{cleared} previously empty keys now have results")
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
@@ -0,0 +1,214 @@
+"""Bronze-layer archive of raw fetched pages in compressed pack files."""
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union, IO
+import logging
+import zstandard as zstd
+
+logger = logging.getLogger(__name__)
+
+
+class PageStore:
+    """
+    Append-only store of raw HTTP response bodies.
+
+    Each body is compressed as an independent zstd frame and appended to a
+    large pack file (``pack-00000.zst``, ...). An append-only ``index.jsonl``
+    maps every URL to the SHA-256 of its content and the pack/offset/length of
+    the frame. Identical content is stored once, and re-archiving a URL whose
+    content has not changed is a no-op.
+
+    Several processes can archive into the same root if each passes its own
+    ``writer_id``: a writer appends only to its own packs and index
+    (``pack-<writer_id>-00000.zst``, ``index-<writer_id>.jsonl``), and every
+    store reads all indexes, taking the most recent fetch of each URL.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        max_pack_bytes: int = 256 * 1024 * 1024,
+        compression_level: int = 3,
+        writer_id: Optional[str] = None
+    ):
+        """
+        Initialize page store.
+
+        Args:
+            root: Directory holding pack files and the index
+            max_pack_bytes: Size at which a new pack file is started
+            compression_level: zstd compression level
+            writer_id: Name of this writer when several processes share the
+                store (None for the default pack and index files)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_pack_bytes = max_pack_bytes
+        self._pack_prefix = f"pack-{writer_id}" if writer_id else "pack"
+        self.index_file = self.root / (f"index-{writer_id}.jsonl" if writer_id else "index.jsonl")
+
+        self._compressor = zstd.ZstdCompressor(level=compression_level)
+        self._decompressor = zstd.ZstdDecompressor()
+        self._blobs: Dict[str, Tuple[str, int, int]] = {}
+        self._latest: Dict[str, str] = {}
+        self._pack_id = 0
+        self._pack: Optional[IO[bytes]] = None
+        self._index: Optional[IO[str]] = None
+
+        self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._latest
+
+    def put(self, url: str, body: Union[str, bytes]) -> str:
+        """
+        Archive a response body for a URL.
+
+        Args:
+            url: URL the body was fetched from
+            body: Raw response body (str bodies are stored as UTF-8)
+
+        Returns:
+            SHA-256 hex digest of the body
+        """
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        content_hash = hashlib.sha256(data).hexdigest()
+
+        if self._latest.get(url) == content_hash:
+            return content_hash
+
+        if content_hash not in self._blobs:
+            frame = self._compressor.compress(data)
+            pack = self._open_pack(len(frame))
+            offset = pack.tell()
+            pack.write(frame)
+            pack.flush()
+            self._blobs[content_hash] = (self._pack_name(self._pack_id), offset, len(frame))
+
+        pack_name, offset, length = self._blobs[content_hash]
+        entry = {
+            'url': url,
+            'sha256': content_hash,
+            'pack': pack_name,
+            'offset': offset,
+            'length': length,
+            'size': len(data),
+            'fetched_at': time.time(),
+        }
+        index = self._open_index()
+        index.write(json.dumps(entry) + "\n")
+        index.flush()
+
+        self._latest[url] = content_hash
+        return content_hash
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Return the latest archived body for a URL, if any."""
+        content_hash = self._latest.get(url)
+        if content_hash is None:
+            return None
+        return self._read_blob(content_hash)
+
+    def iter_latest(self) -> Iterator[Tuple[str, bytes]]:
+        """
+        Yield ``(url, body)`` for the latest version of every archived URL.
+
+        Blobs are read in pack/offset order so reparsing streams sequentially
+        through the pack files.
+        """
+        self._flush()
+        entries = sorted(
+            self._latest.items(),
+            key=lambda item: self._blobs[item[1]][:2]
+        )
+        handles: Dict[str, IO[bytes]] = {}
+        try:
+            for url, content_hash in entries:
+                pack_name, offset, length = self._blobs[content_hash]
+                if pack_name not in handles:
+                    handles[pack_name] = open(self.root / pack_name, 'rb')
+                handle = handles[pack_name]
+                handle.seek(offset)
+                yield url, self._decompressor.decompress(handle.read(length))
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def close(self):
+        """Flush, fsync and close the open pack and index files."""
+        for handle in (self._pack, self._index):
+            if handle:
+                handle.flush()
+                os.fsync(handle.fileno())
+                handle.close()
+        self._pack = None
+        self._index = None
+
+    def _load_index(self):
+        """Rebuild in-memory maps from all indexes, ignoring torn last lines."""
+        pack_name = re.compile(rf"{re.escape(self._pack_prefix)}-(\d{{5}})\.zst")
+        pack_ids = [
+            int(match.group(1)) for match in map(pack_name.fullmatch, (p.name for p in self.root.glob("pack-*.zst")))
+            if match
+        ]
+        if pack_ids:
+            self._pack_id = max(pack_ids)
+
+        latest_at: Dict[str, float] = {}
+        for index_file in sorted(self.root.glob("index*.jsonl")):
+            with open(index_file, 'r') as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        logger.warning(f"Ignoring torn index entry in {index_file}")
+                        break
+                    entry = json.loads(line)
+                    self._blobs.setdefault(
+                        entry['sha256'], (entry['pack'], entry['offset'], entry['length'])
+                    )
+                    if entry['fetched_at'] >= latest_at.get(entry['url'], float('-inf')):
+                        latest_at[entry['url']] = entry['fetched_at']
+                        self._latest[entry['url']] = entry['sha256']
+
+    def _read_blob(self, content_hash: str) -> bytes:
+        self._flush()
+        pack_name, offset, length = self._blobs[content_hash]
+        with open(self.root / pack_name, 'rb') as f:
+            f.seek(offset)
+            return self._decompressor.decompress(f.read(length))
+
+    def _open_pack(self, incoming: int) -> IO[bytes]:
+        """Return the current pack handle, rolling over when it is full."""
+        if self._pack is None:
+            self._pack = open(self.root / self._pack_name(self._pack_id), 'ab')
+        if self._pack.tell() and self._pack.tell() + incoming > self.max_pack_bytes:
+            self._pack.flush()
+            os.fsync(self._pack.fileno())
+            self._pack.close()
+            self._pack_id += 1
+            self._pack = open(self.root / self._pack_name(self._pack_id), 'ab')
+        return self._pack
+
+    def _open_index(self) -> IO[str]:
+        if self._index is None:
+            self._index = open(self.index_file, 'a')
+        return self._index
+
+    def _flush(self):
+        if self._pack:
+            self._pack.flush()
+
+    def _pack_name(self, pack_id: int) -> str:
+        return f"{self._pack_prefix}-{pack_id:05d}.zst"
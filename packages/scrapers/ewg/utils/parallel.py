@@ -1,28 +1,59 @@
 """Parallel processing utilities with rate limiting."""
 import asyncio
+import time
 from asyncio_throttle import Throttler
-from typing import List, Callable, Any, TypeVar, Coroutine, Optional
+from typing import (
+    List, Callable, Any, TypeVar, Coroutine, Optional, Iterable, AsyncIterable, AsyncIterator, Tuple, Union
+)
 import logging
 from rich.console import Console
 
+from .metrics import Metrics
+from .rate_control import AdaptiveController
+
 T = TypeVar('T')
 console = Console()
 logger = logging.getLogger(__name__)
 
 
 class ParallelProcessor:
-    """Process items in parallel with rate limiting."""
+    """
+    Process items in parallel with rate limiting.
+    
+    Limits are fixed (``max_concurrent`` / ``rate_limit``) unless an
+    ``AdaptiveController`` is given, in which case it admits tasks and
+    retunes both limits from the responses the session reports to it.
+    With a ``Metrics`` registry, ``process_stream`` records the depth of its
+    queues, the number of busy workers and the duration of every item.
+    """
     
-    def __init__(self, max_concurrent: int = 10, rate_limit: float = 10.0):
+    def __init__(
+        self,
+        max_concurrent: int = 10,
+        rate_limit: float = 10.0,
+        controller: Optional[AdaptiveController] = None,
+        metrics: Optional[Metrics] = None
+    ):
         """
         Initialize parallel processor.
         
         Args:
             max_concurrent: Maximum number of concurrent tasks
             rate_limit: Maximum requests per second
+            controller: Adaptive controller replacing the fixed limits
+            metrics: Registry receiving queue depth and task metrics
         """
-        self.max_concurrent = max_concurrent
+        self.controller = controller
+        self.metrics = metrics
+        self.max_concurrent = controller.max_concurrency if controller else max_concurrent
         self.throttler = Throttler(rate_limit=rate_limit)
+    
+    @property
+    def limits(self) -> dict:
+        """Current concurrency and rate limits."""
+        if self.controller:
+            return self.controller.limits
+        return {'concurrency': self.max_concurrent, 'rate': self.throttler.rate_limit}
         
     async def process_batch(
         self,
@@ -43,17 +74,23 @@ class ParallelProcessor:
         """
         semaphore = asyncio.Semaphore(self.max_concurrent)
         
+        async def process_one(item: T, index: int) -> tuple[int, Any]:
+            try:
+                result = await process_func(item)
+                if progress_callback:
+                    progress_callback(item, result)
+                return index, result
+            except Exception as e:
+                logger.error(f"Error processing item {item}: {e}")
+                return index, None
+        
         async def process_with_limit(item: T, index: int) -> tuple[int, Any]:
+            if self.controller:
+                async with self.controller:
+                    return await process_one(item, index)
             async with semaphore:
                 async with self.throttler:
-                    try:
-                        result = await process_func(item)
-                        if progress_callback:
-                            progress_callback(item, result)
-                        return index, result
-                    except Exception as e:
-                        logger.error(f"Error processing item {item}: {e}")
-                        return index, None
+                    return await process_one(item, index)
         
         # Create tasks with index to preserve order
         tasks = [process_with_limit(item, i) for i, item in enumerate(items)]
@@ -63,4 +100,111 @@ class ParallelProcessor:
         
         # Sort by index and extract results
         sorted_results = sorted(results, key=lambda x: x[0])
-        return [result for _, result in sorted_results]
\ No newline at end of file
+        return [result for _, result in sorted_results]
+    
+    async def process_stream(
+        self,
+        items: Union[Iterable[T], AsyncIterable[T]],
+        process_func: Callable[[T], Coroutine[Any, Any, Any]],
+        queue_size: Optional[int] = None
+    ) -> AsyncIterator[Tuple[T, Any]]:
+        """
+        Process a stream of items with a fixed pool of workers.
+        
+        A feeder task pulls from ``items`` into a bounded queue and
+        ``max_concurrent`` workers drain it, so memory stays constant however
+        long the input is. Results are yielded as soon as they complete (not
+        in input order), and a slow consumer blocks the workers rather than
+        buffering results. Wrap the call in ``contextlib.aclosing`` when
+        breaking out early so the workers are cancelled promptly.
+        
+        Args:
+            items: Iterable or async iterable of items
+            process_func: Async function to process each item
+            queue_size: Bound of the input and output queues
+                (defaults to twice the number of workers)
+            
+        Yields:
+            ``(item, result)`` pairs in completion order; result is None
+            when processing the item raised
+        """
+        num_workers = self.max_concurrent
+        queue_size = queue_size or num_workers * 2
+        pending: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        done: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        finished = object()
+        
+        if self.metrics is not None:
+            depth = self.metrics.gauge('queue_depth', 'Items waiting in the processing queues')
+            busy = self.metrics.gauge('workers_busy', 'Workers processing an item')
+            durations = self.metrics.histogram('task_duration_seconds', 'Time to process one item')
+        
+        async def feed():
+            # Tracked here rather than with Task.cancelling(), which needs Python 3.11
+            cancelled = False
+            try:
+                if hasattr(items, '__aiter__'):
+                    async for item in items:
+                        await pending.put(item)
+                else:
+                    for item in items:
+                        await pending.put(item)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                # Stop the workers even if the input iterator raised
+                if not cancelled:
+                    for _ in range(num_workers):
+                        await pending.put(finished)
+        
+        async def process_one(item: T) -> Any:
+            start = time.monotonic()
+            if self.metrics is not None:
+                busy.inc(1)
+            try:
+                return await process_func(item)
+            except Exception as e:
+                logger.error(f"Error processing item {item}: {e}")
+                return None
+            finally:
+                if self.metrics is not None:
+                    busy.inc(-1)
+                    durations.observe(time.monotonic() - start)
+        
+        async def work():
+            while True:
+                item = await pending.get()
+                if item is finished:
+                    break
+                if self.metrics is not None:
+                    depth.set(pending.qsize(), queue='input')
+                    depth.set(done.qsize(), queue='output')
+                if self.controller:
+                    async with self.controller:
+                        result = await process_one(item)
+                else:
+                    async with self.throttler:
+                        result = await process_one(item)
+                await done.put((item, result))
+            await done.put(finished)
+        
+        tasks = [asyncio.create_task(feed())]
+        tasks.extend(asyncio.create_task(work()) for _ in range(num_workers))
+        try:
+            running = num_workers
+            while running:
+                entry = await done.get()
+                if entry is finished:
+                    running -= 1
+                else:
+                    yield entry
+            # Surface errors raised by the input iterator
+            await tasks[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.metrics is not None:
+                depth.set(0, queue='input')
+                depth.set(0, queue='output')
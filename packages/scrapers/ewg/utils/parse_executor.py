@@ -0,0 +1,103 @@
+"""Process-pool executor for CPU-bound HTML parsing."""
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+import logging
+
+from .metrics import Metrics, PARSE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """Run ``func(*args)`` and also return the seconds it took (in the worker)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class ParseExecutor:
+    """
+    Run synchronous parsers in worker processes with bounded in-flight jobs.
+
+    Fetch coroutines hand raw page bytes to ``run``; the event loop keeps
+    serving network I/O while parsing scales across cores. At most
+    ``max_in_flight`` parse jobs are queued or running, so callers awaiting a
+    slot provide backpressure when parsing falls behind fetching. With a
+    ``Metrics`` registry, ``run`` records the time each parse took in its
+    worker (excluding queueing).
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        Initialize parse executor.
+
+        Args:
+            max_workers: Number of worker processes (defaults to CPU count)
+            max_in_flight: Maximum queued + running parse jobs
+                (defaults to twice the number of workers)
+            metrics: Registry receiving parse durations
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.max_workers * 2
+        self.metrics = metrics
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+            self._executor = None
+
+    async def submit(self, func: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """
+        Wait for a free slot and schedule ``func(*args)`` in a worker.
+
+        Args:
+            func: Picklable module-level function
+            *args: Picklable arguments
+
+        Returns:
+            Future resolving to the function result; the slot is released
+            when it completes
+        """
+        if not self._executor:
+            raise RuntimeError("Executor not initialized. Use async context manager.")
+
+        await self._slots.acquire()
+        try:
+            if self.metrics is None:
+                future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+            else:
+                future = asyncio.get_running_loop().run_in_executor(self._executor, _timed, func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        if self.metrics is not None:
+            future = asyncio.ensure_future(self._record_duration(future, func.__name__))
+        return future
+
+    async def _record_duration(self, future: asyncio.Future, parser: str) -> Any:
+        """Unwrap a ``_timed`` result and record how long the parse took."""
+        result, seconds = await future
+        self.metrics.histogram('parse_duration_seconds', 'Time to parse one page', PARSE_BUCKETS).observe(
+            seconds, parser=parser
+        )
+        return result
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func(*args)`` in a worker process and return its result."""
+        return await (await self.submit(func, *args))
@@ -0,0 +1,194 @@
+"""State-partitioned, sorted Parquet datasets for the gold layer."""
+import inspect
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMN = 'state'
+# Hive name of the partition holding rows without a state
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+# Rows per row group: row group statistics are what readers prune on, so
+# smaller groups mean point lookups read less (at some metadata cost)
+ROW_GROUP_SIZE = 16 * 1024
+BLOOM_FILTER_FPP = 0.01
+
+# USPS ZIP3 prefix ranges (first, last, state); APO/FPO prefixes map to the
+# military "states" AA/AE/AP and unassigned prefixes to no state
+ZIP3_STATES: List[Tuple[int, int, str]] = [
+    (5, 5, 'NY'), (6, 7, 'PR'), (8, 8, 'VI'), (9, 9, 'PR'),
+    (10, 27, 'MA'), (28, 29, 'RI'), (30, 38, 'NH'), (39, 49, 'ME'),
+    (50, 54, 'VT'), (55, 55, 'MA'), (56, 59, 'VT'), (60, 69, 'CT'),
+    (70, 89, 'NJ'), (90, 99, 'AE'), (100, 149, 'NY'), (150, 196, 'PA'),
+    (197, 199, 'DE'), (200, 200, 'DC'), (201, 201, 'VA'), (202, 205, 'DC'),
+    (206, 219, 'MD'), (220, 246, 'VA'), (247, 268, 'WV'), (270, 289, 'NC'),
+    (290, 299, 'SC'), (300, 319, 'GA'), (320, 339, 'FL'), (340, 340, 'AA'),
+    (341, 349, 'FL'), (350, 369, 'AL'), (370, 385, 'TN'), (386, 397, 'MS'),
+    (398, 399, 'GA'), (400, 427, 'KY'), (430, 459, 'OH'), (460, 479, 'IN'),
+    (480, 499, 'MI'), (500, 528, 'IA'), (530, 549, 'WI'), (550, 567, 'MN'),
+    (569, 569, 'DC'), (570, 577, 'SD'), (580, 588, 'ND'), (590, 599, 'MT'),
+    (600, 629, 'IL'), (630, 658, 'MO'), (660, 679, 'KS'), (680, 693, 'NE'),
+    (700, 714, 'LA'), (716, 729, 'AR'), (730, 732, 'OK'), (733, 733, 'TX'),
+    (734, 749, 'OK'), (750, 799, 'TX'), (800, 816, 'CO'), (820, 831, 'WY'),
+    (832, 838, 'ID'), (840, 847, 'UT'), (850, 865, 'AZ'), (870, 884, 'NM'),
+    (885, 885, 'TX'), (889, 898, 'NV'), (900, 961, 'CA'), (962, 966, 'AP'),
+    (967, 968, 'HI'), (969, 969, 'GU'), (970, 979, 'OR'), (980, 994, 'WA'),
+    (995, 999, 'AK'),
+]
+_ZIP3_FIRST = np.array([first for first, _, _ in ZIP3_STATES])
+_ZIP3_LAST = np.array([last for _, last, _ in ZIP3_STATES])
+_ZIP3_STATE = np.array([state for _, _, state in ZIP3_STATES], dtype=object)
+
+# Optional writer features, depending on the installed pyarrow
+_WRITER_OPTIONS = set(inspect.signature(pq.ParquetWriter.__init__).parameters)
+
+
+def zip_state(zip_codes: pd.Series) -> pd.Series:
+    """State of each ZIP code from its 3-digit prefix (None if unassigned)."""
+    prefix = pd.to_numeric(zip_codes.astype('string').str[:3], errors='coerce')
+    valid = prefix.notna().to_numpy()
+    values = prefix.fillna(-1).astype(int).to_numpy()
+    index = np.searchsorted(_ZIP3_FIRST, values, side='right') - 1
+    found = valid & (index >= 0) & (values <= _ZIP3_LAST[index.clip(0)])
+    return pd.Series(np.where(found, _ZIP3_STATE[index.clip(0)], None), index=zip_codes.index, dtype=object)
+
+
+def pws_state(pws_ids: pd.Series) -> pd.Series:
+    """State of each PWS from its ID prefix (the EPA region, e.g. "01", for tribal systems)."""
+    prefix = pws_ids.astype('string').str[:2].str.upper()
+    return prefix.astype(object).where(prefix.notna(), None)
+
+
+def _equals(column: str, value: Optional[str]) -> ds.Expression:
+    return ds.field(column).is_null() if value is None else ds.field(column) == value
+
+
+def lookup_filter(zip_code: Optional[str] = None, pws_id: Optional[str] = None) -> ds.Expression:
+    """
+    Filter for a point lookup that prunes to a single state partition.
+
+    Pass ``zip_code`` for datasets partitioned by ZIP state, ``pws_id`` for
+    those partitioned by PWS state, or both to match both columns (the
+    partition is then taken from the ZIP code).
+    """
+    if zip_code is None and pws_id is None:
+        raise ValueError("lookup_filter needs a zip_code or a pws_id")
+    if zip_code is not None:
+        state = zip_state(pd.Series([zip_code]))[0]
+        expression = _equals(PARTITION_COLUMN, state) & (ds.field('zip_code') == zip_code)
+    else:
+        expression = _equals(PARTITION_COLUMN, pws_state(pd.Series([pws_id]))[0])
+    if pws_id is not None:
+        expression = expression & (ds.field('pws_id') == pws_id)
+    return expression
+
+
+def open_partitioned(dataset_dir: Union[str, Path]) -> ds.Dataset:
+    """Open a partitioned dataset; the state is always read as a string (e.g. "01" stays "01")."""
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+    return ds.dataset(dataset_dir, format='parquet', partitioning=partitioning)
+
+
+def read_partitioned(dataset_dir: Union[str, Path], filter: Optional[ds.Expression] = None) -> pd.DataFrame:
+    """Read (part of) a partitioned dataset, pruning partitions and row groups with ``filter``."""
+    return open_partitioned(dataset_dir).to_table(filter=filter).to_pandas()
+
+
+def _compact_dictionaries(table: pa.Table) -> pa.Table:
+    """Re-encode dictionary columns of a slice so each file only stores the values it uses."""
+    for index, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            column = table.column(index).cast(field.type.value_type)
+            table = table.set_column(index, field, pc.dictionary_encode(column).cast(field.type))
+    return table
+
+
+def _write_options(table: pa.Table, sort_by: Sequence[str], bloom_filter_columns: Sequence[str],
+                   compression: str) -> Dict:
+    options = {'compression': compression, 'write_statistics': True}
+    if 'write_page_index' in _WRITER_OPTIONS:
+        options['write_page_index'] = True
+    if 'sorting_columns' in _WRITER_OPTIONS:
+        options['sorting_columns'] = [pq.SortingColumn(table.schema.get_field_index(column)) for column in sort_by]
+    if bloom_filter_columns and 'bloom_filter_options' in _WRITER_OPTIONS:
+        # Sized to the file's distinct values rather than the 1M default
+        options['bloom_filter_options'] = {
+            column: {'ndv': max(1, len(table.column(column).unique())), 'fpp': BLOOM_FILTER_FPP}
+            for column in bloom_filter_columns
+        }
+    return options
+
+
+def write_partitioned(
+    df: pd.DataFrame,
+    dataset_dir: Union[str, Path],
+    sort_by: Sequence[str],
+    row_group_size: int = ROW_GROUP_SIZE,
+    bloom_filter_columns: Sequence[str] = (),
+    compression: str = 'zstd'
+) -> Dict[str, int]:
+    """
+    Write a DataFrame as a Hive-partitioned Parquet dataset.
+
+    Rows are split on the ``state`` column into ``state=<value>/part-0.parquet``
+    files (the column itself lives in the path), each sorted by ``sort_by``
+    so row group min/max statistics on those columns are tight. Files carry
+    a page index, sorting metadata and Bloom filters on
+    ``bloom_filter_columns`` where the installed pyarrow can write them. The
+    dataset is built next to ``dataset_dir`` and swapped in once complete.
+
+    Args:
+        df: Rows to write, including the ``state`` column
+        dataset_dir: Dataset root (replaced)
+        sort_by: Columns each file is sorted by
+        row_group_size: Rows per row group
+        bloom_filter_columns: Columns to write Bloom filters for
+        compression: Parquet codec
+
+    Returns:
+        Rows written per state
+    """
+    dataset_dir = Path(dataset_dir)
+    tmp_dir = dataset_dir.with_name(dataset_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    # Converted once and sliced per state, so every file has the same schema
+    states = df[PARTITION_COLUMN].astype(object).where(df[PARTITION_COLUMN].notna(), NULL_PARTITION)
+    df = df.drop(columns=PARTITION_COLUMN).assign(_state=states.to_numpy())
+    df = df.sort_values(['_state', *sort_by], kind='stable')
+    table = pa.Table.from_pandas(df.drop(columns='_state'), preserve_index=False)
+    sorted_states = df['_state'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, sorted_states[1:] != sorted_states[:-1]]) if len(df) else np.array([], int)
+    ends = np.r_[starts[1:], len(df)]
+
+    rows_by_state = {}
+    for start, end in zip(starts, ends):
+        state = sorted_states[start]
+        part = _compact_dictionaries(table.slice(start, end - start))
+        part_dir = tmp_dir / f"{PARTITION_COLUMN}={state}"
+        part_dir.mkdir()
+        pq.write_table(
+            part, part_dir / "part-0.parquet", row_group_size=row_group_size,
+            **_write_options(part, sort_by, bloom_filter_columns, compression)
+        )
+        rows_by_state[state] = part.num_rows
+
+    old_dir = dataset_dir.with_name(dataset_dir.name + '.old')
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if dataset_dir.exists():
+        os.replace(dataset_dir, old_dir)
+    os.replace(tmp_dir, dataset_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info(f"Wrote {sum(rows_by_state.values()):,} rows in {len(rows_by_state)} partitions to {dataset_dir}")
+    return rows_by_state
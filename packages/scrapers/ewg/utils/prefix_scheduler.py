@@ -0,0 +1,148 @@
+"""Probe-first scheduling of keys grouped by prefix."""
+import asyncio
+from collections import Counter, deque
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixScheduler:
+    """
+    Order keys (e.g. ZIP codes) so dead prefixes are found and skipped early.
+
+    Keys are grouped by their first ``prefix_len`` characters. For each
+    prefix a few evenly spaced probe keys are yielded first; once all probes
+    of a prefix are recorded, the rest of the prefix is queued if any probe
+    had results (or failed), and deferred otherwise. Prefixes with enough
+    evidence from earlier runs (``known_live`` / ``known_empty``) are decided
+    without probing. Deferred keys are only yielded with ``full_sweep``.
+
+    Feed ``iter_keys()`` to ``ParallelProcessor.process_stream`` and call
+    ``record`` for every result.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        prefix_len: int = 3,
+        probe_size: int = 5,
+        known_live: Iterable[str] = (),
+        known_empty: Iterable[str] = (),
+        must_fetch: Iterable[str] = (),
+        full_sweep: bool = False
+    ):
+        """
+        Initialize prefix scheduler.
+
+        Args:
+            keys: Keys to fetch
+            prefix_len: Characters of the key forming its prefix
+            probe_size: Empty results needed to consider a prefix dead
+            known_live: Keys known to have results (outside ``keys``)
+            known_empty: Keys known to be empty (outside ``keys``); each
+                counts towards the probes of its prefix
+            must_fetch: Keys always fetched as probes, e.g. revalidation samples
+            full_sweep: Also yield the keys of dead prefixes, last
+        """
+        self.prefix_len = prefix_len
+        self.probe_size = probe_size
+        self.full_sweep = full_sweep
+
+        groups: Dict[str, List[str]] = {}
+        for key in keys:
+            groups.setdefault(key[:prefix_len], []).append(key)
+        live_evidence = Counter(key[:prefix_len] for key in known_live)
+        empty_evidence = Counter(key[:prefix_len] for key in known_empty)
+        must_fetch = set(must_fetch)
+
+        self._ready: Deque[str] = deque()
+        self._probes: Set[str] = set()
+        self._outstanding: Counter = Counter()
+        self._live: Set[str] = set()
+        self._rest: Dict[str, List[str]] = {}
+        self._changed: Optional[asyncio.Event] = None
+        self.deferred: Dict[str, List[str]] = {}
+        self.stats: Dict[str, int] = {'probes': 0, 'live_prefixes': 0, 'dead_prefixes': 0}
+
+        known_live_keys = []
+        for prefix, prefix_keys in groups.items():
+            if live_evidence[prefix]:
+                self._live.add(prefix)
+                self.stats['live_prefixes'] += 1
+                known_live_keys.extend(prefix_keys)
+                continue
+
+            needed = max(0, probe_size - empty_evidence[prefix])
+            probes = [k for k in prefix_keys if k in must_fetch]
+            if needed > len(probes):
+                spacing = [prefix_keys[i * len(prefix_keys) // needed] for i in range(min(needed, len(prefix_keys)))]
+                probes.extend(k for k in dict.fromkeys(spacing) if k not in must_fetch)
+
+            probe_set = set(probes)
+            self._rest[prefix] = [k for k in prefix_keys if k not in probe_set]
+            if probes:
+                self._probes.update(probes)
+                self._outstanding[prefix] = len(probes)
+                self._ready.extend(probes)
+            else:
+                self._decide(prefix)
+
+        self.stats['probes'] = len(self._probes)
+        self._ready.extend(known_live_keys)
+
+    @property
+    def num_deferred(self) -> int:
+        """Keys currently deferred to a full sweep."""
+        return sum(len(keys) for keys in self.deferred.values())
+
+    async def iter_keys(self) -> AsyncIterator[str]:
+        """Yield keys as they become ready: probes, then keys of live prefixes."""
+        self._changed = asyncio.Event()
+        while True:
+            while self._ready:
+                yield self._ready.popleft()
+            if not self._outstanding:
+                break
+            self._changed.clear()
+            await self._changed.wait()
+
+        if self.full_sweep:
+            for prefix in list(self.deferred):
+                for key in self.deferred.pop(prefix):
+                    yield key
+
+    def record(self, key: str, has_results: Optional[bool]):
+        """
+        Report the outcome for a yielded key.
+
+        Args:
+            key: Key that was fetched
+            has_results: Whether it had results, or None if the fetch failed
+                (a failed probe never marks its prefix dead)
+        """
+        if key not in self._probes:
+            return
+        self._probes.discard(key)
+
+        prefix = key[:self.prefix_len]
+        if has_results is not False:
+            self._live.add(prefix)
+        self._outstanding[prefix] -= 1
+        if self._outstanding[prefix] <= 0:
+            del self._outstanding[prefix]
+            self._decide(prefix)
+        if self._changed is not None:
+            self._changed.set()
+
+    def _decide(self, prefix: str):
+        """Queue or defer the rest of a prefix once its probes are done."""
+        rest = self._rest.pop(prefix, [])
+        if prefix in self._live:
+            self.stats['live_prefixes'] += 1
+            self._ready.extend(rest)
+        else:
+            self.stats['dead_prefixes'] += 1
+            if rest:
+                self.deferred[prefix] = rest
+                logger.debug(f"Deferring prefix {prefix} ({len(rest)} keys): no results in probes")
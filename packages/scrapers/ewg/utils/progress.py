@@ -1,9 +1,7 @@
-"""Progress tracking utilities for scraping operations."""
+"""Progress utilities for scraping operations."""
 import json
-import os
 from typing import Set, Optional, Dict, Any
 from pathlib import Path
-import pandas as pd
 from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn, MofNCompleteColumn
 from rich.console import Console
 
@@ -11,20 +9,26 @@ console = Console()
 
 
 class ProgressTracker:
-    """Track and persist scraping progress."""
-    
+    """
+    Read the JSON checkpoints written before the state store.
+
+    Older runs recorded completed items as a JSON snapshot
+    (``<name>.json``) plus an append-only journal (``<name>.journal``, one
+    item per line). Steps 2 and 3 read them once, when their stage is new in
+    ``StateStore``, to import that progress. Nothing is written.
+    """
+
     def __init__(self, checkpoint_dir: str = "data/bronze/checkpoints"):
+        """
+        Initialize progress tracker.
+
+        Args:
+            checkpoint_dir: Directory holding snapshots and journals
+        """
         self.checkpoint_dir = Path(checkpoint_dir)
-        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
-        
-    def save_checkpoint(self, name: str, data: Dict[str, Any]):
-        """Save checkpoint data to file."""
-        checkpoint_file = self.checkpoint_dir / f"{name}.json"
-        with open(checkpoint_file, 'w') as f:
-            json.dump(data, f, indent=2)
-            
+
     def load_checkpoint(self, name: str) -> Optional[Dict[str, Any]]:
-        """Load checkpoint data if exists."""
+        """Load checkpoint snapshot data if exists."""
         checkpoint_file = self.checkpoint_dir / f"{name}.json"
         if checkpoint_file.exists():
             with open(checkpoint_file, 'r') as f:
@@ -32,19 +36,16 @@ class ProgressTracker:
         return None
         
     def get_completed_items(self, name: str) -> Set[str]:
-        """Get set of completed items from checkpoint."""
+        """Get set of completed items from snapshot plus journal."""
         checkpoint = self.load_checkpoint(name)
-        if checkpoint:
-            return set(checkpoint.get('completed', []))
-        return set()
-        
-    def update_completed(self, name: str, item: str):
-        """Add item to completed set in checkpoint."""
-        checkpoint = self.load_checkpoint(name) or {'completed': []}
-        completed = set(checkpoint.get('completed', []))
-        completed.add(item)
-        checkpoint['completed'] = list(completed)
-        self.save_checkpoint(name, checkpoint)
+        completed = set(checkpoint.get('completed', [])) if checkpoint else set()
+
+        journal_file = self.checkpoint_dir / f"{name}.journal"
+        if journal_file.exists():
+            lines = journal_file.read_text().split('\n')
+            # A last line without a trailing newline was torn by a crash mid-write
+            completed.update(line for line in lines[:-1] if line)
+        return completed
 
 
 def create_progress_bar(description: str, total: int) -> Progress:
@@ -0,0 +1,266 @@
+"""Adaptive (AIMD) rate and concurrency control for scraping stages."""
+import asyncio
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean "slow down" rather than "this request is bad"
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a ``Retry-After`` header into seconds from now.
+
+    Args:
+        value: Header value, either delta-seconds or an HTTP date
+
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveController:
+    """
+    Self-tuning request rate and concurrency limits.
+
+    Work items hold a concurrency slot (``async with controller:``) and every
+    request attempt, retries included, first awaits ``pace``, which spaces
+    sends at the current rate and honors any ``Retry-After`` pause. Every
+    response is reported with ``record``. Once per window of responses the
+    limits are adjusted AIMD-style:
+
+    - healthy window (no throttling, latency near baseline): add
+      ``rate_step`` req/s and one concurrent slot
+    - 429/503 or a timeout: multiply both limits by ``decrease_factor``
+      immediately (at most once per ``window`` responses, so one burst is
+      one cut)
+    - latency above ``latency_factor`` x baseline: same multiplicative cut
+
+    Limits always stay within the configured floor and ceiling.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        rate: float = 5.0,
+        min_concurrency: int = 1,
+        max_concurrency: int = 50,
+        min_rate: float = 0.5,
+        max_rate: float = 50.0,
+        rate_step: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_factor: float = 2.0,
+        window: int = 20,
+        max_retry_after: float = 300.0
+    ):
+        """
+        Initialize adaptive controller.
+
+        Args:
+            concurrency: Starting number of concurrent requests
+            rate: Starting requests per second
+            min_concurrency: Concurrency floor
+            max_concurrency: Concurrency ceiling
+            min_rate: Rate floor in requests per second
+            max_rate: Rate ceiling in requests per second
+            rate_step: Additive rate increase per healthy window
+            decrease_factor: Multiplier applied to both limits on back-off
+            latency_factor: Window median latency, relative to the baseline,
+                that counts as a latency spike
+            window: Responses per adjustment window
+            max_retry_after: Upper bound on honored ``Retry-After`` pauses
+        """
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_step = rate_step
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.window = window
+        self.max_retry_after = max_retry_after
+
+        self.concurrency = self._clamp(concurrency, min_concurrency, max_concurrency)
+        self.rate = self._clamp(rate, min_rate, max_rate)
+        self.baseline_latency: Optional[float] = None
+
+        self._in_flight = 0
+        self._next_send = 0.0
+        self._resume_at = 0.0
+        self._samples: List[float] = []
+        self._since_decrease = window
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.stats: Dict[str, int] = {
+            'responses': 0,
+            'throttled': 0,
+            'errors': 0,
+            'increases': 0,
+            'decreases': 0,
+            'retry_after_pauses': 0,
+        }
+
+    @staticmethod
+    def _clamp(value, low, high):
+        return max(low, min(high, value))
+
+    @property
+    def limits(self) -> Dict[str, float]:
+        """Current limits and load, for logging and progress output."""
+        return {
+            'concurrency': self.concurrency,
+            'rate': round(self.rate, 2),
+            'in_flight': self._in_flight,
+            'baseline_latency': round(self.baseline_latency, 3) if self.baseline_latency else None,
+        }
+
+    def set_ceiling(self, max_concurrency: Optional[int] = None, max_rate: Optional[float] = None):
+        """
+        Change the ceilings, e.g. to this process's share of a global budget.
+
+        Current limits above a new ceiling are lowered to it; ceilings never
+        go below the floors.
+        """
+        if max_concurrency is not None:
+            self.max_concurrency = max(self.min_concurrency, max_concurrency)
+            self.concurrency = min(self.concurrency, self.max_concurrency)
+        if max_rate is not None:
+            self.max_rate = max(self.min_rate, max_rate)
+            self.rate = min(self.rate, self.max_rate)
+        self._wake_waiters()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    async def acquire(self):
+        """Wait for a concurrency slot."""
+        if self._in_flight < self.concurrency and not self._waiters:
+            self._in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # The slot is handed over (and counted) by _wake_waiters
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    async def pace(self):
+        """Wait until the next request may be sent at the current rate."""
+        now = time.monotonic()
+        send_at = max(now, self._next_send, self._resume_at)
+        self._next_send = send_at + 1.0 / self.rate
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+    def release(self):
+        """Return a concurrency slot."""
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def record(
+        self,
+        latency: float,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        error: bool = False
+    ):
+        """
+        Report the outcome of one request.
+
+        Args:
+            latency: Seconds from send to response
+            status: HTTP status, if a response was received
+            retry_after: Parsed ``Retry-After`` seconds, if present
+            error: True for timeouts and connection failures
+        """
+        self.stats['responses'] += 1
+        throttled = status in THROTTLE_STATUSES or error
+        if status in THROTTLE_STATUSES:
+            self.stats['throttled'] += 1
+        if error:
+            self.stats['errors'] += 1
+
+        if retry_after is not None:
+            pause = min(retry_after, self.max_retry_after)
+            self._resume_at = max(self._resume_at, time.monotonic() + pause)
+            self.stats['retry_after_pauses'] += 1
+            logger.info(f"Server asked to retry after {retry_after:.0f}s; pausing requests for {pause:.0f}s")
+
+        self._since_decrease += 1
+        if throttled:
+            if self._since_decrease >= self.window:
+                self._decrease(f"status {status}" if status else "request error")
+        else:
+            self._samples.append(latency)
+
+        if len(self._samples) >= self.window:
+            self._adjust()
+
+    def _adjust(self):
+        """End a window: update the latency baseline and step the limits."""
+        latencies = sorted(self._samples)
+        median = latencies[len(latencies) // 2]
+        self._samples.clear()
+
+        if self.baseline_latency is None:
+            self.baseline_latency = median
+            return
+
+        if median > self.latency_factor * self.baseline_latency:
+            self._decrease(f"median latency {median:.2f}s vs baseline {self.baseline_latency:.2f}s")
+        elif self._since_decrease >= self.window:
+            self._increase()
+
+        # Track slow drift (e.g. a server that is simply slower today) without
+        # letting one spike move the baseline
+        self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * min(median, self.baseline_latency * 1.5)
+
+    def _increase(self):
+        old = (self.concurrency, self.rate)
+        self.concurrency = self._clamp(self.concurrency + 1, self.min_concurrency, self.max_concurrency)
+        self.rate = self._clamp(self.rate + self.rate_step, self.min_rate, self.max_rate)
+        if (self.concurrency, self.rate) != old:
+            self.stats['increases'] += 1
+            logger.debug(f"Raising limits to {self.concurrency} concurrent, {self.rate:.1f} req/s")
+            self._wake_waiters()
+
+    def _decrease(self, reason: str):
+        self.concurrency = self._clamp(
+            int(self.concurrency * self.decrease_factor), self.min_concurrency, self.max_concurrency
+        )
+        self.rate = self._clamp(self.rate * self.decrease_factor, self.min_rate, self.max_rate)
+        self._since_decrease = 0
+        self.stats['decreases'] += 1
+        logger.info(f"Backing off ({reason}): {self.concurrency} concurrent, {self.rate:.1f} req/s")
+
+    def _wake_waiters(self):
+        """Hand free slots to waiting requests, e.g. after the limit is raised."""
+        while self._waiters and self._in_flight < self.concurrency:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
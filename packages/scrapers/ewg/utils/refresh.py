@@ -0,0 +1,133 @@
+"""Refresh scheduling for re-scraping stale items."""
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: Any) -> str:
+    """Stable SHA-256 of JSON-serializable parsed content."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class RefreshScheduler:
+    """
+    Track when each item was last scraped and what it contained.
+
+    A SQLite table stores ``scraped_at``, the content hash of the parsed
+    result and a priority per item. ``due`` picks the items whose last scrape
+    is older than ``max_age`` (never-scraped items first, then by priority,
+    then oldest first), ``changed`` tells which re-scraped items actually
+    have new content, so only those need to be rewritten, and ``record``
+    stores the new state once the output is saved.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Initialize refresh scheduler.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by --worker processes: wait for their writes like the state store does
+        self._db = sqlite3.connect(self.path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS items (
+                item_id TEXT PRIMARY KEY,
+                scraped_at REAL,
+                content_hash TEXT,
+                changed_at REAL,
+                priority REAL NOT NULL DEFAULT 0
+            )"""
+        )
+        self._db.commit()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM items WHERE scraped_at IS NOT NULL").fetchone()[0]
+
+    def set_priorities(self, priorities: Dict[str, float]):
+        """Set item priorities (higher is refreshed first), adding unknown items."""
+        with self._db:
+            self._db.executemany(
+                """INSERT INTO items (item_id, priority) VALUES (?, ?)
+                   ON CONFLICT(item_id) DO UPDATE SET priority = excluded.priority""",
+                ((item_id, float(priority)) for item_id, priority in priorities.items())
+            )
+
+    def seed(self, item_ids: Iterable[str], scraped_at: float):
+        """Mark items scraped before tracking started as scraped at ``scraped_at``."""
+        with self._db:
+            self._db.executemany(
+                """INSERT INTO items (item_id, scraped_at) VALUES (?, ?)
+                   ON CONFLICT(item_id) DO UPDATE SET scraped_at = excluded.scraped_at
+                   WHERE items.scraped_at IS NULL""",
+                ((item_id, scraped_at) for item_id in item_ids)
+            )
+
+    def due(self, max_age: float, limit: Optional[int] = None) -> List[str]:
+        """
+        Items whose last scrape is older than ``max_age`` seconds.
+
+        Args:
+            max_age: Age in seconds after which an item is stale
+            limit: Maximum number of items to return
+
+        Returns:
+            Item IDs, never-scraped first, then by priority and age
+        """
+        rows = self._db.execute(
+            """SELECT item_id FROM items
+               WHERE scraped_at IS NULL OR scraped_at < ?
+               ORDER BY scraped_at IS NOT NULL, priority DESC, scraped_at
+               LIMIT ?""",
+            (time.time() - max_age, -1 if limit is None else limit)
+        )
+        return [item_id for item_id, in rows]
+
+    def changed(self, hashes: Dict[str, str]) -> List[str]:
+        """
+        Items that are new or whose content hash differs from the last scrape.
+
+        Args:
+            hashes: Content hash per freshly scraped item
+        """
+        known = {}
+        item_ids = list(hashes)
+        for i in range(0, len(item_ids), 500):
+            chunk = item_ids[i:i + 500]
+            known.update(self._db.execute(
+                f"SELECT item_id, content_hash FROM items WHERE item_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ))
+        return [item_id for item_id, digest in hashes.items() if known.get(item_id) != digest]
+
+    def record(self, hashes: Dict[str, str]):
+        """
+        Record freshly scraped items (call once their output is saved).
+
+        Args:
+            hashes: Content hash per scraped item
+        """
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                """INSERT INTO items (item_id, scraped_at, content_hash, changed_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(item_id) DO UPDATE SET
+                       scraped_at = excluded.scraped_at,
+                       changed_at = CASE WHEN items.content_hash IS excluded.content_hash
+                                         THEN items.changed_at ELSE excluded.scraped_at END,
+                       content_hash = excluded.content_hash""",
+                ((item_id, now, digest, now) for item_id, digest in hashes.items())
+            )
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
@@ -1,57 +1,454 @@
 """Retry logic with exponential backoff for web requests."""
 import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
 import aiohttp
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from typing import Optional, Dict, Any
+import zstandard as zstd
+from tenacity import RetryCallState
+from typing import Optional, Dict, Any, Tuple, Union
 import logging
 
+from .metrics import Metrics
+from .rate_control import AdaptiveController, parse_retry_after
+from .retry_policy import CircuitBreaker, RetryPolicy, is_retryable_status
+
 logger = logging.getLogger(__name__)
 
 
+def retry_cause(error: BaseException) -> str:
+    """Short label for why a request attempt failed (``timeout``, ``http_503``, ...)."""
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, aiohttp.ClientResponseError):
+        return f"http_{error.status}"
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return "connection"
+    return type(error).__name__
+
+
+@dataclass
+class CachedResponse:
+    """A cached response body with its HTTP validators."""
+    body: bytes
+    encoding: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    validated_at: float
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers that turn a GET into a conditional request."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache keyed by URL.
+
+    Bodies are stored zstd-compressed in a SQLite database together with the
+    ``ETag`` / ``Last-Modified`` validators. Entries validated less than
+    ``ttl`` seconds ago are served without any request; older entries are
+    revalidated with ``If-None-Match`` / ``If-Modified-Since`` so an
+    unchanged page costs a 304 instead of a full download.
+
+    The methods are safe to call from worker threads (``RetryableSession``
+    runs them off the event loop, since a write may wait for other
+    processes sharing the database).
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: float = 0.0, compression_level: int = 3):
+        """
+        Initialize HTTP cache.
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds after validation during which an entry is served
+                without contacting the server (0 = always revalidate)
+            compression_level: zstd compression level for stored bodies
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._compressor = zstd.ZstdCompressor(level=compression_level)
+        self._decompressor = zstd.ZstdDecompressor()
+        # Shared by --worker processes: wait for their writes like the state store does
+        self._db = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT NOT NULL,
+                validated_at REAL NOT NULL,
+                body BLOB NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for a URL, if any."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, encoding, etag, last_modified, validated_at FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            body, encoding, etag, last_modified, validated_at = row
+            return CachedResponse(self._decompressor.decompress(body), encoding, etag, last_modified, validated_at)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """Whether an entry can be served without revalidation."""
+        return time.time() - entry.validated_at < self.ttl
+
+    def put(self, url: str, body: bytes, encoding: str, etag: Optional[str], last_modified: Optional[str]):
+        """Store (or replace) the response for a URL."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, encoding, time.time(), self._compressor.compress(body))
+            )
+            self._db.commit()
+
+    def touch(self, url: str):
+        """Mark an entry as just revalidated (after a 304)."""
+        with self._lock:
+            self._db.execute("UPDATE responses SET validated_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+
 class RetryableSession:
-    """HTTP session with built-in retry logic."""
-    
-    def __init__(self, max_retries: int = 5, base_delay: float = 1.0):
+    """
+    HTTP session with built-in retry logic.
+
+    A single session is meant to live for a whole stage: it owns one pooled
+    ``aiohttp.TCPConnector`` with per-host limits, a DNS cache and keep-alive,
+    so TCP/TLS handshakes are paid once per connection instead of per batch.
+
+    Concurrent requests for the same URL share one in-flight fetch (retries
+    included), and responses are kept in a small in-memory LRU for
+    ``memory_cache_ttl`` seconds, so duplicate requests never reach the
+    network. ``requests_saved`` counts both.
+
+    Failed attempts are retried per the ``RetryPolicy`` (transient failures
+    only, with jittered waits that honor ``Retry-After``), and every attempt
+    first passes the ``CircuitBreaker``, which pauses the whole session
+    while the upstream is failing.
+
+    With a ``Metrics`` registry, every attempt records its latency, status
+    and downloaded bytes, and every retry its cause.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_connections: int = 100,
+        max_connections_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        total_timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 30.0,
+        controller: Optional[AdaptiveController] = None,
+        cache: Optional[HttpCache] = None,
+        memory_cache_size: int = 256,
+        memory_cache_ttl: float = 60.0,
+        metrics: Optional[Metrics] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Initialize retryable session.
+
+        Args:
+            max_retries: Maximum number of attempts per request (when no
+                ``retry_policy`` is given)
+            base_delay: Shortest wait between attempts (when no
+                ``retry_policy`` is given)
+            max_connections: Total connection pool size
+            max_connections_per_host: Connection limit per host; match this to
+                ``ParallelProcessor.max_concurrent``
+            dns_cache_ttl: Seconds to cache DNS lookups
+            keepalive_timeout: Seconds to keep idle connections open for reuse
+            total_timeout: Total timeout per request in seconds
+            connect_timeout: Timeout to acquire and establish a connection
+            read_timeout: Timeout between reads of the response body
+            controller: Adaptive controller that paces every attempt and
+                receives its latency, status and ``Retry-After``
+            cache: HTTP cache used for conditional requests
+            memory_cache_size: Recent responses kept in memory (0 disables)
+            memory_cache_ttl: Seconds a response is served from memory
+            metrics: Registry receiving request, cache and retry metrics
+            retry_policy: Which failures are retried and how long to wait
+                (built from ``max_retries`` / ``base_delay`` when omitted)
+            circuit_breaker: Breaker shared by every attempt (a default one
+                when omitted)
+        """
         self.max_retries = max_retries
         self.base_delay = base_delay
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout,
+            connect=connect_timeout,
+            sock_read=read_timeout
+        )
+        self.controller = controller
+        self.cache = cache
+        self.memory_cache_size = memory_cache_size
+        self.memory_cache_ttl = memory_cache_ttl
+        self.metrics = metrics
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=max_retries, base_delay=base_delay)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(metrics=metrics)
+        self._recent: OrderedDict[str, Tuple[float, bytes, str]] = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
         self.session: Optional[aiohttp.ClientSession] = None
-        
+        self.stats: Dict[str, int] = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+            'cache_fresh': 0,
+            'cache_not_modified': 0,
+            'cache_downloaded': 0,
+            'coalesced': 0,
+            'memory_hits': 0,
+        }
+
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+            enable_cleanup_closed=True
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            trace_configs=[self._create_trace_config()]
+        )
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             await self.session.close()
-    
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=1, max=60),
-        retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError))
-    )
+            self.session = None
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        """Create trace hooks that count new vs. reused connections."""
+        trace_config = aiohttp.TraceConfig()
+
+        def counter(key: str):
+            async def on_event(session, context, params):
+                self.stats[key] += 1
+            return on_event
+
+        trace_config.on_request_start.append(counter('requests'))
+        trace_config.on_connection_create_end.append(counter('connections_created'))
+        trace_config.on_connection_reuseconn.append(counter('connections_reused'))
+        trace_config.on_dns_cache_hit.append(counter('dns_cache_hits'))
+        trace_config.on_dns_cache_miss.append(counter('dns_cache_misses'))
+        return trace_config
+
+    @property
+    def requests_saved(self) -> int:
+        """Requests answered by an in-flight duplicate or the in-memory LRU."""
+        return self.stats['coalesced'] + self.stats['memory_hits']
+
+    @property
+    def connection_reuse_ratio(self) -> float:
+        """Fraction of requests served over an already-open connection."""
+        total = self.stats['connections_created'] + self.stats['connections_reused']
+        return self.stats['connections_reused'] / total if total else 0.0
+
     async def get(self, url: str, **kwargs) -> str:
         """Perform GET request with automatic retry on failure."""
-        if not self.session:
-            raise RuntimeError("Session not initialized. Use async context manager.")
-            
         logger.debug(f"Fetching URL: {url}")
-        
-        async with self.session.get(url, **kwargs) as response:
-            response.raise_for_status()
-            return await response.text()
-    
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=1, max=60),
-        retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError))
-    )
+        body, encoding = await self._fetch_shared(url, **kwargs)
+        return body.decode(encoding)
+
+    async def get_bytes(self, url: str, **kwargs) -> bytes:
+        """Perform GET request and return the undecoded body with automatic retry."""
+        logger.debug(f"Fetching URL: {url}")
+        body, _ = await self._fetch_shared(url, **kwargs)
+        return body
+
     async def get_json(self, url: str, **kwargs) -> Dict[str, Any]:
         """Perform GET request and return JSON with automatic retry."""
+        logger.debug(f"Fetching JSON from URL: {url}")
+        body, encoding = await self._fetch_shared(url, **kwargs)
+        return json.loads(body.decode(encoding))
+
+    async def _fetch_shared(self, url: str, **kwargs) -> Tuple[bytes, str]:
+        """
+        Fetch a URL, deduplicated against recent and in-flight requests.
+
+        Only plain GETs (no extra request arguments) are shared, since
+        headers or parameters may change the response.
+        """
+        if kwargs:
+            return await self._fetch(url, **kwargs)
+
+        recent = self._recent.get(url)
+        if recent is not None:
+            fetched_at, body, encoding = recent
+            if time.monotonic() - fetched_at < self.memory_cache_ttl:
+                self._recent.move_to_end(url)
+                self.stats['memory_hits'] += 1
+                self._count_saved('memory')
+                return body, encoding
+            del self._recent[url]
+
+        task = self._in_flight.get(url)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            self._count_saved('coalesced')
+        else:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda t: self._fetch_done(url, t))
+        # Shielded so a cancelled caller does not cancel the fetch other
+        # callers are waiting on
+        return await asyncio.shield(task)
+
+    def _count_saved(self, how: str):
+        if self.metrics is not None:
+            self.metrics.counter('http_requests_saved_total', 'Duplicate requests not sent, by how').inc(how=how)
+
+    def _count_cache(self, result: str):
+        self.stats[f'cache_{result}'] += 1
+        if self.metrics is not None:
+            self.metrics.counter('http_cache_total', 'HTTP cache lookups, by result').inc(result=result)
+
+    def _record_attempt(self, latency: float, status: str, size: int = 0):
+        """Record one request attempt in the metrics registry."""
+        if self.metrics is None:
+            return
+        self.metrics.counter('http_requests_total', 'Request attempts sent, by status').inc(status=status)
+        self.metrics.histogram('http_request_duration_seconds', 'Request latency').observe(latency)
+        if size:
+            self.metrics.counter('http_response_bytes_total', 'Response body bytes downloaded').inc(size)
+
+    def _fetch_done(self, url: str, task: asyncio.Task):
+        """Retire an in-flight fetch and remember its response."""
+        del self._in_flight[url]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self.memory_cache_size > 0:
+            body, encoding = task.result()
+            self._recent[url] = (time.monotonic(), body, encoding)
+            self._recent.move_to_end(url)
+            while len(self._recent) > self.memory_cache_size:
+                self._recent.popitem(last=False)
+
+    async def _fetch(self, url: str, **kwargs) -> Tuple[bytes, str]:
+        """Perform GET request, retrying transient failures per the retry policy."""
+        return await self.retry_policy.retrying(before_sleep=self._record_retry)(self._request, url, **kwargs)
+
+    def _record_retry(self, retry_state: RetryCallState):
+        """Count a retry by cause (tenacity ``before_sleep`` hook)."""
+        error = retry_state.outcome.exception()
+        logger.debug(f"Retrying {retry_state.args[0]} in {retry_state.upcoming_sleep:.1f}s after {retry_cause(error)}")
+        if self.metrics is not None:
+            self.metrics.counter('http_retries_total', 'Request attempts retried, by cause').inc(
+                cause=retry_cause(error)
+            )
+
+    def _report_to_controller(self, latency: float, response: aiohttp.ClientResponse):
+        """Feed one answered attempt (latency to the headers) to the adaptive controller."""
+        if self.controller:
+            self.controller.record(
+                latency,
+                status=response.status,
+                retry_after=parse_retry_after(response.headers.get('Retry-After'))
+            )
+
+    async def _request(self, url: str, **kwargs) -> Tuple[bytes, str]:
+        """
+        Perform a single GET attempt through the cache.
+
+        Waits for the circuit breaker, reports the outcome to the breaker
+        and the controller, and returns the body with its text encoding,
+        from the network or, when fresh or not modified, from the cache.
+        """
         if not self.session:
             raise RuntimeError("Session not initialized. Use async context manager.")
-            
-        logger.debug(f"Fetching JSON from URL: {url}")
-        
-        async with self.session.get(url, **kwargs) as response:
-            response.raise_for_status()
-            return await response.json()
\ No newline at end of file
+
+        # Cache reads and writes may wait on other workers' SQLite locks: keep them off the event loop
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache is not None else None
+        if cached and self.cache.is_fresh(cached):
+            self._count_cache('fresh')
+            return cached.body, cached.encoding
+        if cached:
+            kwargs['headers'] = {**cached.conditional_headers(), **kwargs.get('headers', {})}
+
+        await self.circuit_breaker.wait()
+        if self.controller:
+            await self.controller.pace()
+        start = time.monotonic()
+        response = None
+        try:
+            async with self.session.get(url, **kwargs) as response:
+                self.circuit_breaker.record(failed=is_retryable_status(response.status))
+                # Reported once per attempt: here unless a body still has to be read
+                header_latency = time.monotonic() - start
+                if cached and response.status == 304:
+                    self._report_to_controller(header_latency, response)
+                    self._record_attempt(time.monotonic() - start, '304')
+                    await asyncio.to_thread(self.cache.touch, url)
+                    self._count_cache('not_modified')
+                    return cached.body, cached.encoding
+
+                if response.status >= 400:
+                    self._report_to_controller(header_latency, response)
+                    self._record_attempt(time.monotonic() - start, str(response.status))
+                response.raise_for_status()
+                body = await response.read()
+                encoding = response.get_encoding()
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+            # The breaker already has a failed body read's status; the controller
+            # hears about the attempt only here
+            if response is None:
+                self.circuit_breaker.record(failed=True)
+            if self.controller:
+                self.controller.record(time.monotonic() - start, error=True)
+            self._record_attempt(time.monotonic() - start, retry_cause(e))
+            raise
+        self._report_to_controller(header_latency, response)
+        self._record_attempt(time.monotonic() - start, str(response.status), len(body))
+
+        if self.cache is not None:
+            await asyncio.to_thread(
+                self.cache.put, url, body, encoding,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+            self._count_cache('downloaded')
+        return body, encoding
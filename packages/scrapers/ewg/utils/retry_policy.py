@@ -0,0 +1,216 @@
+"""Status-aware retry policy and circuit breaker for upstream requests."""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+import logging
+import aiohttp
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception, stop_after_attempt
+
+from .metrics import Metrics
+from .rate_control import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# 4xx statuses that are worth retrying (timeout, too early, throttled); every
+# other 4xx means the request itself is bad, e.g. a nonexistent ZIP code
+RETRYABLE_CLIENT_STATUSES = frozenset({408, 425, 429})
+
+
+def is_retryable_status(status: int) -> bool:
+    """Whether a response status is a transient upstream failure."""
+    return status >= 500 or status in RETRYABLE_CLIENT_STATUSES
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed request attempt may succeed if repeated."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return is_retryable_status(error.status)
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def error_retry_after(error: BaseException) -> Optional[float]:
+    """``Retry-After`` seconds sent with a failed response, if any."""
+    if isinstance(error, aiohttp.ClientResponseError) and error.headers:
+        return parse_retry_after(error.headers.get('Retry-After'))
+    return None
+
+
+class RetryPolicy:
+    """
+    Which request failures are retried and how long to wait in between.
+
+    Timeouts, connection errors, 408/425/429 and 5xx responses are retried
+    up to ``max_attempts`` attempts in total; any other 4xx (a nonexistent
+    ZIP code, a retired PWS) is raised after the first attempt. Waits use
+    decorrelated jitter (each wait drawn between ``base_delay`` and three
+    times the previous wait, capped at ``max_delay``), so retries of
+    requests that failed together spread out instead of arriving in waves.
+    A ``Retry-After`` on the failed response is a lower bound on the wait
+    (capped at ``max_retry_after``). After the last attempt the original
+    error is raised.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        max_retry_after: float = 300.0
+    ):
+        """
+        Initialize retry policy.
+
+        Args:
+            max_attempts: Attempts per request, the first one included
+            base_delay: Shortest wait between attempts in seconds
+            max_delay: Longest jittered wait in seconds
+            max_retry_after: Upper bound on honored ``Retry-After`` waits
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def wait(self, retry_state: RetryCallState) -> float:
+        """Seconds to wait before the next attempt (tenacity ``wait`` strategy)."""
+        # upcoming_sleep still holds the previous wait (0 before the first retry)
+        previous = max(self.base_delay, retry_state.upcoming_sleep)
+        delay = min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+        retry_after = error_retry_after(retry_state.outcome.exception())
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    def retrying(self, before_sleep: Optional[Callable[[RetryCallState], None]] = None) -> AsyncRetrying:
+        """Tenacity controller applying this policy to one request."""
+        return AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=self.wait,
+            retry=retry_if_exception(is_retryable),
+            before_sleep=before_sleep,
+            reraise=True
+        )
+
+
+class CircuitBreaker:
+    """
+    Pause every request while the upstream is degraded.
+
+    Each attempt awaits ``wait`` before it is sent and reports its outcome
+    with ``record``. Transient upstream failures (5xx, 429, timeouts,
+    connection errors) count as failures; any other response counts as a
+    success, since the server answered. Once ``min_requests`` of the last
+    ``window`` attempts are known and at least ``failure_threshold`` of them
+    failed, the breaker opens and ``wait`` holds every caller for
+    ``cooldown`` seconds, so a whole stage backs off together instead of
+    each task on its own. It then lets a single probe through (half-open):
+    a success closes the breaker, a failure reopens it with the cooldown
+    doubled, up to ``max_cooldown``.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        window: int = 50,
+        min_requests: int = 20,
+        cooldown: float = 30.0,
+        max_cooldown: float = 300.0,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            failure_threshold: Share of failed attempts that opens the breaker
+            window: Recent attempts the share is computed over
+            min_requests: Attempts needed before the breaker can open
+            cooldown: Seconds the breaker stays open the first time
+            max_cooldown: Longest cooldown after repeated failed probes
+            metrics: Registry receiving the breaker state and openings
+        """
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.metrics = metrics
+
+        self.cooldown = cooldown
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._open_until = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._probe_done: Optional[asyncio.Event] = None
+
+        self.stats: Dict[str, int] = {
+            'opened': 0,
+            'probes': 0,
+            'closed': 0,
+        }
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half_open``."""
+        if not self._open_until:
+            return 'closed'
+        return 'half_open' if self._probing or time.monotonic() >= self._open_until else 'open'
+
+    async def wait(self):
+        """Return when a request may be sent: at once unless the breaker is open."""
+        while self._open_until:
+            delay = self._open_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif not self._probing or time.monotonic() - self._probe_started > self.cooldown:
+                # This caller is the probe (also replacing one that never reported back)
+                self._probing = True
+                self._probe_started = time.monotonic()
+                self._probe_done = asyncio.Event()
+                self.stats['probes'] += 1
+                logger.info("Circuit breaker half-open: probing upstream")
+                return
+            else:
+                try:
+                    await asyncio.wait_for(self._probe_done.wait(), self.cooldown)
+                except asyncio.TimeoutError:
+                    pass
+
+    def record(self, failed: bool):
+        """Report whether an attempt failed because of the upstream."""
+        if self._probing:
+            self._probing = False
+            self._probe_done.set()
+            if failed:
+                self._open(min(self.cooldown * 2, self.max_cooldown), "probe failed")
+            else:
+                self._close()
+            return
+        if self._open_until:
+            # Stragglers sent before the breaker opened
+            return
+
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_requests:
+            failure_rate = sum(self._outcomes) / len(self._outcomes)
+            if failure_rate >= self.failure_threshold:
+                self._open(self.base_cooldown, f"{failure_rate:.0%} of the last {len(self._outcomes)} attempts failed")
+
+    def _open(self, cooldown: float, reason: str):
+        self.cooldown = cooldown
+        self._open_until = time.monotonic() + cooldown
+        self._outcomes.clear()
+        self.stats['opened'] += 1
+        logger.warning(f"Circuit breaker open ({reason}); pausing requests for {cooldown:.0f}s")
+        if self.metrics is not None:
+            self.metrics.counter('circuit_breaker_opened_total', 'Times the circuit breaker opened').inc()
+            self.metrics.gauge('circuit_breaker_open', 'Whether requests are paused by the circuit breaker').set(1)
+
+    def _close(self):
+        self.cooldown = self.base_cooldown
+        self._open_until = 0.0
+        self._outcomes.clear()
+        self.stats['closed'] += 1
+        logger.info("Circuit breaker closed: upstream recovered")
+        if self.metrics is not None:
+            self.metrics.gauge('circuit_breaker_open', 'Whether requests are paused by the circuit breaker').set(0)
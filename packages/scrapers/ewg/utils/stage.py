@@ -0,0 +1,150 @@
+"""Setup and reporting shared by the scraping stages (steps 2 and 3)."""
+import time
+from pathlib import Path
+from typing import Callable, Mapping, Optional, Tuple, Union
+from rich.console import Console
+
+from .dataset import DatasetWriter
+from .metrics import Metrics
+from .parallel import ParallelProcessor
+from .progress import ProgressTracker
+from .rate_control import AdaptiveController
+from .retry import RetryableSession
+from .state import StateStore
+
+
+def create_controller(
+    adaptive: bool,
+    concurrency: int,
+    rate: float,
+    concurrency_range: Tuple[int, int],
+    rate_range: Tuple[float, float]
+) -> Optional[AdaptiveController]:
+    """
+    Adaptive controller from a stage's limits.
+
+    Args:
+        adaptive: Whether limits are retuned from responses
+        concurrency: Starting concurrency
+        rate: Starting request rate (req/s)
+        concurrency_range: Concurrency floor and ceiling
+        rate_range: Request rate floor and ceiling
+
+    Returns:
+        The controller, or None with fixed limits
+    """
+    if not adaptive:
+        return None
+    return AdaptiveController(
+        concurrency=concurrency,
+        rate=rate,
+        min_concurrency=concurrency_range[0],
+        max_concurrency=concurrency_range[1],
+        min_rate=rate_range[0],
+        max_rate=rate_range[1]
+    )
+
+
+def open_state(
+    state_file: Union[str, Path],
+    stage: str,
+    writer: DatasetWriter,
+    console: Console,
+    item_name: str = "items",
+    legacy_results: Optional[Callable[[], Optional[Mapping[str, bool]]]] = None
+) -> StateStore:
+    """
+    Open the pipeline state for a stage.
+
+    On first use, progress from the stage's old JSON checkpoint is imported.
+    Part files whose batch never committed are removed.
+
+    Args:
+        state_file: State store database
+        stage: Stage name (and name of the JSON checkpoint)
+        writer: The stage's dataset writer
+        console: Console the import is reported on
+        item_name: What the stage's items are called in the report
+        legacy_results: Returns whether each item had results, as recorded
+            before the state store (None if unknown)
+    """
+    state = StateStore(state_file)
+    if state.is_new(stage):
+        results = legacy_results() if legacy_results is not None else None
+        completed = ProgressTracker().get_completed_items(stage)
+        if state.import_legacy(stage, writer, completed, results):
+            console.print(f"[yellow]Imported {len(completed):,} {item_name} from the JSON checkpoint[/yellow]")
+    state.discard_uncommitted(stage, writer)
+    return state
+
+
+def print_session_stats(console: Console, session: RetryableSession, controller: Optional[AdaptiveController]):
+    """Print connection reuse, cache and rate limit statistics for a finished session."""
+    console.print(
+        f"[dim]Connections: {session.stats['connections_created']:,} opened, "
+        f"{session.stats['connections_reused']:,} reused "
+        f"({session.connection_reuse_ratio:.1%} reuse)[/dim]"
+    )
+    console.print(
+        f"[dim]HTTP cache: {session.stats['cache_fresh']:,} fresh, "
+        f"{session.stats['cache_not_modified']:,} not modified, "
+        f"{session.stats['cache_downloaded']:,} downloaded[/dim]"
+    )
+    console.print(
+        f"[dim]Duplicate requests saved: {session.requests_saved:,} "
+        f"({session.stats['coalesced']:,} coalesced, {session.stats['memory_hits']:,} from memory)[/dim]"
+    )
+    breaker = session.circuit_breaker
+    if breaker.stats['opened']:
+        console.print(
+            f"[yellow]Circuit breaker opened {breaker.stats['opened']:,} times "
+            f"({breaker.stats['probes']:,} probes); ended {breaker.state}[/yellow]"
+        )
+    if controller:
+        console.print(
+            f"[dim]Adaptive limits: ended at {controller.concurrency} concurrent, "
+            f"{controller.rate:.1f} req/s ({controller.stats['increases']} raises, "
+            f"{controller.stats['decreases']} back-offs, {controller.stats['throttled']} throttled)[/dim]"
+        )
+
+
+def create_metrics(stage: str, worker_id: Optional[str] = None) -> Metrics:
+    """Metrics registry for a stage (and worker)."""
+    labels = {'stage': stage}
+    if worker_id:
+        labels['worker'] = worker_id
+    return Metrics(labels=labels)
+
+
+def write_metrics(metrics: Metrics, metrics_file: Path, summary_file: Path):
+    """
+    Write the Prometheus text file and JSON summary, one pair per worker.
+
+    Args:
+        metrics: Registry from ``create_metrics``
+        metrics_file: Prometheus text file; workers add "-<worker id>" to
+            the name
+        summary_file: JSON summary, named the same way
+    """
+    worker = dict(metrics.labels).get('worker')
+    suffix = f"-{worker}" if worker else ""
+    metrics.write(
+        metrics_file.with_name(f"{metrics_file.stem}{suffix}{metrics_file.suffix}"),
+        summary_file.with_name(f"{summary_file.stem}{suffix}{summary_file.suffix}")
+    )
+
+
+def record_flush(metrics: Metrics, rows: int, processor: ParallelProcessor, write_seconds: float = 0.0):
+    """Count a written part and refresh the throughput and limit gauges."""
+    metrics.counter('rows_written_total', 'Rows written to part files').inc(rows)
+    metrics.counter('parts_written_total', 'Part files written').inc()
+    metrics.counter('part_write_seconds_total', 'Time spent writing and committing part files').inc(
+        round(write_seconds, 6)
+    )
+    elapsed = time.time() - metrics.started_at
+    metrics.gauge('rows_per_second', 'Rows written per second since the stage started').set(
+        round(metrics.value('rows_written_total') / elapsed, 3) if elapsed > 0 else 0
+    )
+    limits = processor.limits
+    metrics.gauge('concurrency_limit', 'Current concurrency limit').set(limits['concurrency'])
+    metrics.gauge('rate_limit', 'Current request rate limit (req/s)').set(limits['rate'])
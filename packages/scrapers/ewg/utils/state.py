@@ -0,0 +1,287 @@
+"""Transactional pipeline state: per-item status and committed part files."""
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+import logging
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .dataset import DatasetWriter
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """
+    Per-item pipeline state in one SQLite database.
+
+    Every item (ZIP code, PWS ID, ...) of a stage has a row with its status
+    (``pending``, ``done`` or ``failed``), attempt count, last error, whether
+    it had results and when it was last updated. ``commit_batch`` writes a
+    batch's part file and then, in a single transaction, registers the part
+    and updates the batch's items. A part whose transaction never committed
+    (crash in between) is removed by ``discard_uncommitted`` on the next
+    start, so saved rows and item status always agree: items are either done
+    with their rows on disk, or still pending without any.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Initialize state store.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS items (
+                stage TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                has_results INTEGER,
+                part TEXT,
+                updated_at REAL,
+                PRIMARY KEY (stage, item_id)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_status ON items (stage, status)")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS parts (
+                stage TEXT NOT NULL,
+                name TEXT NOT NULL,
+                num_rows INTEGER NOT NULL,
+                committed_at REAL NOT NULL,
+                PRIMARY KEY (stage, name)
+            )"""
+        )
+        self._db.commit()
+
+    def is_new(self, stage: str) -> bool:
+        """Whether nothing has been recorded for a stage yet."""
+        return (
+            self._db.execute("SELECT 1 FROM items WHERE stage = ? LIMIT 1", (stage,)).fetchone() is None
+            and self._db.execute("SELECT 1 FROM parts WHERE stage = ? LIMIT 1", (stage,)).fetchone() is None
+        )
+
+    def add_items(self, stage: str, item_ids: Iterable[str]):
+        """Register items as pending; items already known keep their state."""
+        with self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO items (stage, item_id) VALUES (?, ?)",
+                ((stage, item_id) for item_id in item_ids)
+            )
+
+    def counts(self, stage: str) -> Dict[str, int]:
+        """Number of items per status."""
+        counts = {'pending': 0, 'done': 0, 'failed': 0}
+        counts.update(self._db.execute(
+            "SELECT status, COUNT(*) FROM items WHERE stage = ? GROUP BY status", (stage,)
+        ))
+        return counts
+
+    def remaining(self, stage: str) -> List[str]:
+        """Items not done yet (pending or failed), in the order they were added."""
+        return [item_id for item_id, in self._db.execute(
+            "SELECT item_id FROM items WHERE stage = ? AND status IN ('pending', 'failed') ORDER BY rowid",
+            (stage,)
+        )]
+
+    def completed(self, stage: str) -> List[str]:
+        """Items done, in the order they were added."""
+        return [item_id for item_id, in self._db.execute(
+            "SELECT item_id FROM items WHERE stage = ? AND status = 'done' ORDER BY rowid", (stage,)
+        )]
+
+    def not_done(self, stage: str, item_ids: Iterable[str]) -> List[str]:
+        """The given items that are not done yet, in the given order."""
+        item_ids = list(item_ids)
+        done: Set[str] = set()
+        for i in range(0, len(item_ids), 500):
+            chunk = item_ids[i:i + 500]
+            done.update(item_id for item_id, in self._db.execute(
+                f"""SELECT item_id FROM items WHERE stage = ? AND status = 'done'
+                    AND item_id IN ({','.join('?' * len(chunk))})""",
+                [stage, *chunk]
+            ))
+        return [item_id for item_id in item_ids if item_id not in done]
+
+    def with_results(self, stage: str, has_results: bool) -> List[str]:
+        """Done items that did (or did not) have results."""
+        return [item_id for item_id, in self._db.execute(
+            "SELECT item_id FROM items WHERE stage = ? AND status = 'done' AND has_results = ?",
+            (stage, int(has_results))
+        )]
+
+    def reopen(self, stage: str, item_ids: Iterable[str]):
+        """
+        Mark done items pending again so they are processed once more.
+
+        Only for items without saved rows (e.g. ones that had no results),
+        so saved rows and item status keep agreeing.
+        """
+        with self._db:
+            self._db.executemany(
+                "UPDATE items SET status = 'pending', has_results = NULL WHERE stage = ? AND item_id = ?",
+                ((stage, item_id) for item_id in item_ids)
+            )
+
+    def commit_batch(
+        self,
+        stage: str,
+        writer: DatasetWriter,
+        df: Optional[pd.DataFrame],
+        done: Mapping[str, Optional[bool]],
+        failed: Optional[Mapping[str, str]] = None
+    ) -> Optional[Path]:
+        """
+        Save a batch's rows and the status of its items atomically.
+
+        Args:
+            stage: Stage name
+            writer: Dataset the rows are appended to
+            df: Batch rows (None or empty for no rows)
+            done: Items completed by this batch, each with whether it had
+                results (None if unknown)
+            failed: Error message per item that failed in this batch
+
+        Returns:
+            Path of the written part, or None if the batch had no rows
+        """
+        part = writer.write_batch(df) if df is not None else None
+        now = time.time()
+        try:
+            self._commit(stage, part, len(df) if part is not None else 0, done, failed or {}, now)
+        except BaseException:
+            if part is not None:
+                writer.discard([part])
+            raise
+        return part
+
+    def _commit(
+        self,
+        stage: str,
+        part: Optional[Path],
+        num_rows: int,
+        done: Mapping[str, Optional[bool]],
+        failed: Mapping[str, str],
+        now: float
+    ):
+        """Register a part and update its batch's items in one transaction."""
+        with self._db:
+            if part is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO parts (stage, name, num_rows, committed_at) VALUES (?, ?, ?, ?)",
+                    (stage, part.name, num_rows, now)
+                )
+            self._db.executemany(
+                """INSERT INTO items (stage, item_id, status, attempts, has_results, part, updated_at)
+                   VALUES (?, ?, 'done', 1, ?, ?, ?)
+                   ON CONFLICT(stage, item_id) DO UPDATE SET
+                       status = 'done', attempts = items.attempts + 1, error = NULL,
+                       has_results = excluded.has_results, part = excluded.part,
+                       updated_at = excluded.updated_at""",
+                (
+                    (stage, item_id, None if has_results is None else int(has_results),
+                     part.name if part is not None else None, now)
+                    for item_id, has_results in done.items()
+                )
+            )
+            self._db.executemany(
+                """INSERT INTO items (stage, item_id, status, attempts, error, updated_at)
+                   VALUES (?, ?, 'failed', 1, ?, ?)
+                   ON CONFLICT(stage, item_id) DO UPDATE SET
+                       status = CASE WHEN items.status = 'done' THEN 'done' ELSE 'failed' END,
+                       attempts = items.attempts + 1, error = excluded.error,
+                       updated_at = excluded.updated_at""",
+                ((stage, item_id, error, now) for item_id, error in failed.items())
+            )
+
+    def discard_uncommitted(self, stage: str, writer: DatasetWriter) -> int:
+        """
+        Delete part files whose batch never committed (e.g. after a crash).
+
+        Returns:
+            Number of parts removed
+        """
+        registered = {name for name, in self._db.execute("SELECT name FROM parts WHERE stage = ?", (stage,))}
+        orphans = [part for part in writer.parts if part.name not in registered]
+        if orphans:
+            logger.warning(f"Discarding {len(orphans)} uncommitted part files of {stage}")
+            writer.discard(orphans)
+        return len(orphans)
+
+    def rename_parts(self, stage: str, moves: Iterable[Tuple[Path, Path]]):
+        """Follow part files moved by ``DatasetWriter.adopt``."""
+        moves = [(old.name, new.name) for old, new in moves]
+        with self._db:
+            self._db.executemany(
+                "UPDATE parts SET name = ? WHERE stage = ? AND name = ?",
+                ((new, stage, old) for old, new in moves)
+            )
+            self._db.executemany(
+                "UPDATE items SET part = ? WHERE stage = ? AND part = ?",
+                ((new, stage, old) for old, new in moves)
+            )
+
+    def clear_parts(self, stage: str):
+        """Forget all parts of a stage (before its dataset is rebuilt)."""
+        with self._db:
+            self._db.execute("DELETE FROM parts WHERE stage = ?", (stage,))
+            self._db.execute("UPDATE items SET part = NULL WHERE stage = ?", (stage,))
+
+    def import_legacy(
+        self,
+        stage: str,
+        writer: DatasetWriter,
+        completed: Iterable[str],
+        has_results: Optional[Mapping[str, bool]] = None
+    ) -> bool:
+        """
+        Adopt state kept before this store existed (JSON checkpoints).
+
+        Only runs for a stage without any recorded state: marks the
+        checkpointed items done and registers the existing part files.
+
+        Args:
+            stage: Stage name
+            writer: Dataset whose existing parts are registered
+            completed: Items the old checkpoint had marked completed
+            has_results: Known result flags per item
+
+        Returns:
+            True if anything was imported
+        """
+        if not self.is_new(stage):
+            return False
+        completed = list(completed)
+        parts = writer.parts
+        if not completed and not parts:
+            return False
+        has_results = has_results or {}
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO parts (stage, name, num_rows, committed_at) VALUES (?, ?, ?, ?)",
+                ((stage, part.name, pq.ParquetFile(part).metadata.num_rows, now) for part in parts)
+            )
+            self._db.executemany(
+                """INSERT OR IGNORE INTO items (stage, item_id, status, attempts, has_results, updated_at)
+                   VALUES (?, ?, 'done', 1, ?, ?)""",
+                (
+                    (stage, item_id, None if has_results.get(item_id) is None else int(has_results[item_id]), now)
+                    for item_id in completed
+                )
+            )
+        logger.info(f"Imported {len(completed):,} checkpointed items and {len(parts)} parts of {stage}")
+        return True
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
@@ -0,0 +1,387 @@
+"""Lease-based work queue for splitting a crawl across worker processes."""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+import logging
+
+from .rate_control import AdaptiveController
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    """Worker ID unique per process and machine: ``<hostname>-<pid>``."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseExpired(Exception):
+    """Raised when a worker is about to save results of a shard it no longer holds."""
+
+
+@dataclass
+class Shard:
+    """A leased batch of items."""
+    queue: str
+    shard_id: str
+    items: List[str]
+    attempts: int
+
+
+class WorkQueue:
+    """
+    SQLite-backed queue of item shards shared by several workers.
+
+    The first worker ``populate``s a named queue with shards; every worker
+    then ``lease``s pending shards one at a time. A lease expires after
+    ``lease_seconds`` unless renewed with ``heartbeat``, so shards held by a
+    crashed worker are handed out again. A shard is ``complete``d only once
+    its output is saved. When no shards are left, each worker closes its
+    output and calls ``claim_finalize``; exactly one of them, the last live
+    worker to finish, wins and merges the output.
+
+    Keep the database on a volume every worker can reach with working file
+    locks (a local disk, or a network file system with proper locking).
+    The methods are safe to call from worker threads, so ``work_shards`` runs
+    them off the event loop while they wait for other workers' writes.
+    """
+
+    def __init__(self, path: Union[str, Path], lease_seconds: float = 300.0):
+        """
+        Initialize work queue.
+
+        Args:
+            path: SQLite database file
+            lease_seconds: Seconds a lease lasts without a heartbeat
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        # Autocommit mode; multi-statement updates use explicit BEGIN IMMEDIATE
+        self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS shards (
+                queue TEXT NOT NULL,
+                shard_id TEXT NOT NULL,
+                items TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (queue, shard_id)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS shards_status ON shards (queue, status, lease_expires)")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS workers (
+                queue TEXT NOT NULL,
+                worker TEXT NOT NULL,
+                heartbeat_at REAL NOT NULL,
+                finished INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (queue, worker)
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS finalized (
+                queue TEXT PRIMARY KEY,
+                worker TEXT NOT NULL,
+                finalized_at REAL NOT NULL
+            )"""
+        )
+
+    def populate(self, queue: str, shards: Dict[str, List[str]]) -> bool:
+        """
+        Fill a queue with shards unless another worker already did.
+
+        Args:
+            queue: Queue name
+            shards: Items per shard ID
+
+        Returns:
+            True if this call created the shards
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                exists = self._db.execute("SELECT 1 FROM shards WHERE queue = ? LIMIT 1", (queue,)).fetchone()
+                if exists is None:
+                    self._db.executemany(
+                        "INSERT INTO shards (queue, shard_id, items) VALUES (?, ?, ?)",
+                        ((queue, shard_id, json.dumps(items)) for shard_id, items in shards.items() if items)
+                    )
+                    self._db.execute("DELETE FROM finalized WHERE queue = ?", (queue,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return exists is None
+
+    def lease(self, queue: str, worker: str) -> Optional[Shard]:
+        """
+        Lease the next pending (or expired) shard.
+
+        Args:
+            queue: Queue name
+            worker: ID of the leasing worker
+
+        Returns:
+            The leased shard, or None if nothing is available right now
+        """
+        with self._lock:
+            now = time.time()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    """SELECT shard_id, items, attempts, worker FROM shards
+                       WHERE queue = ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))
+                       ORDER BY status = 'leased', shard_id
+                       LIMIT 1""",
+                    (queue, now)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        """UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1
+                           WHERE queue = ? AND shard_id = ?""",
+                        (worker, now + self.lease_seconds, queue, row[0])
+                    )
+                self._touch_worker(queue, worker, now)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+            if row is None:
+                return None
+            shard_id, items, attempts, previous_worker = row
+            if previous_worker is not None and previous_worker != worker:
+                logger.warning(f"Re-leasing shard {shard_id} after lease of {previous_worker} expired")
+            return Shard(queue, shard_id, json.loads(items), attempts + 1)
+
+    def heartbeat(self, queue: str, worker: str):
+        """Mark a worker alive and extend all of its leases."""
+        with self._lock:
+            now = time.time()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE shards SET lease_expires = ? WHERE queue = ? AND worker = ? AND status = 'leased'",
+                    (now + self.lease_seconds, queue, worker)
+                )
+                self._touch_worker(queue, worker, now)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def check_lease(self, shard: Shard, worker: str):
+        """
+        Make sure a worker still holds an unexpired lease on a shard.
+
+        Call before saving each batch of a shard's output, so a worker
+        whose lease expired (and may have moved to another worker) does not
+        save results for it alongside the new holder's.
+
+        Raises:
+            LeaseExpired: If the lease expired or belongs to another worker
+        """
+        with self._lock:
+            row = self._db.execute(
+                """SELECT 1 FROM shards
+                   WHERE queue = ? AND shard_id = ? AND worker = ? AND status = 'leased' AND lease_expires >= ?""",
+                (shard.queue, shard.shard_id, worker, time.time())
+            ).fetchone()
+            if row is None:
+                raise LeaseExpired(f"Lease on shard {shard.shard_id} expired")
+
+    def complete(self, shard: Shard, worker: str) -> bool:
+        """
+        Mark a leased shard done (call once its output is saved).
+
+        Returns:
+            False if the lease had expired and moved to another worker
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                """UPDATE shards SET status = 'done', lease_expires = NULL
+                   WHERE queue = ? AND shard_id = ? AND worker = ? AND status = 'leased'""",
+                (shard.queue, shard.shard_id, worker)
+            )
+            return cursor.rowcount > 0
+
+    def release(self, shard: Shard, worker: str):
+        """Return a leased shard to the queue, e.g. after an error."""
+        with self._lock:
+            self._db.execute(
+                """UPDATE shards SET status = 'pending', worker = NULL, lease_expires = NULL
+                   WHERE queue = ? AND shard_id = ? AND worker = ? AND status = 'leased'""",
+                (shard.queue, shard.shard_id, worker)
+            )
+
+    def counts(self, queue: str) -> Dict[str, int]:
+        """Number of shards per status."""
+        with self._lock:
+            counts = {'pending': 0, 'leased': 0, 'done': 0}
+            counts.update(self._db.execute(
+                "SELECT status, COUNT(*) FROM shards WHERE queue = ? GROUP BY status", (queue,)
+            ))
+            return counts
+
+    def workers(self, queue: str) -> List[str]:
+        """IDs of every worker that has leased from a queue since it was populated."""
+        with self._lock:
+            return [worker for worker, in self._db.execute(
+                "SELECT worker FROM workers WHERE queue = ? ORDER BY worker", (queue,)
+            )]
+
+    def active_workers(self, queue: str) -> int:
+        """Workers that sent a heartbeat within the lease period."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM workers WHERE queue = ? AND heartbeat_at >= ?",
+                (queue, time.time() - self.lease_seconds)
+            ).fetchone()[0]
+
+    def claim_finalize(self, queue: str, worker: str) -> bool:
+        """
+        Mark a worker finished and claim the one-time merge of the queue.
+
+        Call once the worker has closed its own output. Workers whose last
+        heartbeat is older than the lease period count as crashed.
+
+        Returns:
+            True for exactly one caller: the one finishing last, once every
+            shard is done
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE workers SET finished = 1 WHERE queue = ? AND worker = ?", (queue, worker)
+                )
+                unfinished = self._db.execute(
+                    "SELECT 1 FROM shards WHERE queue = ? AND status != 'done' LIMIT 1", (queue,)
+                ).fetchone()
+                busy = self._db.execute(
+                    "SELECT 1 FROM workers WHERE queue = ? AND finished = 0 AND heartbeat_at >= ? LIMIT 1",
+                    (queue, time.time() - self.lease_seconds)
+                ).fetchone()
+                claimed = self._db.execute("SELECT 1 FROM finalized WHERE queue = ?", (queue,)).fetchone()
+                won = unfinished is None and busy is None and claimed is None
+                if won:
+                    self._db.execute(
+                        "INSERT INTO finalized (queue, worker, finalized_at) VALUES (?, ?, ?)",
+                        (queue, worker, time.time())
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return won
+
+    def clear(self, queue: str):
+        """Drop all shards and workers of a queue so the next run repopulates it."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("DELETE FROM shards WHERE queue = ?", (queue,))
+            self._db.execute("DELETE FROM workers WHERE queue = ?", (queue,))
+            self._db.execute("COMMIT")
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def _touch_worker(self, queue: str, worker: str, now: float):
+        self._db.execute(
+            """INSERT INTO workers (queue, worker, heartbeat_at) VALUES (?, ?, ?)
+               ON CONFLICT(queue, worker) DO UPDATE SET heartbeat_at = excluded.heartbeat_at, finished = 0""",
+            (queue, worker, now)
+        )
+
+
+async def work_shards(
+    work_queue: WorkQueue,
+    queue: str,
+    worker: str,
+    process_shard: Callable[[Shard], Awaitable[None]],
+    controller: Optional[AdaptiveController] = None,
+    poll_interval: float = 5.0
+) -> int:
+    """
+    Lease and process shards until the queue is drained.
+
+    Queue calls run in worker threads so the event loop keeps serving
+    requests while they wait for other workers' writes. A background task
+    renews this worker's leases every third of the lease period; a failed
+    renewal is logged and retried on the next beat. Before each shard the
+    controller's ceilings are set to this worker's share of the global
+    budget (its configured ceilings divided by the number of live workers). Once no shard is pending, the worker waits
+    for shards still leased elsewhere, since their lease may expire and
+    come back.
+
+    Args:
+        work_queue: Shared queue
+        queue: Queue name
+        worker: This worker's ID
+        process_shard: Processes a shard; must save its output before
+            returning and call ``WorkQueue.check_lease`` before saving each
+            batch of it (a ``LeaseExpired`` it raises moves on to the next
+            shard)
+        controller: Adaptive controller whose ceilings are shared out
+        poll_interval: Seconds between checks while other workers finish
+
+    Returns:
+        Number of shards this worker completed; afterwards close the
+        worker's output and call ``claim_finalize``
+    """
+    budget = (controller.max_concurrency, controller.max_rate) if controller else None
+
+    async def keep_alive():
+        while True:
+            await asyncio.sleep(work_queue.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(work_queue.heartbeat, queue, worker)
+            except Exception as e:
+                # Keep trying: a lease that runs out meanwhile is caught by check_lease
+                logger.warning(f"Heartbeat of worker {worker} failed, retrying: {e}")
+
+    completed = 0
+    heartbeat_task = asyncio.create_task(keep_alive())
+    try:
+        while True:
+            shard = await asyncio.to_thread(work_queue.lease, queue, worker)
+            if shard is None:
+                if (await asyncio.to_thread(work_queue.counts, queue))['leased'] == 0:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+
+            if budget is not None:
+                workers = max(1, await asyncio.to_thread(work_queue.active_workers, queue))
+                controller.set_ceiling(max_concurrency=budget[0] // workers, max_rate=budget[1] / workers)
+
+            logger.info(f"Worker {worker} leased shard {shard.shard_id} ({len(shard.items):,} items)")
+            try:
+                await process_shard(shard)
+            except LeaseExpired:
+                logger.warning(f"Lease on shard {shard.shard_id} expired; dropped its unsaved results")
+                continue
+            except BaseException:
+                await asyncio.to_thread(work_queue.release, shard, worker)
+                raise
+            if await asyncio.to_thread(work_queue.complete, shard, worker):
+                completed += 1
+            else:
+                logger.warning(f"Lease on shard {shard.shard_id} expired before it was completed")
+    finally:
+        heartbeat_task.cancel()
+
+    return completed